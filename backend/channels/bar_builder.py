@@ -0,0 +1,367 @@
+"""
+OHLC Bar Builder
+================
+
+Aggregates KRX ticks into OHLCV bars (1s, 1m, 5m, ... 1d) per symbol as they
+arrive, in constant time per tick, and publishes each bar once it is finished.
+
+Bars follow the exchange sessions. A bar never spans the lunch break: the
+last morning bar ends at 11:30 even if its nominal period runs later. Prints
+that arrive between sessions are added to the last bar of the session they
+follow. These are the opening (ATO) and closing (ATC) auction matches and
+late-reported trades. Prints before the open go to the first bar. A bar
+that ends a session is published after ``session_close_delay`` seconds, so
+the ATC print can still be included. Other bars are published as soon as a
+tick for a later bar arrives, or ``close_delay`` seconds after they end.
+
+The exchange's own bars (``v2/ohlc/stock`` topics) are the reference. When
+one differs from the bar built here for the same period, the exchange's
+values are published again as a correction. A published bar with the same
+symbol, resolution and time as an earlier one replaces it.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .market_data_hub import HubSubscription, MarketDataHub
+from .tick_decoder import OHLCBar, Tick, ohlc_topic, tick_topic
+from .tick_store import BAR_RESOLUTIONS, MARKET_UTC_OFFSET
+
+logger = logging.getLogger(__name__)
+
+# HOSE/HNX matching sessions as seconds after local midnight (see strategies.scheduler)
+MARKET_SESSIONS: Tuple[Tuple[int, int], ...] = (
+    (9 * 3600, 11 * 3600 + 30 * 60),
+    (13 * 3600, 14 * 3600 + 45 * 60),
+)
+
+# DNSE v2/ohlc topic resolution for each bar resolution it publishes
+EXCHANGE_RESOLUTIONS = {
+    '1m': '1',
+    '5m': '5',
+    '15m': '15',
+    '30m': '30',
+    '1h': '1H',
+    '1d': '1D',
+}
+
+# Recently finished bars kept per symbol and resolution for reconciliation
+RECONCILE_WINDOW = 64
+
+# Prints between sessions are placed this far before the session end
+_EPSILON = 1e-3
+
+
+def session_time(seconds: float, sessions: Tuple[Tuple[int, int], ...] = MARKET_SESSIONS) -> Tuple[float, int]:
+    """
+    Map a time of day (seconds after local midnight) into the trading sessions.
+    Returns the mapped time and the end of its session.
+    """
+    previous_end = None
+    for start, end in sessions:
+        if seconds < start:
+            if previous_end is None:
+                return float(start), end
+            return previous_end - _EPSILON, previous_end
+        if seconds < end:
+            return seconds, end
+        previous_end = end
+    return previous_end - _EPSILON, previous_end
+
+
+class BarBuilder:
+    """The bar in progress for one symbol and resolution"""
+    __slots__ = ('symbol', 'resolution', 'seconds', 'sessions', 'bar', 'bar_end', 'ends_session',
+                 'last_finished', 'late_ticks')
+
+    def __init__(self, symbol: str, resolution: str, sessions: Tuple[Tuple[int, int], ...] = MARKET_SESSIONS):
+        if resolution not in BAR_RESOLUTIONS:
+            raise ValueError(f"Unsupported bar resolution: {resolution}")
+        self.symbol = symbol
+        self.resolution = resolution
+        self.seconds = BAR_RESOLUTIONS[resolution]
+        self.sessions = sessions
+        self.bar: Optional[OHLCBar] = None
+        self.bar_end = 0.0  # Epoch seconds
+        self.ends_session = False
+        self.last_finished = float('-inf')  # Open time of the last finished bar
+        self.late_ticks = 0
+
+    def bounds(self, timestamp: float) -> Tuple[float, float, bool]:
+        """Open time, end time and whether the bar a tick at `timestamp` belongs to ends a session"""
+        local = timestamp + MARKET_UTC_OFFSET
+        midnight = local - local % 86400
+        seconds, session_end = session_time(local - midnight, self.sessions)
+        if self.seconds >= 86400:
+            start, end = 0.0, self.sessions[-1][1]
+        else:
+            start = seconds - seconds % self.seconds
+            end = min(start + self.seconds, session_end)
+        origin = midnight - MARKET_UTC_OFFSET
+        return origin + start, origin + end, end == session_end
+
+    def update(self, price: float, quantity: int, timestamp: float) -> Optional[OHLCBar]:
+        """Add a tick; returns the bar it finished, if any"""
+        bar = self.bar
+        if bar is not None and bar.time <= timestamp < self.bar_end:
+            # Fast path: the tick falls inside the bar in progress
+            if price > bar.high:
+                bar.high = price
+            elif price < bar.low:
+                bar.low = price
+            bar.close = price
+            bar.volume += quantity
+            return None
+
+        start, end, ends_session = self.bounds(timestamp)
+        if bar is not None and start == bar.time:
+            # A print outside the sessions, assigned to the bar in progress
+            bar.high = max(bar.high, price)
+            bar.low = min(bar.low, price)
+            bar.close = price
+            bar.volume += quantity
+            return None
+        if start <= self.last_finished or (bar is not None and start < bar.time):
+            self.late_ticks += 1
+            return None
+
+        finished = self._finish()
+        self.bar = OHLCBar(self.symbol, self.resolution, start, price, price, price, price, quantity)
+        self.bar_end = end
+        self.ends_session = ends_session
+        return finished
+
+    def flush(self, now: float, close_delay: float = 1.0, session_close_delay: float = 60.0) -> Optional[OHLCBar]:
+        """Finish the bar in progress if it ended long enough before `now`"""
+        if self.bar is None:
+            return None
+        delay = session_close_delay if self.ends_session else close_delay
+        if now < self.bar_end + delay:
+            return None
+        return self._finish()
+
+    def _finish(self) -> Optional[OHLCBar]:
+        finished, self.bar = self.bar, None
+        if finished is not None:
+            self.last_finished = finished.time
+        return finished
+
+
+def _same_bar(a: OHLCBar, b: OHLCBar) -> bool:
+    return (a.volume == b.volume and abs(a.open - b.open) < 1e-9 and abs(a.high - b.high) < 1e-9
+            and abs(a.low - b.low) < 1e-9 and abs(a.close - b.close) < 1e-9)
+
+
+class BarAggregator:
+    """
+    Bars of several resolutions for any number of symbols.
+
+    Ticks come from on_tick() or a MarketDataHub (attach()). Finished and
+    corrected bars go to subscribers as callback(OHLCBar), on the thread that
+    finished them: the market data dispatch thread, or the background flush
+    thread started by start().
+    """
+
+    def __init__(self, resolutions: Iterable[str] = ('1s', '1m', '5m', '1d'),
+                 sessions: Tuple[Tuple[int, int], ...] = MARKET_SESSIONS,
+                 close_delay: float = 1.0, session_close_delay: float = 60.0):
+        self.resolutions = list(resolutions)
+        for resolution in self.resolutions:
+            if resolution not in BAR_RESOLUTIONS:
+                raise ValueError(f"Unsupported bar resolution: {resolution}")
+        self.sessions = sessions
+        self.close_delay = close_delay
+        self.session_close_delay = session_close_delay
+
+        self._lock = threading.Lock()
+        self._builders: Dict[str, List[BarBuilder]] = {}  # symbol -> one builder per resolution
+        self._finished: Dict[Tuple[str, str], 'OrderedDict[float, OHLCBar]'] = {}
+        self._exchange: Dict[Tuple[str, str], 'OrderedDict[float, OHLCBar]'] = {}
+        self._subscribers: List[Callable[[OHLCBar], None]] = []
+        self._hub: Optional[MarketDataHub] = None
+        self._subscriptions: List[HubSubscription] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.ticks = 0
+        self.bars_published = 0
+        self.bars_matched = 0
+        self.corrections = 0
+        self.errors = 0
+
+    # --- Subscribers ---
+
+    def subscribe(self, callback: Callable[[OHLCBar], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[OHLCBar], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _publish(self, bars: List[OHLCBar]) -> None:
+        for bar in bars:
+            self.bars_published += 1
+            for callback in list(self._subscribers):
+                try:
+                    callback(bar)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Error in bar subscriber for {bar.symbol} {bar.resolution}: {e}")
+
+    # --- Market data ---
+
+    def attach(self, hub: MarketDataHub, symbols: Iterable[str]) -> None:
+        """Build bars for `symbols` from a hub's ticks, reconciled with the exchange's bars"""
+        self._hub = hub
+        for symbol in symbols:
+            self._subscriptions.append(hub.subscribe(tick_topic(symbol), self._on_message))
+            for resolution in self.resolutions:
+                if resolution in EXCHANGE_RESOLUTIONS:
+                    topic = ohlc_topic(symbol, EXCHANGE_RESOLUTIONS[resolution])
+                    self._subscriptions.append(hub.subscribe(topic, self._on_message))
+
+    def detach(self) -> None:
+        if self._hub:
+            for subscription in self._subscriptions:
+                self._hub.unsubscribe(subscription)
+        self._subscriptions.clear()
+        self._hub = None
+
+    def _on_message(self, topic: str, record: Any) -> None:
+        if isinstance(record, Tick):
+            self.on_tick(record)
+        elif isinstance(record, OHLCBar):
+            self.reconcile(record)
+
+    def _builders_for(self, symbol: str) -> List[BarBuilder]:
+        builders = self._builders.get(symbol)
+        if builders is None:
+            builders = self._builders[symbol] = [
+                BarBuilder(symbol, resolution, self.sessions) for resolution in self.resolutions
+            ]
+        return builders
+
+    def on_tick(self, tick: Tick) -> None:
+        """Add a tick to every resolution of its symbol"""
+        if not tick.timestamp:
+            return
+        finished = []
+        with self._lock:
+            self.ticks += 1
+            for builder in self._builders_for(tick.symbol):
+                bar = builder.update(tick.price, tick.quantity, tick.timestamp)
+                if bar is not None:
+                    finished.extend(self._finish(bar))
+        if finished:
+            self._publish(finished)
+
+    def flush(self, now: Optional[float] = None) -> None:
+        """Publish bars whose period is over, even if no later tick has arrived"""
+        now = time.time() if now is None else now
+        finished = []
+        with self._lock:
+            for builders in self._builders.values():
+                for builder in builders:
+                    bar = builder.flush(now, self.close_delay, self.session_close_delay)
+                    if bar is not None:
+                        finished.extend(self._finish(bar))
+        if finished:
+            self._publish(finished)
+
+    def current(self, symbol: str, resolution: str) -> Optional[OHLCBar]:
+        """The bar in progress (not yet published)"""
+        with self._lock:
+            for builder in self._builders.get(symbol, ()):
+                if builder.resolution == resolution:
+                    return builder.bar
+        return None
+
+    # --- Reconciliation ---
+
+    @staticmethod
+    def _remember(cache: Dict, key: Tuple[str, str], bar: OHLCBar) -> None:
+        bars = cache.get(key)
+        if bars is None:
+            bars = cache[key] = OrderedDict()
+        bars[bar.time] = bar
+        bars.move_to_end(bar.time)
+        while len(bars) > RECONCILE_WINDOW:
+            bars.popitem(last=False)
+
+    def _finish(self, bar: OHLCBar) -> List[OHLCBar]:
+        """A bar just finished: keep it for reconciliation; returns what to publish (lock held)"""
+        key = (bar.symbol, bar.resolution)
+        self._remember(self._finished, key, bar)
+        exchange = self._exchange.get(key, {}).get(bar.time)
+        if exchange is None:
+            return [bar]
+        corrected = self._compare(bar, exchange)
+        return [corrected] if corrected else [bar]
+
+    def _compare(self, bar: OHLCBar, exchange: OHLCBar) -> Optional[OHLCBar]:
+        """The exchange's version of `bar` if they differ, else None (lock held)"""
+        if _same_bar(bar, exchange):
+            self.bars_matched += 1
+            return None
+        self.corrections += 1
+        corrected = OHLCBar(bar.symbol, bar.resolution, bar.time, exchange.open, exchange.high,
+                            exchange.low, exchange.close, exchange.volume)
+        self._finished[(bar.symbol, bar.resolution)][bar.time] = corrected
+        logger.info(f"Corrected {bar} to the exchange bar {exchange}")
+        return corrected
+
+    def reconcile(self, exchange: OHLCBar) -> None:
+        """Compare an exchange bar with the bar built for the same period, publishing a correction if needed"""
+        resolution = next((r for r, e in EXCHANGE_RESOLUTIONS.items() if e == exchange.resolution), None)
+        if resolution not in self.resolutions or exchange.open is None:
+            return
+        key = (exchange.symbol, resolution)
+        corrected = None
+        with self._lock:
+            # The exchange updates a bar until it closes; keep its latest version
+            self._remember(self._exchange, key, exchange)
+            bar = self._finished.get(key, {}).get(exchange.time)
+            if bar is not None:
+                corrected = self._compare(bar, exchange)
+        if corrected:
+            self._publish([corrected])
+
+    # --- Lifecycle ---
+
+    def start(self, interval: float = 0.5) -> None:
+        """Flush finished bars from a background thread every `interval` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="bar-builder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.detach()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            late = sum(builder.late_ticks for builders in self._builders.values() for builder in builders)
+            symbols = len(self._builders)
+        return {
+            'resolutions': self.resolutions,
+            'symbols': symbols,
+            'ticks': self.ticks,
+            'bars_published': self.bars_published,
+            'bars_matched': self.bars_matched,
+            'corrections': self.corrections,
+            'late_ticks': late,
+            'errors': self.errors
+        }
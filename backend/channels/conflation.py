@@ -0,0 +1,168 @@
+"""
+Market Data Conflation
+======================
+
+Latest-value cache for consumers that only need the current state of each
+symbol. Producers publish every update; each subscriber reads, per symbol,
+only the newest value since its previous read, together with the symbol's
+sequence number and how many intermediate updates it skipped. A slow reader
+therefore never builds a backlog: however busy the feed, a read returns at
+most one update per symbol.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class ConflatedUpdate:
+    """The latest value of a key as seen by one subscriber"""
+    __slots__ = ('key', 'value', 'sequence', 'dropped', 'timestamp')
+
+    def __init__(self, key: Hashable, value: Any, sequence: int, dropped: int, timestamp: float):
+        self.key = key
+        self.value = value
+        self.sequence = sequence  # Per-key update counter, starting at 1
+        self.dropped = dropped  # Updates published since the previous read that were skipped
+        self.timestamp = timestamp  # Epoch seconds of the publish
+
+    def __repr__(self) -> str:
+        return f"ConflatedUpdate({self.key} #{self.sequence} {self.value!r} dropped={self.dropped})"
+
+
+class ConflatedSubscription:
+    """
+    A reader of a ConflatingCache.
+
+    `on_update` is called (on the publishing thread) when the subscription goes
+    from having nothing to read to having something, not on every update, so a
+    consumer is woken at most once per read.
+    """
+
+    def __init__(self, cache: 'ConflatingCache', keys: Optional[Iterable[Hashable]] = None,
+                 on_update: Optional[Callable[[], None]] = None):
+        self._cache = cache
+        self.keys = frozenset(keys) if keys is not None else None
+        self.on_update = on_update
+        self._dirty: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self._last_seen: Dict[Hashable, int] = {}
+        self._ready = threading.Event()
+        self.reads = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def wants(self, key: Hashable) -> bool:
+        return self.keys is None or key in self.keys
+
+    def _mark(self, key: Hashable) -> bool:
+        """Flag `key` as changed; True if the subscription was previously clean (called under the cache lock)"""
+        was_clean = not self._dirty
+        self._dirty[key] = None
+        if was_clean:
+            self._ready.set()
+        return was_clean
+
+    @property
+    def pending(self) -> int:
+        """Number of keys with an unread update"""
+        return len(self._dirty)
+
+    def read(self) -> List[ConflatedUpdate]:
+        """Latest update of every key changed since the previous read, in order of first change"""
+        with self._cache._lock:
+            keys = list(self._dirty)
+            self._dirty.clear()
+            self._ready.clear()
+            updates = []
+            for key in keys:
+                value, sequence, timestamp = self._cache._values[key]
+                dropped = sequence - self._last_seen.get(key, 0) - 1
+                self._last_seen[key] = sequence
+                updates.append(ConflatedUpdate(key, value, sequence, dropped, timestamp))
+        self.reads += 1
+        self.delivered += len(updates)
+        self.dropped += sum(update.dropped for update in updates)
+        return updates
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until there is something to read; False on timeout"""
+        return self._ready.wait(timeout)
+
+    def close(self) -> None:
+        self._cache.unsubscribe(self)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self.pending,
+            'reads': self.reads,
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+
+class ConflatingCache:
+    """Thread-safe latest value and sequence number per key, shared by any number of subscriptions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, tuple] = {}  # key -> (value, sequence, timestamp)
+        self._subscriptions: List[ConflatedSubscription] = []
+        self.published = 0
+
+    def publish(self, key: Hashable, value: Any, timestamp: Optional[float] = None) -> int:
+        """Store the latest value of `key` and flag it for every interested subscriber; returns its sequence"""
+        timestamp = time.time() if timestamp is None else timestamp
+        to_notify = []
+        with self._lock:
+            previous = self._values.get(key)
+            sequence = previous[1] + 1 if previous else 1
+            self._values[key] = (value, sequence, timestamp)
+            self.published += 1
+            for subscription in self._subscriptions:
+                if subscription.wants(key) and subscription._mark(key) and subscription.on_update:
+                    to_notify.append(subscription.on_update)
+        for notify in to_notify:
+            notify()
+        return sequence
+
+    def latest(self, key: Hashable) -> Optional[ConflatedUpdate]:
+        """Current value of `key` without affecting any subscription"""
+        with self._lock:
+            entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, sequence, timestamp = entry
+        return ConflatedUpdate(key, value, sequence, 0, timestamp)
+
+    def subscribe(self, keys: Optional[Iterable[Hashable]] = None,
+                  on_update: Optional[Callable[[], None]] = None) -> ConflatedSubscription:
+        """
+        Subscribe to `keys` (all keys if None). Keys that already have a value
+        are readable immediately, so the first read is a snapshot.
+        """
+        subscription = ConflatedSubscription(self, keys, on_update)
+        with self._lock:
+            for key, (_, sequence, _) in self._values.items():
+                if subscription.wants(key):
+                    subscription._last_seen[key] = sequence - 1
+                    subscription._mark(key)
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ConflatedSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._values)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'keys': len(self._values),
+                'published': self.published,
+                'subscriptions': len(self._subscriptions)
+            }
@@ -0,0 +1,355 @@
+"""
+MQTT Connection Manager
+=======================
+
+Keeps a paho MQTT client connected on a background thread:
+
+* reconnects with exponential backoff and jitter instead of a fixed sleep,
+  so many clients dropped together do not reconnect in lockstep;
+* fetches credentials before every attempt, refreshing the JWT used as the
+  MQTT password when it is about to expire or the broker rejected it;
+* resubscribes every topic in one batched SUBSCRIBE packet after connecting.
+
+GapTracker turns disconnects into per-symbol gap events (last message before
+the drop, first message after), so consumers know when their view of a
+symbol was stale.
+"""
+
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+# CONNACK codes meaning the credentials were refused (MQTT 3.1.1 and MQTT 5)
+AUTH_FAILURE_CODES = {4, 5, 134, 135}
+
+# Topics per SUBSCRIBE packet when resubscribing
+MAX_TOPICS_PER_SUBSCRIBE = 256
+
+
+def create_mqtt_client(client_id: str, transport: str = "websockets", **kwargs) -> mqtt.Client:
+    """A paho client using the (client, userdata, flags, rc) callback signatures on paho 1.x and 2.x"""
+    if hasattr(mqtt, 'CallbackAPIVersion'):
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=client_id, transport=transport, **kwargs)
+    return mqtt.Client(client_id=client_id, transport=transport, **kwargs)
+
+
+def jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """The `exp` claim (epoch seconds) of a JWT, without verifying it; None if it cannot be read"""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _reason_value(rc: Any) -> int:
+    """Integer value of a paho return code (an int, or a ReasonCode on MQTT 5)"""
+    return getattr(rc, 'value', rc)
+
+
+class ExponentialBackoff:
+    """
+    Reconnect delays growing by `multiplier` from `initial` up to `maximum`.
+    Each delay is randomly reduced by up to `jitter` (a fraction) of itself.
+    """
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0, multiplier: float = 2.0,
+                 jitter: float = 0.5, rng: Callable[[], float] = random.random):
+        if initial <= 0 or maximum < initial or multiplier < 1 or not 0 <= jitter <= 1:
+            raise ValueError("Invalid backoff parameters")
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._rng = rng
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        base = min(self.maximum, self.initial * self.multiplier ** self.attempts)
+        self.attempts += 1
+        return base * (1 - self.jitter * self._rng())
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class MQTTConnectionManager:
+    """
+    Owns the network loop and connection lifecycle of a paho client.
+
+    Args:
+        client: paho client (TLS/WebSocket options already set); the manager
+            installs its own on_connect/on_disconnect callbacks
+        host, port, keepalive: Broker address
+        credentials: Called as credentials(refresh) before each connection
+            attempt; returns (username, password). `refresh` is True when the
+            password (a JWT) expires within `token_refresh_margin` seconds or
+            the broker refused the previous credentials. Raising PermissionError
+            (no way to get a new token) stops the manager.
+        on_connected / on_disconnected: Called with the event time (epoch seconds)
+    """
+
+    def __init__(self, client: mqtt.Client, host: str, port: int,
+                 credentials: Callable[[bool], Tuple[str, str]], keepalive: int = 60,
+                 backoff: Optional[ExponentialBackoff] = None, token_refresh_margin: float = 300.0,
+                 on_connected: Optional[Callable[[float], None]] = None,
+                 on_disconnected: Optional[Callable[[float], None]] = None,
+                 name: str = 'mqtt-connection'):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.credentials = credentials
+        self.backoff = backoff or ExponentialBackoff()
+        self.token_refresh_margin = token_refresh_margin
+        self.on_connected = on_connected
+        self.on_disconnected = on_disconnected
+        self.name = name
+
+        self._topics: Dict[str, int] = {}  # topic -> qos, replayed on every connect
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._socket_open = False
+        self._has_connected_once = False
+        self._auth_rejected = False
+
+        # Metrics
+        self.connect_attempts = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.token_refreshes = 0
+        self.last_connected_at: Optional[float] = None
+        self.last_disconnected_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def start(self) -> None:
+        """Start connecting and running the network loop in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Disconnect and stop the network loop"""
+        self._stop.set()
+        try:
+            self.client.disconnect()
+        except Exception as e:
+            logger.debug(f"Error disconnecting MQTT client: {e}")
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self._connected.clear()
+
+    # --- Subscriptions ---
+
+    def subscribe(self, topic: str, qos: int = 0) -> None:
+        """Subscribe now if connected; the topic is also resubscribed after every reconnect"""
+        with self._lock:
+            self._topics[topic] = qos
+        if self.is_connected:
+            self.client.subscribe(topic, qos)
+
+    def unsubscribe(self, topic: str) -> None:
+        with self._lock:
+            self._topics.pop(topic, None)
+        if self.is_connected:
+            self.client.unsubscribe(topic)
+
+    @property
+    def topics(self) -> List[str]:
+        with self._lock:
+            return list(self._topics)
+
+    def _resubscribe(self) -> None:
+        """Replay every subscription, batched into as few SUBSCRIBE packets as possible"""
+        with self._lock:
+            topics = list(self._topics.items())
+        for start in range(0, len(topics), MAX_TOPICS_PER_SUBSCRIBE):
+            batch = topics[start:start + MAX_TOPICS_PER_SUBSCRIBE]
+            self.client.subscribe(batch)
+        if topics:
+            logger.info(f"Resubscribed to {len(topics)} topics")
+
+    # --- Connection lifecycle ---
+
+    def _needs_token_refresh(self, password: Optional[str]) -> bool:
+        expiry = jwt_expiry(password)
+        return expiry is not None and expiry - time.time() < self.token_refresh_margin
+
+    def _connect_once(self) -> bool:
+        """One connection attempt; True if the socket opened (CONNACK arrives through the loop)"""
+        self.connect_attempts += 1
+        try:
+            username, password = self.credentials(False)
+            if self._auth_rejected or self._needs_token_refresh(password):
+                username, password = self.credentials(True)
+                self.token_refreshes += 1
+                self._auth_rejected = False
+            self.client.username_pw_set(username, password)
+            if self._has_connected_once:
+                self.client.reconnect()
+            else:
+                self.client.connect(self.host, self.port, self.keepalive)
+                self._has_connected_once = True
+            return True
+        except PermissionError as e:
+            self.last_error = str(e)
+            logger.error(f"MQTT credentials unavailable, giving up: {e}")
+            self._stop.set()
+            return False
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"MQTT connection attempt {self.connect_attempts} failed: {e}")
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._socket_open:
+                self._socket_open = self._connect_once()
+                if not self._socket_open:
+                    self._stop.wait(self.backoff.next_delay())
+                    continue
+            rc = self.client.loop(timeout=1.0)
+            if rc != mqtt.MQTT_ERR_SUCCESS and not self._stop.is_set():
+                self._socket_open = False
+                self._mark_disconnected()
+                delay = self.backoff.next_delay()
+                logger.warning(f"MQTT connection lost (rc={rc}), reconnecting in {delay:.1f}s")
+                self._stop.wait(delay)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None) -> None:
+        code = _reason_value(rc)
+        if code != 0:
+            self.last_error = f"CONNACK {code}"
+            self._auth_rejected = code in AUTH_FAILURE_CODES
+            logger.error(f"MQTT broker refused the connection (rc={code})")
+            return
+        now = time.time()
+        self.connects += 1
+        self.last_connected_at = now
+        self.backoff.reset()
+        self._connected.set()
+        logger.info(f"MQTT connected to {self.host}:{self.port}")
+        self._resubscribe()
+        if self.on_connected:
+            self.on_connected(now)
+
+    def _on_disconnect(self, client, userdata, *args) -> None:
+        self._mark_disconnected()
+
+    def _mark_disconnected(self) -> None:
+        if not self._connected.is_set():
+            return
+        now = time.time()
+        self._connected.clear()
+        self.disconnects += 1
+        self.last_disconnected_at = now
+        logger.warning("MQTT disconnected")
+        if self.on_disconnected:
+            self.on_disconnected(now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'connected': self.is_connected,
+            'topics': len(self._topics),
+            'connect_attempts': self.connect_attempts,
+            'connects': self.connects,
+            'disconnects': self.disconnects,
+            'token_refreshes': self.token_refreshes,
+            'backoff_attempts': self.backoff.attempts,
+            'last_connected_at': self.last_connected_at,
+            'last_disconnected_at': self.last_disconnected_at,
+            'last_error': self.last_error
+        }
+
+
+class GapEvent:
+    """A period during which a symbol's updates may have been missed"""
+    __slots__ = ('symbol', 'last_sequence', 'last_time', 'first_sequence', 'first_time',
+                 'disconnected_at', 'reconnected_at')
+
+    def __init__(self, symbol: str, last_sequence: int, last_time: Optional[float], first_sequence: int,
+                 first_time: float, disconnected_at: float, reconnected_at: Optional[float]):
+        self.symbol = symbol
+        self.last_sequence = last_sequence  # Per-symbol message count at the last message before the drop
+        self.last_time = last_time
+        self.first_sequence = first_sequence  # ... and at the first message after it
+        self.first_time = first_time
+        self.disconnected_at = disconnected_at
+        self.reconnected_at = reconnected_at
+
+    @property
+    def duration(self) -> float:
+        """Seconds between the last message before the gap and the first after it"""
+        return self.first_time - (self.last_time if self.last_time is not None else self.disconnected_at)
+
+    def __repr__(self) -> str:
+        return f"GapEvent({self.symbol} #{self.last_sequence}->#{self.first_sequence} {self.duration:.1f}s)"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class GapTracker:
+    """
+    Per-symbol message sequence and time. After a disconnect, the first message
+    of each symbol seen before the drop produces a GapEvent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: Dict[str, Tuple[int, Optional[float]]] = {}  # symbol -> (sequence, time)
+        self._stale: Dict[str, float] = {}  # symbol -> disconnect time, until its next message
+        self._reconnected_at: Optional[float] = None
+        self.gaps = 0
+
+    def mark_disconnected(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            for symbol in self._last:
+                self._stale.setdefault(symbol, now)
+
+    def mark_reconnected(self, now: Optional[float] = None) -> None:
+        self._reconnected_at = time.time() if now is None else now
+
+    def record(self, symbol: str, timestamp: Optional[float] = None) -> Optional[GapEvent]:
+        """Count a message for `symbol`; returns the gap it closes, if any"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            sequence, last_time = self._last.get(symbol, (0, None))
+            self._last[symbol] = (sequence + 1, timestamp)
+            disconnected_at = self._stale.pop(symbol, None)
+            if disconnected_at is None:
+                return None
+            self.gaps += 1
+        return GapEvent(symbol, sequence, last_time, sequence + 1, timestamp,
+                        disconnected_at, self._reconnected_at)
+
+    @property
+    def stale_symbols(self) -> List[str]:
+        """Symbols with no message since the last disconnect"""
+        with self._lock:
+            return list(self._stale)
@@ -0,0 +1,192 @@
+"""
+Market Data Dispatch Queue
+==========================
+
+Decouples the MQTT network thread from callback work. The network thread only
+appends raw (topic, payload bytes) pairs to a bounded queue; a worker thread
+decodes them and runs the callbacks, so a slow consumer delays delivery
+instead of stalling socket reads.
+
+When the queue is full the oldest message is dropped. With the ``conflate``
+policy, a message for a topic that is still waiting replaces the queued
+payload in place (topics carry the symbol, so this is per symbol and message
+type), and the queue only grows with the number of distinct topics.
+
+Both policies lose messages by design, which is only acceptable for market
+data. The ``unbounded`` policy never drops or merges anything and is meant
+for low-rate topics where every message matters, such as order events.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+OVERFLOW_CONFLATE = 'conflate'
+OVERFLOW_UNBOUNDED = 'unbounded'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_CONFLATE, OVERFLOW_UNBOUNDED)
+
+
+class MessageDispatcher:
+    """
+    Bounded hand-off queue between a producer thread and a single worker thread.
+
+    Args:
+        handler: Called on the worker thread as handler(topic, payload)
+        max_size: Maximum queued messages (distinct topics when conflating; ignored when unbounded)
+        overflow: 'drop_oldest', 'conflate' or 'unbounded'
+        name: Worker thread name
+    """
+
+    def __init__(self, handler: Callable[[str, Any], None], max_size: int = 10000,
+                 overflow: str = OVERFLOW_DROP_OLDEST, name: str = 'market-data-dispatch'):
+        if max_size < 1:
+            raise ValueError("Dispatch queue size must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+        self._handler = handler
+        self.max_size = max_size
+        self.overflow = overflow
+        self.name = name
+
+        self._queue: deque = deque()  # (topic, payload, received_at)
+        self._pending: 'OrderedDict[str, list]' = OrderedDict()  # topic -> [payload, received_at]
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._drain = False
+        self._busy = False
+
+        # Metrics
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending) if self.overflow == OVERFLOW_CONFLATE else len(self._queue)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """Start the worker thread (no-op if already running)"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._drain = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0, drain: bool = False) -> None:
+        """Stop the worker; queued messages are delivered first if `drain`, discarded otherwise"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._drain = drain
+            if not drain:
+                self.dropped += len(self)
+                self._queue.clear()
+                self._pending.clear()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, topic: str, payload: Any) -> None:
+        """Queue a message; called from the network thread and never blocks on consumers"""
+        now = time.monotonic()
+        with self._cond:
+            self.received += 1
+            if self.overflow == OVERFLOW_CONFLATE:
+                entry = self._pending.get(topic)
+                if entry is not None:
+                    entry[0] = payload
+                    entry[1] = now
+                    self.conflated += 1
+                    return
+                if len(self._pending) >= self.max_size:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                self._pending[topic] = [payload, now]
+                depth = len(self._pending)
+            else:
+                if self.overflow == OVERFLOW_DROP_OLDEST and len(self._queue) >= self.max_size:
+                    self._queue.popleft()
+                    self.dropped += 1
+                self._queue.append((topic, payload, now))
+                depth = len(self._queue)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self._cond.notify()
+
+    def _pop(self):
+        if self.overflow == OVERFLOW_CONFLATE:
+            topic, (payload, received_at) = self._pending.popitem(last=False)
+            return topic, payload, received_at
+        return self._queue.popleft()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                while self._running and not len(self):
+                    self._cond.wait()
+                if not len(self):
+                    return  # Stopped (and drained)
+                topic, payload, received_at = self._pop()
+                self._busy = True
+
+            lag = time.monotonic() - received_at
+            self.last_lag = lag
+            self._total_lag += lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            try:
+                self._handler(topic, payload)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error dispatching message on topic {topic}: {e}")
+            self.delivered += 1
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued message has been delivered; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self) or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and receive-to-delivery lag"""
+        return {
+            'running': self._running,
+            'overflow': self.overflow,
+            'max_size': self.max_size,
+            'depth': len(self),
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+            'errors': self.errors,
+            'last_lag_ms': self.last_lag * 1000,
+            'max_lag_ms': self.max_lag * 1000,
+            'avg_lag_ms': self._total_lag / self.delivered * 1000 if self.delivered else 0.0
+        }
@@ -0,0 +1,228 @@
+"""
+Market Data Hub
+===============
+
+Shares one market data (MQTT) connection between any number of in-process
+subscribers, e.g. one grid strategy per symbol. Upstream topic subscriptions
+are reference counted: the first subscriber to a topic (or wildcard pattern)
+subscribes on the broker, the last one to leave unsubscribes. Every message
+is fanned out to all matching subscribers.
+
+The hub works with any client exposing the MarketDataMixin interface
+(``connect_market_data``, ``subscribe``, ``unsubscribe``,
+``disconnect_market_data``); ``MarketDataHub.for_client`` returns the hub
+shared by everything using the same client.
+"""
+
+import itertools
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cap on cached topic -> subscribers resolutions (wildcards can match many topics)
+MAX_ROUTE_CACHE = 10000
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Check an MQTT topic against a subscription pattern with '+' and '#' wildcards"""
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+
+    return len(pattern_parts) == len(topic_parts)
+
+
+def is_wildcard(pattern: str) -> bool:
+    return '+' in pattern or '#' in pattern
+
+
+class HubSubscription:
+    """Handle returned by MarketDataHub.subscribe(); pass it back to unsubscribe()"""
+    __slots__ = ('id', 'pattern', 'callback', 'delivered')
+
+    def __init__(self, subscription_id: int, pattern: str, callback: Callable[[str, Any], None]):
+        self.id = subscription_id
+        self.pattern = pattern
+        self.callback = callback
+        self.delivered = 0
+
+    def __repr__(self) -> str:
+        return f"HubSubscription(#{self.id} {self.pattern})"
+
+
+class MarketDataHub:
+    """
+    Reference-counted fan-out over a single market data connection.
+
+    Callbacks are called as callback(topic, payload) with decoded KRX records
+    (see channels.tick_decoder) or parsed JSON for other topics, on the
+    client's dispatch thread. Subscriptions made before connect() are sent to
+    the broker when the connection is opened.
+    """
+
+    _hubs: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+    _hubs_lock = threading.Lock()
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._refcounts: Dict[str, int] = {}  # upstream pattern -> subscriber count
+        self._exact: Dict[str, List[HubSubscription]] = {}
+        self._wildcards: List[HubSubscription] = []
+        self._routes: Dict[str, Tuple[HubSubscription, ...]] = {}  # topic -> matching subscribers
+        self._gap_listeners: List[Callable[[Any], None]] = []
+        self._users = 0
+        self.connected = False
+
+        # Metrics
+        self.messages = 0
+        self.deliveries = 0
+        self.errors = 0
+
+    @classmethod
+    def for_client(cls, client) -> 'MarketDataHub':
+        """The hub shared by every user of `client`"""
+        with cls._hubs_lock:
+            hub = cls._hubs.get(client)
+            if hub is None:
+                hub = cls(client)
+                cls._hubs[client] = hub
+            return hub
+
+    def connect(self) -> None:
+        """Register a user of the hub, opening the upstream connection for the first one"""
+        with self._lock:
+            if not self.connected:
+                self.client.connect_market_data()
+                self.connected = True
+                for pattern in self._refcounts:
+                    self.client.subscribe(pattern, self._on_message, typed=True)
+            self._users += 1
+
+    def disconnect(self) -> None:
+        """Release a user of the hub, closing the upstream connection after the last one"""
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or not self.connected:
+                return
+            self.connected = False
+            self.client.disconnect_market_data()
+
+    def subscribe(self, pattern: str, callback: Callable[[str, Any], None]) -> HubSubscription:
+        """Subscribe `callback` to a topic or an MQTT wildcard pattern ('+' one level, '#' the rest)"""
+        with self._lock:
+            subscription = HubSubscription(next(self._ids), pattern, callback)
+            if is_wildcard(pattern):
+                self._wildcards.append(subscription)
+            else:
+                self._exact.setdefault(pattern, []).append(subscription)
+            self._routes.clear()
+
+            self._refcounts[pattern] = self._refcounts.get(pattern, 0) + 1
+            if self._refcounts[pattern] == 1 and self.connected:
+                self.client.subscribe(pattern, self._on_message, typed=True)
+            return subscription
+
+    def unsubscribe(self, subscription: HubSubscription) -> None:
+        """Remove a subscription; the broker subscription is dropped with its last subscriber"""
+        with self._lock:
+            pattern = subscription.pattern
+            subscribers = self._wildcards if is_wildcard(pattern) else self._exact.get(pattern, [])
+            if subscription not in subscribers:
+                return
+            subscribers.remove(subscription)
+            if not subscribers and pattern in self._exact:
+                del self._exact[pattern]
+            self._routes.clear()
+
+            self._refcounts[pattern] -= 1
+            if not self._refcounts[pattern]:
+                del self._refcounts[pattern]
+                if self.connected:
+                    self.client.unsubscribe(pattern)
+
+    def _resolve(self, topic: str) -> Tuple[HubSubscription, ...]:
+        with self._lock:
+            subscribers = tuple(self._exact.get(topic, ())) + tuple(
+                subscription for subscription in self._wildcards if topic_matches(subscription.pattern, topic)
+            )
+            if len(self._routes) >= MAX_ROUTE_CACHE:
+                self._routes.clear()
+            self._routes[topic] = subscribers
+            return subscribers
+
+    def _on_message(self, topic: str, payload: Any) -> None:
+        """Upstream callback: deliver one message to every matching subscriber"""
+        subscribers = self._routes.get(topic)
+        if subscribers is None:
+            subscribers = self._resolve(topic)
+        self.messages += 1
+        for subscription in subscribers:
+            try:
+                subscription.callback(topic, payload)
+                subscription.delivered += 1
+                self.deliveries += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in market data subscriber {subscription} for topic {topic}: {e}")
+
+    def add_gap_listener(self, listener: Callable[[Any], None]) -> None:
+        """Call listener(GapEvent) when a symbol resumes after a reconnect (clients with gap tracking only)"""
+        with self._lock:
+            if not self._gap_listeners:
+                add_listener = getattr(self.client, 'add_gap_listener', None)
+                if add_listener is None:
+                    return
+                add_listener(self._on_gap)
+            self._gap_listeners.append(listener)
+
+    def remove_gap_listener(self, listener: Callable[[Any], None]) -> None:
+        with self._lock:
+            if listener not in self._gap_listeners:
+                return
+            self._gap_listeners.remove(listener)
+            if not self._gap_listeners:
+                self.client.remove_gap_listener(self._on_gap)
+
+    def _on_gap(self, gap: Any) -> None:
+        for listener in list(self._gap_listeners):
+            try:
+                listener(gap)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in market data gap listener for {gap.symbol}: {e}")
+
+    @property
+    def topics(self) -> List[str]:
+        """Patterns currently subscribed upstream"""
+        with self._lock:
+            return list(self._refcounts)
+
+    def subscriber_count(self, pattern: Optional[str] = None) -> int:
+        with self._lock:
+            if pattern is not None:
+                return self._refcounts.get(pattern, 0)
+            return sum(self._refcounts.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'users': self._users,
+                'upstream_topics': len(self._refcounts),
+                'subscribers': sum(self._refcounts.values()),
+                'messages': self.messages,
+                'deliveries': self.deliveries,
+                'errors': self.errors
+            }
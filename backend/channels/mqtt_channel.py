@@ -1,20 +1,25 @@
 import asyncio
-import json
+import ssl
 from typing import Dict, Any, Optional, Callable
 import paho.mqtt.client as mqtt
 from ..exceptions import DNSEAPIError
+from .connection_manager import MQTTConnectionManager
+from .tick_decoder import decode_message, tick_topic
 
 class MQTTChannel:
     def __init__(self):
         self.client = None
+        self.connection: Optional[MQTTConnectionManager] = None
         self.callbacks: Dict[str, Callable] = {}
         self.investor_id: Optional[str] = None
         self.token: Optional[str] = None
+        self.token_provider: Optional[Callable[[], str]] = None
         
-    def initialize(self, investor_id: str, token: str):
-        """Initialize MQTT client with credentials"""
+    def initialize(self, investor_id: str, token: str, token_provider: Optional[Callable[[], str]] = None):
+        """Initialize MQTT client with credentials; token_provider returns a fresh JWT when the token expires"""
         self.investor_id = investor_id
         self.token = token
+        self.token_provider = token_provider
         
         client_id = f"dnse-price-json-mqtt-ws-sub-{investor_id}"
         self.client = mqtt.Client(
@@ -24,67 +29,67 @@ class MQTTChannel:
             transport="websockets"
         )
         
-        # Set credentials
-        self.client.username_pw_set(self.investor_id, self.token)
-        
         # Configure SSL/TLS
         self.client.tls_set(cert_reqs=ssl.CERT_NONE)
         self.client.tls_insecure_set(True)
         self.client.ws_set_options(path="/wss")
         
-        # Set callbacks
-        self.client.on_connect = self._on_connect
+        # Set callbacks; connect/disconnect are handled by the connection manager
         self.client.on_message = self._on_message
+        self.connection = MQTTConnectionManager(
+            self.client, "datafeed-lts-krx.dnse.com.vn", 443,
+            credentials=self._credentials,
+            keepalive=1200
+        )
+        
+    def _credentials(self, refresh: bool):
+        """MQTT username and password (the JWT), fetching a fresh token first if asked to"""
+        if refresh:
+            if not self.token_provider:
+                # Stops the connection manager instead of retrying an expired token forever
+                raise PermissionError("MQTT token expired or was rejected and no token provider is set; "
+                                      "a new login is needed")
+            self.token = self.token_provider()
+        return self.investor_id, self.token
         
     def connect(self):
         """Connect to MQTT broker"""
         if not self.client:
             raise DNSEAPIError("MQTT client not initialized")
             
-        try:
-            self.client.connect("datafeed-lts-krx.dnse.com.vn", 443, keepalive=1200)
-            self.client.loop_start()
-        except Exception as e:
-            raise DNSEAPIError(f"Failed to connect to MQTT broker: {str(e)}")
+        # Reconnects with backoff and resubscribes in the background
+        self.connection.start()
     
     def disconnect(self):
         """Disconnect from MQTT broker"""
-        if self.client:
-            self.client.disconnect()
-            self.client.loop_stop()
+        if self.connection:
+            self.connection.stop()
     
     def subscribe(self, symbol: str, callback: Callable):
         """Subscribe to market data for a symbol"""
         if not self.client:
             raise DNSEAPIError("MQTT client not initialized")
             
-        topic = f"plaintext/quotes/krx/mdds/tick/v1/roundlot/symbol/{symbol}"
+        topic = tick_topic(symbol)
         self.callbacks[topic] = callback
-        self.client.subscribe(topic, qos=1)
+        self.connection.subscribe(topic, qos=1)
     
     def unsubscribe(self, symbol: str):
         """Unsubscribe from market data for a symbol"""
         if not self.client:
             raise DNSEAPIError("MQTT client not initialized")
             
-        topic = f"plaintext/quotes/krx/mdds/tick/v1/roundlot/symbol/{symbol}"
+        topic = tick_topic(symbol)
         if topic in self.callbacks:
             del self.callbacks[topic]
-        self.client.unsubscribe(topic)
-    
-    def _on_connect(self, client, userdata, flags, rc, properties):
-        """Internal connect callback"""
-        if rc == 0 and client.is_connected():
-            print("Connected to MQTT Broker!")
-        else:
-            print(f"Failed to connect to MQTT broker, return code {rc}")
+        self.connection.unsubscribe(topic)
     
     def _on_message(self, client, userdata, msg):
-        """Internal message callback"""
+        """Internal message callback; callbacks receive decoded Tick records"""
         try:
-            payload = json.loads(msg.payload.decode())
-            if msg.topic in self.callbacks:
-                self.callbacks[msg.topic](payload)
+            callback = self.callbacks.get(msg.topic)
+            if callback:
+                callback(decode_message(msg.topic, msg.payload))
         except Exception as e:
             print(f"Error processing MQTT message: {str(e)}")
 
@@ -0,0 +1,344 @@
+"""
+KRX Market Data Decoder
+=======================
+
+Decodes DNSE KRX MQTT payloads (tick, topprice, stockinfo and v2/ohlc topics)
+straight from the message bytes into compact, slotted records. Uses orjson
+when it is installed and falls back to the standard library parser, which
+also accepts bytes, so no intermediate ``.decode()`` copy is made either way.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:  # pragma: no cover - depends on the environment
+    import json
+
+    loads = json.loads
+    JSON_BACKEND = 'json'
+
+# Topic path segments identifying each KRX message type
+TOPIC_TICK = 'tick'
+TOPIC_TOP_PRICE = 'topprice'
+TOPIC_STOCK_INFO = 'stockinfo'
+TOPIC_OHLC = 'ohlc'
+
+KRX_TOPIC_PREFIX = 'plaintext/quotes/krx/mdds/'
+
+# Exchange symbols: stocks, covered warrants and derivatives (e.g. VIC, CVIC2301, VN30F2412).
+# Symbols end up in MQTT topics and file paths, where '#', '+' or '/' would widen them.
+SYMBOL_PATTERN = re.compile(r'[A-Z0-9]{1,10}')
+
+
+def is_valid_symbol(symbol: str) -> bool:
+    return SYMBOL_PATTERN.fullmatch(symbol) is not None
+
+
+def tick_topic(symbol: str) -> str:
+    return f"{KRX_TOPIC_PREFIX}tick/v1/roundlot/symbol/{symbol}"
+
+
+def top_price_topic(symbol: str) -> str:
+    return f"{KRX_TOPIC_PREFIX}topprice/v1/roundlot/symbol/{symbol}"
+
+
+def stock_info_topic(symbol: str) -> str:
+    return f"{KRX_TOPIC_PREFIX}stockinfo/v1/roundlot/symbol/{symbol}"
+
+
+def ohlc_topic(symbol: str, resolution: str = '1', product: str = 'stock') -> str:
+    return f"{KRX_TOPIC_PREFIX}v2/ohlc/{product}/{resolution}/{symbol}"
+
+
+def topic_kind(topic: str) -> Optional[str]:
+    """Message type of a KRX topic, or None for anything else"""
+    if not topic.startswith(KRX_TOPIC_PREFIX):
+        return None
+    segment = topic[len(KRX_TOPIC_PREFIX):].split('/', 2)
+    if segment[0] == 'v2' and len(segment) > 1:
+        return TOPIC_OHLC if segment[1] == TOPIC_OHLC else None
+    return segment[0] if segment[0] in (TOPIC_TICK, TOPIC_TOP_PRICE, TOPIC_STOCK_INFO) else None
+
+
+_second_cache: Dict[str, float] = {}
+
+
+def parse_timestamp(value: Any) -> float:
+    """Epoch seconds from an epoch (s or ms) number or an ISO 8601 string (UTC unless an offset is given)"""
+    if value.__class__ is str:
+        # Fast path for 'YYYY-MM-DDTHH:MM:SS[.fff][Z]': the whole-second part is cached
+        base = _second_cache.get(value[:19])
+        if base is not None:
+            fraction = value[19:-1] if value.endswith('Z') else value[19:]
+            if not fraction:
+                return base
+            if fraction[0] == '.' and fraction[1:].isdigit():
+                return base + float(fraction)
+        return _parse_timestamp_slow(value)
+    if value is None:
+        return 0.0
+    return value / 1000.0 if value > 1e11 else float(value)
+
+
+def _parse_timestamp_slow(value: str) -> float:
+    if value == '':
+        return 0.0
+    try:
+        number = float(value)
+        return number / 1000.0 if number > 1e11 else number
+    except ValueError:
+        pass
+    text = value[:-1] + '+00:00' if value.endswith('Z') else value
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if len(value) >= 19 and value[10] == 'T' and parsed.utcoffset() == timedelta(0):
+        if len(_second_cache) > 4096:
+            _second_cache.clear()
+        _second_cache[value[:19]] = float(int(parsed.timestamp()))
+    return parsed.timestamp()
+
+
+def _float(data: Dict[str, Any], *keys: str) -> Optional[float]:
+    for key in keys:
+        value = data.get(key)
+        if value is not None and value != '':
+            return float(value)
+    return None
+
+
+def _int(data: Dict[str, Any], *keys: str) -> int:
+    for key in keys:
+        value = data.get(key)
+        if value is not None and value != '':
+            return int(float(value))
+    return 0
+
+
+class Tick:
+    """A matched trade (KRX tick topic)"""
+    __slots__ = ('symbol', 'price', 'quantity', 'side', 'timestamp', 'total_volume')
+    kind = TOPIC_TICK
+
+    def __init__(self, symbol: str, price: float, quantity: int, side: Optional[str],
+                 timestamp: float, total_volume: int = 0):
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.timestamp = timestamp  # Epoch seconds
+        self.total_volume = total_volume
+
+    def __repr__(self) -> str:
+        return f"Tick({self.symbol} {self.price} x {self.quantity} {self.side} @ {self.timestamp})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TopPrice:
+    """Best bid/offer levels (KRX topprice topic); levels are (price, quantity), best first"""
+    __slots__ = ('symbol', 'bids', 'offers', 'timestamp')
+    kind = TOPIC_TOP_PRICE
+
+    def __init__(self, symbol: str, bids: List[Tuple[float, int]], offers: List[Tuple[float, int]],
+                 timestamp: float):
+        self.symbol = symbol
+        self.bids = bids
+        self.offers = offers
+        self.timestamp = timestamp
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_offer(self) -> Optional[float]:
+        return self.offers[0][0] if self.offers else None
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if not self.bids or not self.offers:
+            return None
+        return (self.bids[0][0] + self.offers[0][0]) / 2
+
+    def __repr__(self) -> str:
+        return f"TopPrice({self.symbol} {self.best_bid} / {self.best_offer} @ {self.timestamp})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StockInfo:
+    """Session price summary for a symbol (KRX stockinfo topic)"""
+    __slots__ = ('symbol', 'reference_price', 'ceiling_price', 'floor_price', 'open_price',
+                 'high_price', 'low_price', 'last_price', 'total_volume', 'timestamp')
+    kind = TOPIC_STOCK_INFO
+
+    def __init__(self, symbol: str, reference_price: Optional[float], ceiling_price: Optional[float],
+                 floor_price: Optional[float], open_price: Optional[float], high_price: Optional[float],
+                 low_price: Optional[float], last_price: Optional[float], total_volume: int,
+                 timestamp: float):
+        self.symbol = symbol
+        self.reference_price = reference_price
+        self.ceiling_price = ceiling_price
+        self.floor_price = floor_price
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.last_price = last_price
+        self.total_volume = total_volume
+        self.timestamp = timestamp
+
+    def __repr__(self) -> str:
+        return f"StockInfo({self.symbol} last={self.last_price} ref={self.reference_price})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class OHLCBar:
+    """A candle (KRX v2/ohlc topics); `time` is the bar open in epoch seconds"""
+    __slots__ = ('symbol', 'resolution', 'time', 'open', 'high', 'low', 'close', 'volume')
+    kind = TOPIC_OHLC
+
+    def __init__(self, symbol: str, resolution: str, time: float, open: float, high: float,
+                 low: float, close: float, volume: int):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __repr__(self) -> str:
+        return (f"OHLCBar({self.symbol} {self.resolution} @ {self.time} "
+                f"O={self.open} H={self.high} L={self.low} C={self.close} V={self.volume})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+MarketRecord = Union[Tick, TopPrice, StockInfo, OHLCBar]
+
+
+def _levels(entries: Any) -> List[Tuple[float, int]]:
+    levels = []
+    for entry in entries or ():
+        if isinstance(entry, dict):
+            price = entry.get('price')
+            quantity = entry.get('qtty', entry.get('quantity', 0))
+        else:
+            price, quantity = entry[0], entry[1]
+        if price:
+            levels.append((float(price), int(float(quantity or 0))))
+    return levels
+
+
+def _symbol(data: Dict[str, Any], topic: str) -> str:
+    return data.get('symbol') or topic.rsplit('/', 1)[-1]
+
+
+def decode_tick(data: Dict[str, Any], topic: str = '') -> Tick:
+    try:
+        # Documented KRX field names first, generic fallbacks otherwise
+        price = float(data['matchPrice'])
+        quantity = int(data['matchQtty'])
+    except (KeyError, TypeError, ValueError):
+        price = _float(data, 'matchPrice', 'price', 'lastPrice')
+        if price is None:
+            raise ValueError("Tick payload has no match price")
+        quantity = _int(data, 'matchQtty', 'matchQuantity', 'quantity')
+    return Tick(
+        data.get('symbol') or topic.rsplit('/', 1)[-1],
+        price,
+        quantity,
+        data.get('side'),
+        parse_timestamp(data.get('sendingTime') or data.get('time')),
+        int(data.get('totalVolumeTraded') or data.get('totalVolume') or 0)
+    )
+
+
+def decode_top_price(data: Dict[str, Any], topic: str = '') -> TopPrice:
+    return TopPrice(
+        symbol=_symbol(data, topic),
+        bids=_levels(data.get('bid', data.get('bids'))),
+        offers=_levels(data.get('offer', data.get('asks'))),
+        timestamp=parse_timestamp(data.get('sendingTime', data.get('time')))
+    )
+
+
+def decode_stock_info(data: Dict[str, Any], topic: str = '') -> StockInfo:
+    return StockInfo(
+        symbol=_symbol(data, topic),
+        reference_price=_float(data, 'referencePrice', 'basicPrice', 'refPrice'),
+        ceiling_price=_float(data, 'ceilingPrice'),
+        floor_price=_float(data, 'floorPrice'),
+        open_price=_float(data, 'openPrice'),
+        high_price=_float(data, 'highestPrice', 'highPrice'),
+        low_price=_float(data, 'lowestPrice', 'lowPrice'),
+        last_price=_float(data, 'matchPrice', 'lastPrice', 'closePrice'),
+        total_volume=_int(data, 'totalVolumeTraded', 'totalVolume'),
+        timestamp=parse_timestamp(data.get('sendingTime', data.get('time')))
+    )
+
+
+def decode_ohlc(data: Dict[str, Any], topic: str = '') -> OHLCBar:
+    resolution = data.get('resolution')
+    if resolution is None and topic:
+        parts = topic.rsplit('/', 2)
+        resolution = parts[-2] if len(parts) == 3 else ''
+    return OHLCBar(
+        symbol=_symbol(data, topic),
+        resolution=str(resolution),
+        time=parse_timestamp(data.get('time')),
+        open=_float(data, 'open'),
+        high=_float(data, 'high'),
+        low=_float(data, 'low'),
+        close=_float(data, 'close'),
+        volume=_int(data, 'volume')
+    )
+
+
+_DECODERS = {
+    TOPIC_TICK: decode_tick,
+    TOPIC_TOP_PRICE: decode_top_price,
+    TOPIC_STOCK_INFO: decode_stock_info,
+    TOPIC_OHLC: decode_ohlc,
+}
+
+
+_topic_decoders: Dict[str, Any] = {}
+
+
+def decode_message(topic: str, payload: Union[bytes, str]) -> Union[MarketRecord, Any]:
+    """
+    Decode an MQTT message.
+
+    KRX tick/topprice/stockinfo/ohlc payloads become typed records; payloads on
+    any other topic are returned as parsed JSON.
+
+    Raises:
+        ValueError: If the payload is not valid JSON or lacks required fields
+    """
+    data = loads(payload)
+    try:
+        decoder = _topic_decoders[topic]
+    except KeyError:
+        decoder = _DECODERS.get(topic_kind(topic))
+        if len(_topic_decoders) < 10000:
+            _topic_decoders[topic] = decoder
+    if decoder is None or data.__class__ is not dict:
+        return data
+    try:
+        return decoder(data, topic)
+    except (TypeError, KeyError) as e:
+        raise ValueError(f"Malformed {topic_kind(topic)} payload: {e}") from e
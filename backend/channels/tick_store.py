@@ -0,0 +1,591 @@
+"""
+Tick Store
+==========
+
+Append-only columnar storage for KRX market data. Each trading day and symbol
+gets a directory, and each record kind stores one flat file per column:
+
+    <root>/<YYYY-MM-DD>/<SYMBOL>/tick.timestamp
+    <root>/<YYYY-MM-DD>/<SYMBOL>/tick.price
+    ...
+
+A column file is a headerless little-endian array of the column's dtype.
+Appending a batch is one write per column, and a day of ticks can be
+memory-mapped with ``numpy.memmap`` and sliced without any parsing.
+Timestamps are kept non-decreasing (a late one is clamped to its
+predecessor), so time ranges are found by binary search. The columns are
+written one after another, so a crash can leave some of them one batch
+longer than the others. Readers use the shortest column's length, and
+writers truncate the longer columns to it before they append.
+
+TickRecorder subscribes to tick and top-of-book topics through a
+MarketDataHub. It buffers rows in memory and writes them from a background
+thread. It fsyncs in batches every ``fsync_interval`` seconds, never once per
+tick. TickStore memory-maps the recorded days and answers time-range
+queries for ticks, best bid/offer and OHLCV bars.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .market_data_hub import HubSubscription, MarketDataHub
+from .tick_decoder import (
+    KRX_TOPIC_PREFIX, TOPIC_TICK, TOPIC_TOP_PRICE, OHLCBar, Tick, TopPrice, tick_topic, top_price_topic
+)
+
+logger = logging.getLogger(__name__)
+
+# Trading days are calendar days in Vietnam time
+MARKET_TIMEZONE = timezone(timedelta(hours=7))
+
+# Bar resolutions aggregated from ticks, in seconds
+BAR_RESOLUTIONS = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+# Column name and dtype of every stored record kind
+SCHEMAS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    TOPIC_TICK: (
+        ('timestamp', '<f8'),
+        ('price', '<f8'),
+        ('quantity', '<i8'),
+        ('side', '<i1'),
+        ('total_volume', '<i8'),
+    ),
+    TOPIC_TOP_PRICE: (
+        ('timestamp', '<f8'),
+        ('bid_price', '<f8'),
+        ('bid_quantity', '<i8'),
+        ('offer_price', '<f8'),
+        ('offer_quantity', '<i8'),
+    ),
+}
+
+# Finished bars are stored in the order they are published: a correction of an
+# earlier bar is appended after it, so rows are indexed by publish time and a
+# later row for the same bar time replaces an earlier one
+BAR_SCHEMA = (
+    ('timestamp', '<f8'),  # Publish time
+    ('time', '<f8'),  # Bar open time
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<i8'),
+)
+
+
+def bar_kind(resolution: str) -> str:
+    """Stored record kind of bars of a resolution"""
+    return f"bars_{resolution}"
+
+
+SCHEMAS.update({bar_kind(resolution): BAR_SCHEMA for resolution in BAR_RESOLUTIONS})
+
+# Tick.side is stored as a signed byte
+SIDE_CODES = {'BUY': 1, 'SELL': -1}
+SIDE_NAMES = {code: side for side, code in SIDE_CODES.items()}
+
+# Wildcards recording every symbol
+ALL_SYMBOLS_TOPICS = {
+    TOPIC_TICK: f"{KRX_TOPIC_PREFIX}tick/v1/roundlot/symbol/+",
+    TOPIC_TOP_PRICE: f"{KRX_TOPIC_PREFIX}topprice/v1/roundlot/symbol/+",
+}
+SYMBOL_TOPICS = {
+    TOPIC_TICK: tick_topic,
+    TOPIC_TOP_PRICE: top_price_topic,
+}
+
+
+def trading_day(timestamp: float) -> str:
+    """The trading day (YYYY-MM-DD, Vietnam time) an epoch timestamp belongs to"""
+    return datetime.fromtimestamp(timestamp, MARKET_TIMEZONE).strftime('%Y-%m-%d')
+
+
+def column_path(root: str, day: str, symbol: str, kind: str, column: str) -> str:
+    return os.path.join(root, day, symbol, f"{kind}.{column}")
+
+
+def stored_rows(root: str, day: str, symbol: str, kind: str) -> int:
+    """Complete rows stored for a day, symbol and kind (the shortest column's length)"""
+    rows = None
+    for column, dtype in SCHEMAS[kind]:
+        path = column_path(root, day, symbol, kind, column)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // np.dtype(dtype).itemsize
+        rows = count if rows is None else min(rows, count)
+    return rows or 0
+
+
+def record_row(record: Any) -> Optional[Tuple[str, Tuple]]:
+    """(kind, column values) of a decoded record, or None if the kind is not stored"""
+    if isinstance(record, Tick):
+        return TOPIC_TICK, (record.timestamp, record.price, record.quantity,
+                            SIDE_CODES.get(record.side, 0), record.total_volume)
+    if isinstance(record, TopPrice):
+        bid_price, bid_quantity = record.bids[0] if record.bids else (np.nan, 0)
+        offer_price, offer_quantity = record.offers[0] if record.offers else (np.nan, 0)
+        return TOPIC_TOP_PRICE, (record.timestamp, bid_price, bid_quantity, offer_price, offer_quantity)
+    if isinstance(record, OHLCBar) and record.resolution in BAR_RESOLUTIONS:
+        return bar_kind(record.resolution), (time.time(), record.time, record.open, record.high, record.low,
+                                             record.close, record.volume)
+    return None
+
+
+class ColumnarSegment:
+    """
+    The column files of one trading day, symbol and kind, opened for appending.
+    Rows left over from an interrupted write are truncated when it is opened.
+    """
+
+    def __init__(self, root: str, day: str, symbol: str, kind: str):
+        self.day = day
+        self.symbol = symbol
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        self.directory = os.path.join(root, day, symbol)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.rows = stored_rows(root, day, symbol, kind)
+        self._files = []
+        for column, dtype in self.schema:
+            path = column_path(root, day, symbol, kind, column)
+            f = open(path, 'ab')
+            if f.tell() != self.rows * np.dtype(dtype).itemsize:
+                logger.warning(f"Truncating partial rows in {path}")
+                f.truncate(self.rows * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+            self._files.append(f)
+        self._dirty = False
+        self.last_timestamp = -np.inf
+        if self.rows:
+            timestamps = np.memmap(column_path(root, day, symbol, kind, 'timestamp'), dtype='<f8', mode='r',
+                                   shape=(self.rows,))
+            self.last_timestamp = float(timestamps[-1])
+            del timestamps
+
+    def append(self, rows: List[Tuple]) -> int:
+        """Append rows (tuples in schema order); returns the number of bytes written"""
+        written = 0
+        for i, (f, values, (_, dtype)) in enumerate(zip(self._files, zip(*rows), self.schema)):
+            array = np.asarray(values, dtype=dtype)
+            if i == 0:
+                # Timestamps are kept non-decreasing so readers can binary-search them
+                array = np.maximum.accumulate(np.maximum(array, self.last_timestamp))
+                self.last_timestamp = float(array[-1])
+            data = array.tobytes()
+            f.write(data)
+            written += len(data)
+        self.rows += len(rows)
+        self._dirty = True
+        return written
+
+    def sync(self) -> bool:
+        """Flush and fsync the column files; False if nothing was written since the last sync"""
+        if not self._dirty:
+            return False
+        for f in self._files:
+            f.flush()
+            os.fsync(f.fileno())
+        self._dirty = False
+        return True
+
+    def close(self) -> bool:
+        """fsync and close the column files; returns whether an fsync was needed"""
+        synced = self.sync()
+        for f in self._files:
+            f.close()
+        self._files = []
+        return synced
+
+
+class TickRecorder:
+    """
+    Records decoded KRX ticks and best bid/offer under `root` (see the module docstring).
+
+    record() is cheap and can be called from the market data dispatch thread.
+    Rows are written by a background thread every `flush_interval` seconds,
+    or sooner when `max_pending_rows` are waiting. Files are fsynced every
+    `fsync_interval` seconds, and on stop().
+
+    Args:
+        root: Directory holding one subdirectory per trading day
+    """
+
+    def __init__(self, root: str, flush_interval: float = 1.0, fsync_interval: float = 5.0,
+                 max_pending_rows: int = 50000):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_pending_rows = max_pending_rows
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()  # Serializes flush() between the writer thread and callers
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[Tuple[str, str, str], List[Tuple]] = {}  # (day, symbol, kind) -> rows
+        self._pending_rows = 0
+        self._segments: Dict[Tuple[str, str, str], ColumnarSegment] = {}
+        self._last_sync = time.monotonic()
+        self._hub: Optional[MarketDataHub] = None
+        self._subscriptions: List[HubSubscription] = []
+
+        # Metrics
+        self.rows_recorded = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.errors = 0
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Unsubscribe, write everything pending, fsync and close the files"""
+        self.detach()
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush(sync=True)
+        with self._write_lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+    # --- Subscriptions ---
+
+    def attach(self, hub: MarketDataHub, symbols: Optional[Iterable[str]] = None,
+               kinds: Iterable[str] = (TOPIC_TICK, TOPIC_TOP_PRICE)) -> None:
+        """Record `symbols` (every symbol if None) from a market data hub"""
+        self._hub = hub
+        for kind in kinds:
+            if symbols is None:
+                self._subscriptions.append(hub.subscribe(ALL_SYMBOLS_TOPICS[kind], self._on_message))
+            else:
+                for symbol in symbols:
+                    self._subscriptions.append(hub.subscribe(SYMBOL_TOPICS[kind](symbol), self._on_message))
+
+    def detach(self) -> None:
+        if self._hub:
+            for subscription in self._subscriptions:
+                self._hub.unsubscribe(subscription)
+        self._subscriptions.clear()
+        self._hub = None
+
+    def _on_message(self, topic: str, record: Any) -> None:
+        self.record(record)
+
+    # --- Recording ---
+
+    def record(self, record: Any) -> None:
+        """Queue a decoded Tick, TopPrice or finished OHLCBar for writing (other records are ignored)"""
+        row = record_row(record)
+        if row is None or not row[1][0]:
+            return
+        kind, values = row
+        # Bars are filed under the day they cover, whenever they are published
+        day = trading_day(record.time if isinstance(record, OHLCBar) else values[0])
+        key = (day, record.symbol, kind)
+        with self._lock:
+            self._pending.setdefault(key, []).append(values)
+            self._pending_rows += 1
+            self.rows_recorded += 1
+            if self._pending_rows >= self.max_pending_rows:
+                self._wakeup.set()
+
+    def flush(self, sync: bool = False) -> int:
+        """Write pending rows; fsync as well if `sync` or the fsync interval has elapsed"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_rows = 0
+        with self._write_lock:
+            written = 0
+            for key, rows in pending.items():
+                try:
+                    segment = self._segments.get(key)
+                    if segment is None:
+                        segment = self._open_segment(key)
+                    self.bytes_written += segment.append(rows)
+                    written += len(rows)
+                except (OSError, ValueError) as e:
+                    self.errors += 1
+                    self.rows_dropped += len(rows)
+                    logger.error(f"Failed to record {len(rows)} {key[2]} rows for {key[1]} on {key[0]}: {e}")
+            if written:
+                self.rows_written += written
+                self.flushes += 1
+
+            if sync or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            return written
+
+    def _open_segment(self, key: Tuple[str, str, str]) -> ColumnarSegment:
+        day = key[0]
+        # A new trading day: earlier days are complete, close their files
+        for old_key in [k for k in self._segments if k[0] < day]:
+            if self._segments.pop(old_key).close():
+                self.fsyncs += 1
+        segment = self._segments[key] = ColumnarSegment(self.root, *key)
+        return segment
+
+    def _sync(self) -> None:
+        for segment in self._segments.values():
+            try:
+                if segment.sync():
+                    self.fsyncs += 1
+            except OSError as e:
+                self.errors += 1
+                logger.error(f"Failed to fsync {segment.directory}: {e}")
+        self._last_sync = time.monotonic()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self._pending_rows
+        return {
+            'root': self.root,
+            'recording': bool(self._thread and self._thread.is_alive()),
+            'subscriptions': len(self._subscriptions),
+            'open_segments': len(self._segments),
+            'pending_rows': pending,
+            'rows_recorded': self.rows_recorded,
+            'rows_written': self.rows_written,
+            'rows_dropped': self.rows_dropped,
+            'bytes_written': self.bytes_written,
+            'flushes': self.flushes,
+            'fsyncs': self.fsyncs,
+            'errors': self.errors
+        }
+
+
+# Bars are aligned to Vietnam time, so daily bars start at local midnight
+MARKET_UTC_OFFSET = int(MARKET_TIMEZONE.utcoffset(None).total_seconds())
+
+BAR_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+
+def bar_start(timestamps: Any, seconds: int) -> Any:
+    """Open time of the bar of `seconds` each timestamp falls into (scalar or array)"""
+    return (np.floor((np.asarray(timestamps) + MARKET_UTC_OFFSET) / seconds) * seconds - MARKET_UTC_OFFSET)
+
+
+def aggregate_bars(timestamps: np.ndarray, prices: np.ndarray, quantities: np.ndarray,
+                   seconds: int) -> Dict[str, np.ndarray]:
+    """OHLCV bars of `seconds` from time-ordered ticks; bars without ticks are omitted"""
+    if not len(timestamps):
+        return {column: np.empty(0) for column in BAR_COLUMNS}
+    buckets = bar_start(timestamps, seconds)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {
+        'time': buckets[starts],
+        'open': prices[starts],
+        'high': np.maximum.reduceat(prices, starts),
+        'low': np.minimum.reduceat(prices, starts),
+        'close': prices[ends],
+        'volume': np.add.reduceat(quantities, starts),
+    }
+
+
+class TickStore:
+    """
+    Read-only access to recorded market data through memory maps.
+
+    Queries binary-search the timestamp column of each day and return views
+    into the mapped files, so only the pages a query touches are read from
+    disk. Maps are cached per day, symbol and kind (`max_open` of them), and a
+    day still being recorded is remapped when it has grown.
+    """
+
+    def __init__(self, root: str, max_open: int = 64):
+        self.root = root
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._maps: 'OrderedDict[Tuple[str, str, str], Tuple[int, Dict[str, np.ndarray]]]' = OrderedDict()
+
+    def days(self, symbol: Optional[str] = None) -> List[str]:
+        """Recorded trading days (YYYY-MM-DD), oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        days = sorted(day for day in os.listdir(self.root) if len(day) == 10 and day[4] == '-')
+        if symbol is not None:
+            days = [day for day in days if os.path.isdir(os.path.join(self.root, day, symbol))]
+        return days
+
+    def symbols(self, day: Optional[str] = None) -> List[str]:
+        """Symbols recorded on `day` (on any day if None)"""
+        symbols = set()
+        for d in ([day] if day else self.days()):
+            directory = os.path.join(self.root, d)
+            if os.path.isdir(directory):
+                symbols.update(os.listdir(directory))
+        return sorted(symbols)
+
+    def columns(self, day: str, symbol: str, kind: str = TOPIC_TICK) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column of a day (empty arrays if nothing is recorded)"""
+        key = (day, symbol, kind)
+        rows = stored_rows(self.root, day, symbol, kind)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == rows:
+                self._maps.move_to_end(key)
+                return cached[1]
+
+        arrays = {}
+        for column, dtype in SCHEMAS[kind]:
+            if rows:
+                arrays[column] = np.memmap(column_path(self.root, day, symbol, kind, column),
+                                           dtype=dtype, mode='r', shape=(rows,))
+            else:
+                arrays[column] = np.empty(0, dtype=dtype)
+
+        with self._lock:
+            self._maps[key] = (rows, arrays)
+            self._maps.move_to_end(key)
+            while len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        return arrays
+
+    def iter_chunks(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None,
+                    kind: str = TOPIC_TICK, reverse: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Rows with start <= timestamp < end, one day at a time (newest day first
+        if `reverse`), as views into the mapped files (nothing is copied)
+        """
+        first = trading_day(start) if start is not None else None
+        last = trading_day(end) if end is not None else None
+        days = self.days(symbol)
+        for day in (reversed(days) if reverse else days):
+            if (first and day < first) or (last and day > last):
+                continue
+            arrays = self.columns(day, symbol, kind)
+            timestamps = arrays['timestamp']
+            lo = int(np.searchsorted(timestamps, start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, side='left')) if end is not None else len(timestamps)
+            if hi > lo:
+                yield {column: values[lo:hi] for column, values in arrays.items()}
+
+    def query(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None,
+              kind: str = TOPIC_TICK, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows with start <= timestamp < end. A single day is returned as views;
+        a range spanning days is concatenated, which copies only the selected rows.
+        """
+        names = list(columns) if columns else [column for column, _ in SCHEMAS[kind]]
+        chunks = list(self.iter_chunks(symbol, start, end, kind))
+        if len(chunks) == 1:
+            return {name: chunks[0][name] for name in names}
+        dtypes = dict(SCHEMAS[kind])
+        return {
+            name: np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.empty(0, dtype=dtypes[name])
+            for name in names
+        }
+
+    def latest(self, symbol: str, limit: int, start: Optional[float] = None, end: Optional[float] = None,
+               kind: str = TOPIC_TICK) -> Tuple[Dict[str, np.ndarray], bool]:
+        """
+        The last `limit` rows with start <= timestamp < end, and whether older
+        rows in the range were left out. Days are read newest first and only
+        until `limit` rows are collected, so only the returned rows are copied.
+        """
+        chunks = []
+        collected = 0
+        truncated = False
+        for chunk in self.iter_chunks(symbol, start, end, kind, reverse=True):
+            if collected >= limit:
+                truncated = True
+                break
+            rows = len(chunk['timestamp'])
+            if collected + rows > limit:
+                chunk = {column: values[rows - (limit - collected):] for column, values in chunk.items()}
+                rows = limit - collected
+                truncated = True
+            chunks.append(chunk)
+            collected += rows
+        chunks.reverse()
+        if len(chunks) == 1:
+            return chunks[0], truncated
+        return {
+            column: np.concatenate([chunk[column] for chunk in chunks]) if chunks else np.empty(0, dtype=dtype)
+            for column, dtype in SCHEMAS[kind]
+        }, truncated
+
+    def bars(self, symbol: str, resolution: str = '1m', start: Optional[float] = None,
+             end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """OHLCV bars aggregated from recorded ticks (resolutions: see BAR_RESOLUTIONS)"""
+        if resolution not in BAR_RESOLUTIONS:
+            raise ValueError(f"Unsupported bar resolution: {resolution}")
+        seconds = BAR_RESOLUTIONS[resolution]
+        # Bar boundaries never cross trading days, so each day is aggregated on its own
+        parts = [
+            aggregate_bars(chunk['timestamp'], chunk['price'], chunk['quantity'], seconds)
+            for chunk in self.iter_chunks(symbol, start, end)
+        ]
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            column: np.concatenate([part[column] for part in parts]) if parts else np.empty(0)
+            for column in BAR_COLUMNS
+        }
+
+    def recorded_bars(self, symbol: str, resolution: str, start: Optional[float] = None,
+                      end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Bars published by a BarAggregator and recorded, with start <= time < end,
+        in time order with corrections applied
+        """
+        kind = bar_kind(resolution)
+        if kind not in SCHEMAS:
+            raise ValueError(f"Unsupported bar resolution: {resolution}")
+        first = trading_day(start) if start is not None else None
+        last = trading_day(end) if end is not None else None
+        chunks = [
+            self.columns(day, symbol, kind) for day in self.days(symbol)
+            if not (first and day < first) and not (last and day > last)
+        ]
+        rows = {column: np.concatenate([chunk[column] for chunk in chunks]) if chunks else np.empty(0)
+                for column in BAR_COLUMNS}
+        # Keep the last row recorded for each bar time
+        order = np.argsort(rows['time'], kind='stable')
+        times = rows['time'][order]
+        keep = order[np.r_[times[1:] != times[:-1], True]] if len(times) else order
+        if start is not None:
+            keep = keep[rows['time'][keep] >= start]
+        if end is not None:
+            keep = keep[rows['time'][keep] < end]
+        return {column: rows[column][keep] for column in BAR_COLUMNS}
+
+    def close(self) -> None:
+        """Drop cached maps (they are unmapped once no returned view references them)"""
+        with self._lock:
+            self._maps.clear()
@@ -0,0 +1,329 @@
+# async_dnse_client.py
+# An asyncio-native Python client for the DNSE LightSpeed API.
+#
+# Mirrors the method surface of cli/dnse_client_v2.DNSEClient, but every REST call
+# is a coroutine running on aiohttp with its own keep-alive connection pool, so
+# callers can await hundreds of in-flight requests without an executor thread
+# per call. Endpoints and payloads come from cli/dnse_api and market data (MQTT)
+# support from MarketDataMixin, both shared with the blocking client.
+#
+# Required Libraries:
+# pip install aiohttp paho-mqtt
+
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+from channels.dispatch import OVERFLOW_DROP_OLDEST
+from cli import dnse_api
+from cli.dnse_api import BASE_API_URL
+from cli.dnse_client_v2 import MarketDataMixin
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDNSEClient(MarketDataMixin):
+    """
+    An asyncio client for interacting with the DNSE LightSpeed API.
+
+    Usage:
+        async with AsyncDNSEClient(username, password) as client:
+            await client.login()
+            await client.verify_email_otp(otp)
+            orders = await asyncio.gather(*(client.place_order(...) for ...))
+    """
+
+    def __init__(self, username, password, pool_size=200, pool_size_per_host=100,
+                 keepalive_timeout=30, timeout=15, dispatch_queue_size=10000,
+                 dispatch_overflow=OVERFLOW_DROP_OLDEST):
+        """
+        Initializes the AsyncDNSEClient.
+
+        Args:
+            username (str): Your DNSE login username (email, phone, or custody code).
+            password (str): Your DNSE login password.
+            pool_size (int): Maximum number of simultaneous connections.
+            pool_size_per_host (int): Maximum number of simultaneous connections to one host.
+            keepalive_timeout (float): Seconds an idle connection is kept open for reuse.
+            timeout (float): Total timeout of a single request in seconds.
+            dispatch_queue_size (int): Maximum market data messages waiting for callbacks.
+            dispatch_overflow (str): 'drop_oldest' or 'conflate' (keep the latest message per topic).
+        """
+        if not username or not password:
+            raise ValueError("Username and password must be provided.")
+
+        self.username = username
+        self.password = password
+        self.jwt_token = None
+        self.trading_token = None
+        self.investor_id = None
+        self.account_info = {}
+
+        # HTTP connection pool, created lazily inside the running event loop
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session = None
+        self._in_flight = 0
+        self._requests = 0
+
+        # MQTT client for market data
+        self._init_market_data(dispatch_queue_size, dispatch_overflow)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # --- Private Helper Methods ---
+
+    def _get_session(self):
+        """Returns the pooled aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    @staticmethod
+    def _prepare_params(params):
+        """Converts query parameters into a form aiohttp accepts (no bools, lists repeated)."""
+        if not params:
+            return None
+        prepared = []
+        for key, value in params.items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for item in values:
+                if isinstance(item, bool):
+                    item = str(item).lower()
+                prepared.append((key, str(item)))
+        return prepared
+
+    async def _make_request(self, method, endpoint, params=None, json_data=None, headers=None):
+        """
+        A centralized coroutine for making HTTP requests to the DNSE API.
+        """
+        url = f"{BASE_API_URL}{endpoint}"
+        session = self._get_session()
+        self._in_flight += 1
+        self._requests += 1
+        try:
+            async with session.request(
+                method, url, params=self._prepare_params(params), json=json_data, headers=headers
+            ) as response:
+                text = await response.text()
+                if response.status >= 400:
+                    logger.error(f"HTTP error occurred: {response.status} {response.reason} for url: {url} - {text}")
+                    response.raise_for_status()
+                if text:
+                    return json.loads(text)
+                return {}
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+            logger.error(f"Request exception occurred: {req_err!r}")
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def _send(self, request):
+        """
+        Sends a dnse_api.ApiRequest with the tokens it needs, logging it and any failure.
+        """
+        logger.log(request.log_level, request.message)
+        try:
+            headers = dnse_api.request_headers(request, self.jwt_token, self.trading_token)
+            return await self._make_request(
+                request.method, request.endpoint, params=request.params, json_data=request.json_data, headers=headers
+            )
+        except Exception as e:
+            logger.error(f"Failed to {request.failure}: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Returns request counters and the state of the connection pool."""
+        connector = self._session.connector if self._session and not self._session.closed else None
+        return {
+            'requests': self._requests,
+            'in_flight': self._in_flight,
+            'pool_size': self.pool_size,
+            'pool_size_per_host': self.pool_size_per_host,
+            'pool_open': connector is not None and not connector.closed
+        }
+
+    async def close(self):
+        """Closes the HTTP connection pool."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # --- 1. Authentication Methods ---
+
+    async def login(self):
+        """
+        Logs into the DNSE platform to get a JWT token.
+        """
+        response = await self._send(dnse_api.login(self.username, self.password))
+        self.jwt_token = response.get('token')
+        if self.jwt_token:
+            logger.info("Login successful. JWT token obtained.")
+            await self.get_user_info()
+        else:
+            logger.error("Login failed. No token in response.")
+
+    async def get_email_otp(self):
+        """
+        Requests an OTP to be sent to the registered email address.
+        """
+        await self._send(dnse_api.email_otp())
+        logger.info("Email OTP request sent successfully. Please check your email.")
+
+    async def verify_email_otp(self, otp_code):
+        """
+        Verifies the email OTP to obtain a trading token.
+        """
+        response = await self._send(dnse_api.trading_token(otp_code))
+        self.trading_token = response.get('tradingToken')
+        if self.trading_token:
+            logger.info("Email OTP verified successfully. Trading token obtained.")
+        else:
+            logger.error("OTP verification failed. No trading token in response.")
+
+    async def verify_smart_otp(self, smart_otp_code):
+        """
+        Verifies the Smart OTP from the Entrade X app to obtain a trading token.
+        """
+        response = await self._send(dnse_api.trading_token(smart_otp_code, smart=True))
+        self.trading_token = response.get('tradingToken')
+        if self.trading_token:
+            logger.info("Smart OTP verified successfully. Trading token obtained.")
+        else:
+            logger.error("Smart OTP verification failed. No trading token in response.")
+
+    # --- 2. Account Information Methods ---
+
+    async def get_user_info(self):
+        """Retrieves primary account details for the logged-in user."""
+        self.account_info = await self._send(dnse_api.user_info())
+        self.investor_id = self.account_info.get('investorId')
+        logger.info(f"User information retrieved successfully for investor ID: {self.investor_id}")
+        return self.account_info
+
+    async def get_sub_accounts(self):
+        """Retrieves the list of trading sub-accounts."""
+        return await self._send(dnse_api.sub_accounts())
+
+    async def get_cash_balance(self, account):
+        """
+        Retrieves detailed cash balance information for a specific sub-account.
+        """
+        return await self._send(dnse_api.cash_balance(account))
+
+    # --- 3. Trading Methods (Equities & Derivatives) ---
+
+    async def get_loan_packages(self, account, derivative=False):
+        """
+        Get available margin loan packages for a sub-account.
+        """
+        return await self._send(dnse_api.loan_packages(account, derivative))
+
+    async def get_buying_power(self, account, symbol, price, loan_package_id, derivative=False):
+        """
+        Calculates buying/selling power for a given symbol and price.
+        """
+        return await self._send(dnse_api.buying_power(account, symbol, price, loan_package_id, derivative))
+
+    async def place_order(self, accountNo, symbol, side, orderType, quantity, price=None, loanPackageId=None, derivative=False):
+        """
+        Places a new order.
+        """
+        return await self._send(dnse_api.place_order(
+            accountNo, symbol, side, orderType, quantity, price, loanPackageId, derivative
+        ))
+
+    async def get_orders(self, account, derivative=False):
+        """
+        Retrieves the list of orders for a sub-account.
+        """
+        return await self._send(dnse_api.orders(account, derivative))
+
+    async def get_order_details(self, order_id, account, derivative=False):
+        """
+        Retrieves details for a single order by its ID.
+        """
+        return await self._send(dnse_api.order_details(order_id, account, derivative))
+
+    async def cancel_order(self, order_id, account, derivative=False):
+        """
+        Cancels an open order.
+        """
+        return await self._send(dnse_api.cancel_order(order_id, account, derivative))
+
+    # --- 4. Deal/Position Management ---
+
+    async def get_holding_deals(self, account, derivative=False):
+        """
+        Retrieves the list of currently held deals/positions.
+        """
+        return await self._send(dnse_api.holding_deals(account, derivative))
+
+    async def close_derivative_deal(self, deal_id):
+        """
+        Closes a derivative deal.
+        """
+        return await self._send(dnse_api.close_derivative_deal(deal_id))
+
+    # --- 5. Derivatives Risk Management ---
+
+    async def configure_sl_tp_by_deal(self, deal_id, config_payload):
+        """
+        Sets stop-loss/take-profit parameters for a specific derivative deal.
+        """
+        return await self._send(dnse_api.sl_tp_by_deal(deal_id, config_payload))
+
+    async def configure_sl_tp_by_account(self, account_no, config_payload):
+        """
+        Sets stop-loss/take-profit parameters for an entire derivative account.
+        """
+        return await self._send(dnse_api.sl_tp_by_account(account_no, config_payload))
+
+    # --- 6. Conditional Orders ---
+
+    async def place_conditional_order(self, order_payload):
+        """
+        Places a new conditional order.
+        """
+        return await self._send(dnse_api.place_conditional_order(order_payload))
+
+    async def get_conditional_orders(self, account_no, daily=False, from_date=None, to_date=None, status=None, symbol=None, market_id=None):
+        """
+        Retrieves a list of conditional orders.
+        """
+        return await self._send(dnse_api.conditional_orders(
+            account_no, daily, from_date, to_date, status, symbol, market_id
+        ))
+
+    async def get_conditional_order_details(self, order_id):
+        """
+        Retrieves details for a single conditional order.
+        """
+        return await self._send(dnse_api.conditional_order_details(order_id))
+
+    async def cancel_conditional_order(self, order_id):
+        """
+        Cancels a conditional order.
+        """
+        return await self._send(dnse_api.cancel_conditional_order(order_id))
@@ -0,0 +1,170 @@
+# dnse_api.py
+# Endpoints, query parameters and payloads of the DNSE LightSpeed REST API.
+#
+# Shared by the blocking client (cli/dnse_client_v2.DNSEClient) and the asyncio
+# client (cli/async_dnse_client.AsyncDNSEClient): each function describes one
+# call as an ApiRequest, and the clients only differ in how they send it.
+
+import logging
+from collections import namedtuple
+
+# Base URL for the DNSE RESTful Trading API
+BASE_API_URL = "https://api.dnse.com.vn"
+
+# Token a request needs: none, the JWT, or the JWT plus the trading token
+AUTH_NONE = None
+AUTH_JWT = 'jwt'
+AUTH_TRADING = 'trading'
+
+# method, endpoint, params, json_data: what is sent
+# auth: AUTH_NONE, AUTH_JWT or AUTH_TRADING; headers: extra headers (e.g. the OTP)
+# message: logged before sending; failure: logged as "Failed to <failure>: <error>"
+ApiRequest = namedtuple(
+    'ApiRequest',
+    'method endpoint params json_data auth headers message failure log_level'
+)
+
+def _request(method, endpoint, message, failure, params=None, json_data=None, auth=AUTH_JWT,
+             headers=None, log_level=logging.INFO):
+    return ApiRequest(method, endpoint, params, json_data, auth, headers, message, failure, log_level)
+
+def _orders_endpoint(derivative):
+    return f"/order-service/{'derivative/orders' if derivative else 'v2/orders'}"
+
+def _kind(derivative):
+    return 'derivative' if derivative else 'equity'
+
+def request_headers(request, jwt_token, trading_token):
+    """Returns the HTTP headers of a request, or raises PermissionError if a token is missing."""
+    headers = {}
+    if request.auth is not AUTH_NONE:
+        if not jwt_token:
+            raise PermissionError("Not logged in. Please call login() first.")
+        headers = {'Authorization': f'Bearer {jwt_token}', 'Content-Type': 'application/json'}
+        if request.auth == AUTH_TRADING:
+            if not trading_token:
+                raise PermissionError("Trading token not available. Please verify OTP first.")
+            headers['trading-token'] = trading_token
+    if request.headers:
+        headers.update(request.headers)
+    return headers or None
+
+# --- 1. Authentication ---
+
+def login(username, password):
+    return _request('POST', "/auth-service/login", "Attempting to log in...", "log in",
+                    json_data={"username": username, "password": password}, auth=AUTH_NONE)
+
+def email_otp():
+    return _request('GET', "/auth-service/api/email-otp", "Requesting email OTP...", "request email OTP")
+
+def trading_token(otp_code, smart=False):
+    """Trading token from an email OTP, or from the Entrade X Smart OTP with smart=True."""
+    kind = 'Smart OTP' if smart else 'email OTP'
+    return _request('POST', "/order-service/trading-token", f"Verifying {kind} to get trading token...",
+                    f"verify {kind}", headers={'smart-otp' if smart else 'otp': otp_code})
+
+# --- 2. Account Information ---
+
+def user_info():
+    return _request('GET', "/user-service/api/me", "Fetching user information...", "get user information")
+
+def sub_accounts():
+    return _request('GET', "/order-service/accounts", "Fetching sub-accounts...", "get sub-accounts")
+
+def cash_balance(account):
+    return _request('GET', f"/order-service/account-balances/{account}",
+                    f"Fetching cash balance for account: {account}...",
+                    f"get cash balance for account {account}")
+
+# --- 3. Trading (Equities & Derivatives) ---
+
+def loan_packages(account, derivative=False):
+    suffix = "derivative-loan-packages" if derivative else "loan-packages"
+    return _request('GET', f"/order-service/accounts/{account}/{suffix}",
+                    f"Fetching {_kind(derivative)} loan packages for account: {account}...", "get loan packages")
+
+def buying_power(account, symbol, price, loan_package_id, derivative=False):
+    suffix = "derivative-ppse" if derivative else "ppse"
+    return _request('GET', f"/order-service/accounts/{account}/{suffix}",
+                    f"Fetching buying power for {symbol} at price {price}...", "get buying power",
+                    params={"symbol": symbol, "price": price, "loanPackageId": loan_package_id})
+
+def place_order(accountNo, symbol, side, orderType, quantity, price=None, loanPackageId=None, derivative=False):
+    payload = {"symbol": symbol, "side": side, "orderType": orderType, "quantity": quantity, "accountNo": accountNo}
+    if price is not None: payload["price"] = price
+    if loanPackageId is not None: payload["loanPackageId"] = loanPackageId
+    return _request('POST', _orders_endpoint(derivative),
+                    f"Placing {_kind(derivative)} order: {side} {quantity} {symbol}@{price if price else orderType}",
+                    "place order", json_data=payload, auth=AUTH_TRADING)
+
+def orders(account, derivative=False):
+    # Polled by the strategies, so only logged at debug level
+    return _request('GET', _orders_endpoint(derivative),
+                    f"Fetching {_kind(derivative)} order list for account {account}...", "get orders",
+                    params={"accountNo": account}, log_level=logging.DEBUG)
+
+def order_details(order_id, account, derivative=False):
+    return _request('GET', f"{_orders_endpoint(derivative)}/{order_id}",
+                    f"Fetching details for order ID: {order_id}...", f"get order details for {order_id}",
+                    params={"accountNo": account})
+
+def cancel_order(order_id, account, derivative=False):
+    return _request('DELETE', f"{_orders_endpoint(derivative)}/{order_id}",
+                    f"Cancelling order ID: {order_id}...", f"cancel order {order_id}",
+                    params={"accountNo": account}, auth=AUTH_TRADING)
+
+# --- 4. Deal/Position Management ---
+
+def holding_deals(account, derivative=False):
+    service = "derivative-core" if derivative else "deal-service"
+    return _request('GET', f"/{service}/deals",
+                    f"Fetching {_kind(derivative)} holding deals for account {account}...", "get holding deals",
+                    params={"accountNo": account})
+
+def close_derivative_deal(deal_id):
+    return _request('POST', f"/derivative-core/deals/{deal_id}/close",
+                    f"Closing derivative deal ID: {deal_id}...", f"close derivative deal {deal_id}",
+                    auth=AUTH_TRADING)
+
+# --- 5. Derivatives Risk Management ---
+
+def sl_tp_by_deal(deal_id, config_payload):
+    return _request('POST', f"/derivative-deal-risk/pnl-configs/{deal_id}",
+                    f"Configuring SL/TP for deal ID: {deal_id}...", f"configure SL/TP for deal {deal_id}",
+                    json_data=config_payload, auth=AUTH_TRADING)
+
+def sl_tp_by_account(account_no, config_payload):
+    return _request('PATCH', f"/derivative-deal-risk/account-pnl-configs/{account_no}",
+                    f"Configuring SL/TP for account: {account_no}...", f"configure SL/TP for account {account_no}",
+                    json_data=config_payload, auth=AUTH_TRADING)
+
+# --- 6. Conditional Orders ---
+# The docs are ambiguous about the token these need; the trading token is assumed for safety.
+
+def place_conditional_order(order_payload):
+    return _request('POST', "/conditional-order-api/v1/orders",
+                    f"Placing conditional order for symbol: {order_payload.get('symbol')}...",
+                    "place conditional order", json_data=order_payload, auth=AUTH_TRADING)
+
+def conditional_orders(account_no, daily=False, from_date=None, to_date=None, status=None, symbol=None,
+                       market_id=None):
+    params = {"accountNo": account_no, "daily": daily}
+    if from_date: params["from"] = from_date
+    if to_date: params["to"] = to_date
+    if status: params["status"] = status
+    if symbol: params["symbol"] = symbol
+    if market_id: params["marketId"] = market_id
+    return _request('GET', "/conditional-order-api/v1/orders",
+                    f"Fetching conditional orders for account: {account_no}...", "get conditional orders",
+                    params=params)
+
+def conditional_order_details(order_id):
+    return _request('GET', f"/conditional-order-api/v1/orders/{order_id}",
+                    f"Fetching details for conditional order ID: {order_id}...",
+                    f"get conditional order details for {order_id}")
+
+def cancel_conditional_order(order_id):
+    return _request('PATCH', f"/conditional-order-api/v1/orders/{order_id}/cancel",
+                    f"Cancelling conditional order ID: {order_id}...", f"cancel conditional order {order_id}",
+                    auth=AUTH_TRADING)
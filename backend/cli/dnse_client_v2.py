@@ -11,10 +11,10 @@
 # Required Libraries:
 # pip install requests paho-mqtt
 
+import asyncio
 import requests
 import json
 import logging
-import threading
 import time
 import os
 
@@ -24,6 +24,13 @@ except ImportError:
     print("paho-mqtt library not found. Please install it using: pip install paho-mqtt")
     exit()
 
+from channels.connection_manager import GapTracker, MQTTConnectionManager, create_mqtt_client
+from channels.dispatch import OVERFLOW_DROP_OLDEST, OVERFLOW_UNBOUNDED, MessageDispatcher
+from channels.market_data_hub import is_wildcard, topic_matches
+from channels.tick_decoder import decode_message, loads as json_loads, topic_kind
+from cli import dnse_api
+from cli.dnse_api import BASE_API_URL
+
 # --- Configuration ---
 # It's recommended to use environment variables for sensitive data.
 # For example:
@@ -31,9 +38,6 @@ except ImportError:
 # export DNSE_PASSWORD="your_password"
 
 # --- Constants ---
-# Base URL for the DNSE RESTful Trading API
-BASE_API_URL = "https://api.dnse.com.vn"
-
 # Configuration for the Market Data WebSocket (MQTT)
 MARKET_DATA_HOST = "datafeed-lts-krx.dnse.com.vn"
 MARKET_DATA_PORT = 443
@@ -48,7 +52,244 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class DNSEClient:
+class MarketDataMixin:
+    """
+    Market data (MQTT over WebSocket) support shared by the DNSE clients.
+
+    Expects the host class to provide ``investor_id`` and ``jwt_token`` and to call
+    ``_init_market_data()`` from its constructor.
+    """
+
+    def _init_market_data(self, dispatch_queue_size=10000, dispatch_overflow=OVERFLOW_DROP_OLDEST):
+        """Initializes the MQTT client state."""
+        self._mqtt_client = None
+        self._connection = None  # MQTTConnectionManager running the network loop
+        self._mqtt_callbacks = {}  # topic -> callback function
+        self._typed_topics = set()  # topics whose callbacks receive decoded KRX records
+        self._wildcard_topics = []  # subscribed patterns containing '+' or '#'
+        self._topic_routes = {}  # received topic -> subscribed pattern it is delivered to
+        # The network thread only enqueues; decoding and callbacks run on the dispatch worker
+        self._dispatcher = MessageDispatcher(
+            self._deliver_message, max_size=dispatch_queue_size, overflow=dispatch_overflow
+        )
+        # Everything that is not KRX market data (order events) must never be dropped or conflated:
+        # one account topic carries updates of many orders
+        self._event_dispatcher = MessageDispatcher(
+            self._deliver_message, overflow=OVERFLOW_UNBOUNDED, name="order-event-dispatch"
+        )
+        self._topic_dispatchers = {}  # received topic -> dispatcher it is queued on
+        # Per-symbol gap detection across reconnects
+        self._gap_tracker = GapTracker()
+        self._gap_listeners = []
+        # Optional callable returning a fresh JWT for the MQTT password; defaults to login()
+        self.market_data_token_provider = None
+        self._market_data_loop = None
+
+    def _route(self, topic):
+        """Returns the subscribed topic or wildcard pattern a received topic belongs to, or None."""
+        if topic in self._mqtt_callbacks:
+            return topic
+        try:
+            return self._topic_routes[topic]
+        except KeyError:
+            pattern = next((p for p in self._wildcard_topics if topic_matches(p, topic)), None)
+            if len(self._topic_routes) < 10000:
+                self._topic_routes[topic] = pattern
+            return pattern
+
+    def _on_mqtt_message(self, client, userdata, msg):
+        """Callback for when a message is received from a subscribed topic (runs on the network thread)."""
+        if msg.topic in self._mqtt_callbacks or (self._wildcard_topics and self._route(msg.topic)):
+            self._dispatcher_for(msg.topic).submit(msg.topic, msg.payload)
+
+    def _dispatcher_for(self, topic):
+        """The bounded market data dispatcher for KRX topics, the lossless one for anything else."""
+        try:
+            return self._topic_dispatchers[topic]
+        except KeyError:
+            dispatcher = self._dispatcher if topic_kind(topic) is not None else self._event_dispatcher
+            if len(self._topic_dispatchers) < 10000:
+                self._topic_dispatchers[topic] = dispatcher
+            return dispatcher
+
+    def _deliver_message(self, topic, raw_payload):
+        """Decodes a queued message and runs its callback (runs on the dispatch worker)."""
+        pattern = self._route(topic)
+        callback = self._mqtt_callbacks.get(pattern) if pattern else None
+        if callback is None:
+            return
+        try:
+            # Parse straight from bytes; typed subscribers get KRX records instead of dicts
+            if pattern in self._typed_topics:
+                payload = decode_message(topic, raw_payload)
+            else:
+                payload = json_loads(raw_payload)
+        except ValueError:
+            logger.warning(f"Could not decode JSON from message on topic {topic}: {raw_payload}")
+            return
+
+        # KRX topics end with the symbol; report a gap before the first message after a reconnect
+        gap = self._gap_tracker.record(topic.rsplit('/', 1)[-1], getattr(payload, 'timestamp', None) or None)
+        if gap is not None:
+            logger.warning(f"Market data gap for {gap.symbol}: {gap.duration:.1f}s without updates")
+            for listener in list(self._gap_listeners):
+                try:
+                    listener(gap)
+                except Exception as e:
+                    logger.error(f"Error in market data gap listener: {e}")
+        callback(topic, payload)
+
+    def _market_data_credentials(self, refresh):
+        """MQTT username and password (the JWT), refreshing the token first if asked to."""
+        if refresh:
+            self._refresh_market_data_token()
+        return str(self.investor_id), self.jwt_token
+
+    def _refresh_market_data_token(self):
+        """Obtains a new JWT through market_data_token_provider, or by logging in again."""
+        logger.info("Refreshing market data token...")
+        try:
+            if self.market_data_token_provider:
+                self.jwt_token = self.market_data_token_provider()
+            elif not hasattr(self, 'login'):
+                raise RuntimeError("No market_data_token_provider set and this client cannot log in")
+            elif asyncio.iscoroutinefunction(self.login):
+                # Async clients log in on the event loop that owns their HTTP session
+                if self._market_data_loop is None or self._market_data_loop.is_closed():
+                    raise RuntimeError("No event loop available to refresh the token")
+                asyncio.run_coroutine_threadsafe(self.login(), self._market_data_loop).result(timeout=30)
+            else:
+                self.login()
+        except PermissionError:
+            # No new token can be had (e.g. the session expired): stop reconnecting
+            raise
+        except Exception as e:
+            # Retry with the current token; the connection manager backs off on rejection
+            logger.error(f"Failed to refresh market data token: {e}")
+
+    def connect_market_data(self):
+        """
+        Connects to the real-time market data stream.
+
+        The connection is made and kept up in the background: it reconnects with
+        exponential backoff and jitter, refreshes the JWT before it expires, and
+        resubscribes all topics at once after every reconnect.
+        """
+        if not self.investor_id or not self.jwt_token:
+            raise PermissionError("Cannot connect to market data. Please login() first.")
+        if self._connection:
+            logger.info("Market Data client is already connected.")
+            return
+
+        try:
+            self._market_data_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._market_data_loop = None
+
+        logger.info("Connecting to Market Data stream...")
+        client_id = f"dnse_client_{self.investor_id}_{int(time.time())}"
+        self._mqtt_client = create_mqtt_client(client_id, transport="websockets")
+        self._mqtt_client.ws_set_options(path=MARKET_DATA_PATH)
+        self._mqtt_client.tls_set()
+        self._mqtt_client.on_message = self._on_mqtt_message
+        self._connection = MQTTConnectionManager(
+            self._mqtt_client, MARKET_DATA_HOST, MARKET_DATA_PORT,
+            credentials=self._market_data_credentials,
+            on_connected=self._gap_tracker.mark_reconnected,
+            on_disconnected=self._gap_tracker.mark_disconnected,
+            name="market-data-mqtt"
+        )
+        for topic in self._mqtt_callbacks:
+            self._connection.subscribe(topic)
+
+        self._dispatcher.start()
+        self._event_dispatcher.start()
+        self._connection.start()
+        logger.info("Market Data connection process started in background.")
+
+    def subscribe(self, topic, callback, typed=False):
+        """
+        Subscribes to a market data topic or an MQTT wildcard pattern ('+', '#').
+
+        With typed=True, KRX tick/topprice/stockinfo/ohlc messages are passed to
+        the callback as decoded records (see channels.tick_decoder) instead of dicts.
+        """
+        if not self._connection:
+            raise ConnectionError("Market Data client not connected. Call connect_market_data() first.")
+        logger.info(f"Subscribing to topic: {topic}")
+        self._mqtt_callbacks[topic] = callback
+        if is_wildcard(topic) and topic not in self._wildcard_topics:
+            self._wildcard_topics.append(topic)
+        self._topic_routes.clear()
+        if typed:
+            self._typed_topics.add(topic)
+        else:
+            self._typed_topics.discard(topic)
+        self._connection.subscribe(topic)
+
+    def unsubscribe(self, topic):
+        """Unsubscribes from a market data topic."""
+        if not self._connection: return
+        logger.info(f"Unsubscribing from topic: {topic}")
+        if topic in self._mqtt_callbacks: del self._mqtt_callbacks[topic]
+        if topic in self._wildcard_topics: self._wildcard_topics.remove(topic)
+        self._topic_routes.clear()
+        self._typed_topics.discard(topic)
+        self._connection.unsubscribe(topic)
+
+    def add_gap_listener(self, listener):
+        """Calls listener(GapEvent) when a symbol's first message after a reconnect arrives."""
+        self._gap_listeners.append(listener)
+
+    def remove_gap_listener(self, listener):
+        if listener in self._gap_listeners:
+            self._gap_listeners.remove(listener)
+
+    def is_market_data_connected(self):
+        """Returns True while the market data connection is up."""
+        return bool(self._connection and self._connection.is_connected)
+
+    def get_dispatch_stats(self):
+        """Returns market data dispatch queue depth, drop/conflation counters and lag, plus the order event queue's."""
+        stats = self._dispatcher.get_stats()
+        stats['order_events'] = self._event_dispatcher.get_stats()
+        return stats
+
+    def get_connection_stats(self):
+        """Returns market data reconnect counters, token refreshes and stale symbols."""
+        stats = self._connection.get_stats() if self._connection else {'connected': False}
+        stats['gaps'] = self._gap_tracker.gaps
+        stats['stale_symbols'] = self._gap_tracker.stale_symbols
+        return stats
+
+    def disconnect_market_data(self):
+        """Disconnects from the market data stream gracefully."""
+        if self._connection:
+            logger.info("Disconnecting from Market Data stream.")
+            self._connection.stop()
+            self._connection = None
+        self._dispatcher.stop()
+        self._event_dispatcher.stop(drain=True)
+
+class MarketDataClient(MarketDataMixin):
+    """
+    A market data only client for callers that already hold a JWT (e.g. from a web session).
+
+    Usage:
+        client = MarketDataClient(investor_id, jwt_token)
+        client.connect_market_data()
+        client.subscribe(topic, callback, typed=True)
+    """
+
+    def __init__(self, investor_id, jwt_token, dispatch_queue_size=10000, dispatch_overflow=OVERFLOW_DROP_OLDEST):
+        if not investor_id or not jwt_token:
+            raise ValueError("Investor ID and JWT token must be provided.")
+        self.investor_id = investor_id
+        self.jwt_token = jwt_token
+        self._init_market_data(dispatch_queue_size, dispatch_overflow)
+
+
+class DNSEClient(MarketDataMixin):
     """
     A Python client for interacting with the DNSE LightSpeed API.
 
@@ -56,13 +297,15 @@ class DNSEClient:
     and a WebSocket connection for real-time market data streams via MQTT.
     """
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, dispatch_queue_size=10000, dispatch_overflow=OVERFLOW_DROP_OLDEST):
         """
         Initializes the DNSEClient.
 
         Args:
             username (str): Your DNSE login username (email, phone, or custody code).
             password (str): Your DNSE login password.
+            dispatch_queue_size (int): Maximum market data messages waiting for callbacks.
+            dispatch_overflow (str): 'drop_oldest' or 'conflate' (keep the latest message per topic).
         """
         if not username or not password:
             raise ValueError("Username and password must be provided.")
@@ -76,10 +319,7 @@ class DNSEClient:
         self.account_info = {}
 
         # MQTT client for market data
-        self._mqtt_client = None
-        self._mqtt_thread = None
-        self._is_mqtt_connected = threading.Event()
-        self._mqtt_callbacks = {}  # topic -> callback function
+        self._init_market_data(dispatch_queue_size, dispatch_overflow)
 
     # --- Private Helper Methods ---
 
@@ -103,21 +343,19 @@ class DNSEClient:
             logger.error(f"Request exception occurred: {req_err}")
             raise
 
-    def _get_auth_headers(self):
-        """Returns headers for standard authenticated requests."""
-        if not self.jwt_token:
-            raise PermissionError("Not logged in. Please call login() first.")
-        return {'Authorization': f'Bearer {self.jwt_token}', 'Content-Type': 'application/json'}
-
-    def _get_trading_headers(self):
-        """Returns headers for transactional requests (placing/canceling orders)."""
-        if not self.jwt_token or not self.trading_token:
-            raise PermissionError("Trading token not available. Please verify OTP first.")
-        return {
-            'Authorization': f'Bearer {self.jwt_token}',
-            'trading-token': self.trading_token,
-            'Content-Type': 'application/json'
-        }
+    def _send(self, request):
+        """
+        Sends a dnse_api.ApiRequest with the tokens it needs, logging it and any failure.
+        """
+        logger.log(request.log_level, request.message)
+        try:
+            headers = dnse_api.request_headers(request, self.jwt_token, self.trading_token)
+            return self._make_request(
+                request.method, request.endpoint, params=request.params, json_data=request.json_data, headers=headers
+            )
+        except Exception as e:
+            logger.error(f"Failed to {request.failure}: {e}")
+            raise
 
     # --- 1. Authentication Methods ---
 
@@ -125,108 +363,61 @@ class DNSEClient:
         """
         Logs into the DNSE platform to get a JWT token.
         """
-        logger.info("Attempting to log in...")
-        endpoint = "/auth-service/login"
-        payload = {"username": self.username, "password": self.password}
-        try:
-            response = self._make_request('POST', endpoint, json_data=payload)
-            self.jwt_token = response.get('token')
-            if self.jwt_token:
-                logger.info("Login successful. JWT token obtained.")
-                self.get_user_info()
-            else:
-                logger.error("Login failed. No token in response.")
-        except Exception as e:
-            logger.error(f"An error occurred during login: {e}")
-            raise
+        response = self._send(dnse_api.login(self.username, self.password))
+        self.jwt_token = response.get('token')
+        if self.jwt_token:
+            logger.info("Login successful. JWT token obtained.")
+            self.get_user_info()
+        else:
+            logger.error("Login failed. No token in response.")
 
     def get_email_otp(self):
         """
         Requests an OTP to be sent to the registered email address.
         """
-        logger.info("Requesting email OTP...")
-        endpoint = "/auth-service/api/email-otp"
-        try:
-            self._make_request('GET', endpoint, headers=self._get_auth_headers())
-            logger.info("Email OTP request sent successfully. Please check your email.")
-        except Exception as e:
-            logger.error(f"Failed to request email OTP: {e}")
-            raise
+        self._send(dnse_api.email_otp())
+        logger.info("Email OTP request sent successfully. Please check your email.")
 
     def verify_email_otp(self, otp_code):
         """
         Verifies the email OTP to obtain a trading token.
         """
-        logger.info("Verifying email OTP to get trading token...")
-        endpoint = "/order-service/trading-token"
-        headers = self._get_auth_headers()
-        headers['otp'] = otp_code
-        try:
-            response = self._make_request('POST', endpoint, headers=headers)
-            self.trading_token = response.get('tradingToken')
-            if self.trading_token:
-                logger.info("Email OTP verified successfully. Trading token obtained.")
-            else:
-                logger.error("OTP verification failed. No trading token in response.")
-        except Exception as e:
-            logger.error(f"Failed to verify email OTP: {e}")
-            raise
-    
+        response = self._send(dnse_api.trading_token(otp_code))
+        self.trading_token = response.get('tradingToken')
+        if self.trading_token:
+            logger.info("Email OTP verified successfully. Trading token obtained.")
+        else:
+            logger.error("OTP verification failed. No trading token in response.")
+
     def verify_smart_otp(self, smart_otp_code):
         """
         Verifies the Smart OTP from the Entrade X app to obtain a trading token.
         """
-        logger.info("Verifying Smart OTP to get trading token...")
-        endpoint = "/order-service/trading-token"
-        headers = self._get_auth_headers()
-        headers['smart-otp'] = smart_otp_code
-        try:
-            response = self._make_request('POST', endpoint, headers=headers)
-            self.trading_token = response.get('tradingToken')
-            if self.trading_token:
-                logger.info("Smart OTP verified successfully. Trading token obtained.")
-            else:
-                logger.error("Smart OTP verification failed. No trading token in response.")
-        except Exception as e:
-            logger.error(f"Failed to verify Smart OTP: {e}")
-            raise
+        response = self._send(dnse_api.trading_token(smart_otp_code, smart=True))
+        self.trading_token = response.get('tradingToken')
+        if self.trading_token:
+            logger.info("Smart OTP verified successfully. Trading token obtained.")
+        else:
+            logger.error("Smart OTP verification failed. No trading token in response.")
 
     # --- 2. Account Information Methods ---
 
     def get_user_info(self):
         """Retrieves primary account details for the logged-in user."""
-        logger.info("Fetching user information...")
-        endpoint = "/user-service/api/me"
-        try:
-            self.account_info = self._make_request('GET', endpoint, headers=self._get_auth_headers())
-            self.investor_id = self.account_info.get('investorId')
-            logger.info(f"User information retrieved successfully for investor ID: {self.investor_id}")
-            return self.account_info
-        except Exception as e:
-            logger.error(f"Failed to get user information: {e}")
-            raise
+        self.account_info = self._send(dnse_api.user_info())
+        self.investor_id = self.account_info.get('investorId')
+        logger.info(f"User information retrieved successfully for investor ID: {self.investor_id}")
+        return self.account_info
 
     def get_sub_accounts(self):
         """Retrieves the list of trading sub-accounts."""
-        logger.info("Fetching sub-accounts...")
-        endpoint = "/order-service/accounts"
-        try:
-            return self._make_request('GET', endpoint, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get sub-accounts: {e}")
-            raise
+        return self._send(dnse_api.sub_accounts())
 
     def get_cash_balance(self, account):
         """
         Retrieves detailed cash balance information for a specific sub-account.
         """
-        logger.info(f"Fetching cash balance for account: {account}...")
-        endpoint = f"/order-service/account-balances/{account}"
-        try:
-            return self._make_request('GET', endpoint, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get cash balance for account {account}: {e}")
-            raise
+        return self._send(dnse_api.cash_balance(account))
 
     # --- 3. Trading Methods (Equities & Derivatives) ---
 
@@ -234,86 +425,39 @@ class DNSEClient:
         """
         Get available margin loan packages for a sub-account.
         """
-        endpoint_suffix = "derivative-loan-packages" if derivative else "loan-packages"
-        logger.info(f"Fetching {'derivative' if derivative else 'equity'} loan packages for account: {account}...")
-        endpoint = f"/order-service/accounts/{account}/{endpoint_suffix}"
-        try:
-            return self._make_request('GET', endpoint, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get loan packages: {e}")
-            raise
+        return self._send(dnse_api.loan_packages(account, derivative))
 
     def get_buying_power(self, account, symbol, price, loan_package_id, derivative=False):
         """
         Calculates buying/selling power for a given symbol and price.
         """
-        endpoint_suffix = "derivative-ppse" if derivative else "ppse"
-        logger.info(f"Fetching buying power for {symbol} at price {price}...")
-        endpoint = f"/order-service/accounts/{account}/{endpoint_suffix}"
-        params = {"symbol": symbol, "price": price, "loanPackageId": loan_package_id}
-        try:
-            return self._make_request('GET', endpoint, params=params, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get buying power: {e}")
-            raise
+        return self._send(dnse_api.buying_power(account, symbol, price, loan_package_id, derivative))
 
     def place_order(self, accountNo, symbol, side, orderType, quantity, price=None, loanPackageId=None, derivative=False):
         """
         Places a new order.
         """
-        endpoint_suffix = "derivative/orders" if derivative else "v2/orders"
-        logger.info(f"Placing {'derivative' if derivative else 'equity'} order: {side} {quantity} {symbol}@{price if price else orderType}")
-        endpoint = f"/order-service/{endpoint_suffix}"
-        payload = {"symbol": symbol, "side": side, "orderType": orderType, "quantity": quantity, "accountNo": accountNo}
-        if price is not None: payload["price"] = price
-        if loanPackageId is not None: payload["loanPackageId"] = loanPackageId
-        try:
-            return self._make_request('POST', endpoint, json_data=payload, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to place order: {e}")
-            raise
+        return self._send(dnse_api.place_order(
+            accountNo, symbol, side, orderType, quantity, price, loanPackageId, derivative
+        ))
 
     def get_orders(self, account, derivative=False):
         """
         Retrieves the list of orders for a sub-account.
         """
-        endpoint_suffix = "derivative/orders" if derivative else "v2/orders"
-        logger.info(f"Fetching {'derivative' if derivative else 'equity'} order list for account {account}...")
-        endpoint = f"/order-service/{endpoint_suffix}"
-        params = {"accountNo": account}
-        try:
-            return self._make_request('GET', endpoint, params=params, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get orders: {e}")
-            raise
+        return self._send(dnse_api.orders(account, derivative))
 
     def get_order_details(self, order_id, account, derivative=False):
         """
         Retrieves details for a single order by its ID.
         """
-        endpoint_suffix = "derivative/orders" if derivative else "v2/orders"
-        logger.info(f"Fetching details for order ID: {order_id}...")
-        endpoint = f"/order-service/{endpoint_suffix}/{order_id}"
-        params = {"accountNo": account}
-        try:
-            return self._make_request('GET', endpoint, params=params, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get order details for {order_id}: {e}")
-            raise
+        return self._send(dnse_api.order_details(order_id, account, derivative))
 
     def cancel_order(self, order_id, account, derivative=False):
         """
         Cancels an open order.
         """
-        endpoint_suffix = "derivative/orders" if derivative else "v2/orders"
-        logger.info(f"Cancelling order ID: {order_id}...")
-        endpoint = f"/order-service/{endpoint_suffix}/{order_id}"
-        params = {"accountNo": account}
-        try:
-            return self._make_request('DELETE', endpoint, params=params, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to cancel order {order_id}: {e}")
-            raise
+        return self._send(dnse_api.cancel_order(order_id, account, derivative))
 
     # --- 4. Deal/Position Management ---
 
@@ -321,201 +465,56 @@ class DNSEClient:
         """
         Retrieves the list of currently held deals/positions.
         """
-        service = "derivative-core" if derivative else "deal-service"
-        logger.info(f"Fetching {'derivative' if derivative else 'equity'} holding deals for account {account}...")
-        endpoint = f"/{service}/deals"
-        params = {"accountNo": account}
-        try:
-            return self._make_request('GET', endpoint, params=params, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get holding deals: {e}")
-            raise
-    
+        return self._send(dnse_api.holding_deals(account, derivative))
+
     def close_derivative_deal(self, deal_id):
         """
         Closes a derivative deal.
         """
-        logger.info(f"Closing derivative deal ID: {deal_id}...")
-        endpoint = f"/derivative-core/deals/{deal_id}/close"
-        try:
-            return self._make_request('POST', endpoint, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to close derivative deal {deal_id}: {e}")
-            raise
+        return self._send(dnse_api.close_derivative_deal(deal_id))
 
     # --- 5. Derivatives Risk Management ---
-    
+
     def configure_sl_tp_by_deal(self, deal_id, config_payload):
         """
         Sets stop-loss/take-profit parameters for a specific derivative deal.
         """
-        logger.info(f"Configuring SL/TP for deal ID: {deal_id}...")
-        endpoint = f"/derivative-deal-risk/pnl-configs/{deal_id}"
-        try:
-            return self._make_request('POST', endpoint, json_data=config_payload, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to configure SL/TP for deal {deal_id}: {e}")
-            raise
+        return self._send(dnse_api.sl_tp_by_deal(deal_id, config_payload))
 
     def configure_sl_tp_by_account(self, account_no, config_payload):
         """
         Sets stop-loss/take-profit parameters for an entire derivative account.
         """
-        logger.info(f"Configuring SL/TP for account: {account_no}...")
-        endpoint = f"/derivative-deal-risk/account-pnl-configs/{account_no}"
-        try:
-            return self._make_request('PATCH', endpoint, json_data=config_payload, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to configure SL/TP for account {account_no}: {e}")
-            raise
-    
+        return self._send(dnse_api.sl_tp_by_account(account_no, config_payload))
+
     # --- 6. Conditional Orders ---
-    
+
     def place_conditional_order(self, order_payload):
         """
         Places a new conditional order.
         """
-        logger.info(f"Placing conditional order for symbol: {order_payload.get('symbol')}...")
-        endpoint = "/conditional-order-api/v1/orders"
-        try:
-            # Note: The docs are ambiguous about the required token. Assuming trading-token for safety.
-            return self._make_request('POST', endpoint, json_data=order_payload, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to place conditional order: {e}")
-            raise
+        return self._send(dnse_api.place_conditional_order(order_payload))
 
     def get_conditional_orders(self, account_no, daily=False, from_date=None, to_date=None, status=None, symbol=None, market_id=None):
         """
         Retrieves a list of conditional orders.
         """
-        logger.info(f"Fetching conditional orders for account: {account_no}...")
-        endpoint = "/conditional-order-api/v1/orders"
-        params = {"accountNo": account_no, "daily": daily}
-        if from_date: params["from"] = from_date
-        if to_date: params["to"] = to_date
-        if status: params["status"] = status
-        if symbol: params["symbol"] = symbol
-        if market_id: params["marketId"] = market_id
-        try:
-            return self._make_request('GET', endpoint, params=params, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get conditional orders: {e}")
-            raise
+        return self._send(dnse_api.conditional_orders(
+            account_no, daily, from_date, to_date, status, symbol, market_id
+        ))
 
     def get_conditional_order_details(self, order_id):
         """
         Retrieves details for a single conditional order.
         """
-        logger.info(f"Fetching details for conditional order ID: {order_id}...")
-        endpoint = f"/conditional-order-api/v1/orders/{order_id}"
-        try:
-            return self._make_request('GET', endpoint, headers=self._get_auth_headers())
-        except Exception as e:
-            logger.error(f"Failed to get conditional order details for {order_id}: {e}")
-            raise
-            
+        return self._send(dnse_api.conditional_order_details(order_id))
+
     def cancel_conditional_order(self, order_id):
         """
         Cancels a conditional order.
         """
-        logger.info(f"Cancelling conditional order ID: {order_id}...")
-        endpoint = f"/conditional-order-api/v1/orders/{order_id}/cancel"
-        try:
-            # Assuming trading-token for safety.
-            return self._make_request('PATCH', endpoint, headers=self._get_trading_headers())
-        except Exception as e:
-            logger.error(f"Failed to cancel conditional order {order_id}: {e}")
-            raise
-
-    # --- 7. Market Data (MQTT over WebSocket) Methods ---
-
-    def _on_mqtt_connect(self, client, userdata, flags, rc):
-        """Callback for when the MQTT client connects."""
-        if rc == 0:
-            logger.info("Market Data client connected successfully.")
-            self._is_mqtt_connected.set()
-            for topic in self._mqtt_callbacks:
-                logger.info(f"Resubscribing to topic: {topic}")
-                self._mqtt_client.subscribe(topic)
-        else:
-            logger.error(f"Market Data client failed to connect, return code {rc}\n")
+        return self._send(dnse_api.cancel_conditional_order(order_id))
 
-    def _on_mqtt_message(self, client, userdata, msg):
-        """Callback for when a message is received from a subscribed topic."""
-        try:
-            payload = json.loads(msg.payload.decode())
-            if msg.topic in self._mqtt_callbacks:
-                self._mqtt_callbacks[msg.topic](msg.topic, payload)
-        except json.JSONDecodeError:
-            logger.warning(f"Could not decode JSON from message on topic {msg.topic}: {msg.payload}")
-        except Exception as e:
-            logger.error(f"Error in message callback for topic {msg.topic}: {e}")
-
-    def _on_mqtt_disconnect(self, client, userdata, rc):
-        """Callback for when the MQTT client disconnects."""
-        self._is_mqtt_connected.clear()
-        logger.warning(f"Market Data client disconnected (rc={rc}). Will attempt to reconnect if loop is running.")
-
-    def _mqtt_loop(self):
-        """The target function for the MQTT background thread."""
-        while True:
-            try:
-                logger.info("Starting MQTT loop...")
-                self._mqtt_client.loop_forever()
-                break 
-            except Exception as e:
-                logger.error(f"Exception in MQTT loop: {e}. Reconnecting in 5 seconds...")
-                time.sleep(5)
-
-    def connect_market_data(self):
-        """
-        Connects to the real-time market data stream.
-        """
-        if not self.investor_id or not self.jwt_token:
-            raise PermissionError("Cannot connect to market data. Please login() first.")
-        if self._mqtt_client and self._is_mqtt_connected.is_set():
-            logger.info("Market Data client is already connected.")
-            return
-
-        logger.info("Connecting to Market Data stream...")
-        client_id = f"dnse_client_{self.investor_id}_{int(time.time())}"
-        self._mqtt_client = mqtt.Client(client_id=client_id, transport="websockets")
-        self._mqtt_client.ws_options_set(path=MARKET_DATA_PATH)
-        self._mqtt_client.username_pw_set(username=self.investor_id, password=self.jwt_token)
-        self._mqtt_client.on_connect = self._on_mqtt_connect
-        self._mqtt_client.on_message = self._on_mqtt_message
-        self._mqtt_client.on_disconnect = self._on_mqtt_disconnect
-        self._mqtt_client.connect(MARKET_DATA_HOST, MARKET_DATA_PORT)
-
-        self._mqtt_thread = threading.Thread(target=self._mqtt_loop, daemon=True)
-        self._mqtt_thread.start()
-        logger.info("Market Data connection process started in background.")
-
-    def subscribe(self, topic, callback):
-        """
-        Subscribes to a market data topic.
-        """
-        if not self._mqtt_client:
-            raise ConnectionError("Market Data client not connected. Call connect_market_data() first.")
-        logger.info(f"Subscribing to topic: {topic}")
-        self._mqtt_callbacks[topic] = callback
-        if self._is_mqtt_connected.is_set():
-            self._mqtt_client.subscribe(topic)
-
-    def unsubscribe(self, topic):
-        """Unsubscribes from a market data topic."""
-        if not self._mqtt_client: return
-        logger.info(f"Unsubscribing from topic: {topic}")
-        if topic in self._mqtt_callbacks: del self._mqtt_callbacks[topic]
-        if self._is_mqtt_connected.is_set(): self._mqtt_client.unsubscribe(topic)
-
-    def disconnect_market_data(self):
-        """Disconnects from the market data stream gracefully."""
-        if self._mqtt_client:
-            logger.info("Disconnecting from Market Data stream.")
-            self._mqtt_client.loop_stop()
-            self._mqtt_client.disconnect()
-            self._is_mqtt_connected.clear()
 
 # --- Example Usage ---
 def example_market_data_callback(topic, payload):
@@ -17,6 +17,18 @@ class Config:
     MQTT_BROKER_PORT = 443
     MQTT_CLIENT_ID_PREFIX = "dnse-price-json-mqtt-ws-sub-"
     
+    # HTTP Connection Pool Settings
+    HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))  # cached per-host pools
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))  # keep-alive connections per host
+    HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'false').lower() in ('true', '1', 'yes')
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 15))  # seconds
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 0))
+    
+    # Recorded Market Data (see channels.tick_store)
+    MARKET_DATA_DIR = os.getenv('MARKET_DATA_DIR', 'market_data')
+    MARKET_HISTORY_MAX_ROWS = int(os.getenv('MARKET_HISTORY_MAX_ROWS', 100000))  # per /api/market/history response
+    
     # Cache Settings
     MARKET_DATA_CACHE_TTL = 5  # seconds
     PORTFOLIO_CACHE_TTL = 30  # seconds
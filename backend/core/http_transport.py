@@ -0,0 +1,245 @@
+"""
+Pooled HTTP Transport for DNSE API
+==================================
+
+This module provides a keep-alive, connection-pooled HTTP transport shared by
+the DNSE REST clients, together with pool hit/miss and connection-reuse
+counters so the savings of pooling can be observed. Clients share the pool
+but not cookies: each one talks through its own PooledSession.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.config import active_config
+
+logger = logging.getLogger("dnse-trading.http_transport")
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps connection counters of pools evicted from the pool manager"""
+
+    def __init__(self, *args, **kwargs):
+        self.evicted_connections = 0
+        self.evicted_requests = 0
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # Preserve counters of host pools dropped by the LRU container
+        self.poolmanager.pools.dispose_func = self._dispose_pool
+
+    def _dispose_pool(self, pool) -> None:
+        self.evicted_connections += getattr(pool, 'num_connections', 0)
+        self.evicted_requests += getattr(pool, 'num_requests', 0)
+        pool.close()
+
+    def pool_counters(self) -> Tuple[int, int]:
+        """Return (connections opened, requests sent) across all host pools"""
+        connections = self.evicted_connections
+        requests_sent = self.evicted_requests
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return connections, requests_sent
+
+
+class PooledTransport:
+    """
+    Shared keep-alive HTTP transport.
+
+    Every request goes through one adapter that keeps a bounded pool of
+    persistent connections per host, so consecutive API calls reuse an
+    established TCP+TLS connection instead of performing a new handshake.
+    Requests sent on the transport itself use its default session; clients
+    acting for different users take their own session() so cookies set for
+    one account never reach another.
+    """
+
+    def __init__(self,
+                 pool_connections: int = active_config.HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = active_config.HTTP_POOL_MAXSIZE,
+                 pool_block: bool = active_config.HTTP_POOL_BLOCK,
+                 connect_timeout: float = active_config.HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = active_config.HTTP_READ_TIMEOUT,
+                 max_retries: int = active_config.HTTP_MAX_RETRIES,
+                 keep_alive: bool = True):
+        """
+        Initialize the transport.
+
+        Args:
+            pool_connections: Number of per-host connection pools to cache
+            pool_maxsize: Maximum number of connections kept alive per host
+            pool_block: Block when a host's pool is exhausted instead of opening extra connections
+            connect_timeout: Default connect timeout in seconds
+            read_timeout: Default read timeout in seconds
+            max_retries: Connection-level retries handed to the adapter
+            keep_alive: Send "Connection: keep-alive" and reuse sockets between requests
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeout = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+
+        self._adapter = _CountingHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=pool_block
+        )
+        self.session = self._new_session()
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+        return session
+
+    def session_for_client(self) -> 'PooledSession':
+        """A session with its own cookies and headers over this transport's connection pool"""
+        return PooledSession(self, self._new_session())
+
+    def send(self, session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through `session`, counting it against the pool.
+
+        Args:
+            session: Session mounted on this transport's adapter
+            method: HTTP method
+            url: Absolute request URL
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            requests.Response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self._requests += 1
+        try:
+            return session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the transport's default session"""
+        return self.send(self.session, method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get connection pool statistics.
+
+        A pool miss is a request that had to open a new connection; a pool hit
+        is a request served on an already established keep-alive connection.
+
+        Returns:
+            Dictionary with request, hit/miss and reuse counters
+        """
+        connections_opened, pooled_requests = self._adapter.pool_counters()
+        with self._lock:
+            total_requests = self._requests
+            errors = self._errors
+
+        pool_hits = max(0, pooled_requests - connections_opened)
+        return {
+            'requests': total_requests,
+            'errors': errors,
+            'pool_hits': pool_hits,
+            'pool_misses': connections_opened,
+            'connections_opened': connections_opened,
+            'connection_reuse': pool_hits,
+            'hit_rate': (pool_hits / pooled_requests) if pooled_requests else 0.0,
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'keep_alive': self.keep_alive
+        }
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class PooledSession:
+    """
+    One client's view of a PooledTransport: its own requests.Session (cookie
+    jar and headers) mounted on the transport's shared adapter, so connections
+    are pooled across clients while cookies stay per client.
+    """
+
+    def __init__(self, transport: PooledTransport, session: requests.Session):
+        self.transport = transport
+        self.session = session
+
+    @property
+    def cookies(self) -> requests.cookies.RequestsCookieJar:
+        return self.session.cookies
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.transport.send(self.session, method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool statistics of the shared transport"""
+        return self.transport.get_stats()
+
+    def close(self) -> None:
+        """Drop this client's cookies; the shared pool stays open for the other clients"""
+        self.session.cookies.clear()
+
+
+_shared_transport: Optional[PooledTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_transport() -> PooledTransport:
+    """Get the process-wide transport shared by all DNSE clients"""
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_lock:
+            if _shared_transport is None:
+                _shared_transport = PooledTransport()
+                logger.info("Shared DNSE HTTP transport created")
+    return _shared_transport
@@ -13,6 +13,7 @@ Features:
     - Buying power analysis
     - Portfolio management
     - Conditional orders support
+    - Keep-alive connection pooling shared across all API calls
 
 Usage:
     from backend.dnse_client import DNSEClient
@@ -30,12 +31,12 @@ Usage:
 import os
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-import requests
 from requests.exceptions import HTTPError
 from dotenv import load_dotenv
 
 from interfaces.trading_client import ITradingClient
 from core.data_structures import MarketData, OrderRequest, OrderSide, OrderType
+from core.http_transport import PooledTransport, get_shared_transport
 from exceptions import DNSEAPIError
 
 
@@ -48,13 +49,16 @@ class DNSEClient(ITradingClient):
     Implements the ITradingClient interface.
     """
     
-    def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 transport: Optional[PooledTransport] = None):
         """
         Initialize DNSE client.
         
         Args:
             username: DNSE username (if not provided, will load from .env)
             password: DNSE password (if not provided, will load from .env)
+            transport: Pooled HTTP transport (defaults to the process-wide shared transport);
+                the client sends through its own session on it, so cookies are not shared
         """
         # Load environment variables if credentials not provided
         if not username or not password:
@@ -73,6 +77,9 @@ class DNSEClient(ITradingClient):
         self.accounts: Optional[List[Dict]] = None
         self.loan_packages: Optional[List[Dict]] = None
         
+        # Keep-alive connection pool shared by every API call, with this client's own cookie jar
+        self.transport = (transport or get_shared_transport()).session_for_client()
+        
         # API base URLs
         self.base_urls = {
             'user_service': 'https://api.dnse.com.vn/user-service',
@@ -98,7 +105,7 @@ class DNSEClient(ITradingClient):
                 "password": self.password
             }
             
-            response = requests.post(url, json=payload)
+            response = self.transport.post(url, json=payload)
             response.raise_for_status()
             
             response_data = response.json()
@@ -140,7 +147,7 @@ class DNSEClient(ITradingClient):
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(url, headers=headers, json={})
+            response = self.transport.get(url, headers=headers, json={})
             response.raise_for_status()
             
             return True
@@ -180,7 +187,7 @@ class DNSEClient(ITradingClient):
                 "otp": otp_code
             }
             
-            response = requests.post(url, headers=headers, json={})
+            response = self.transport.post(url, headers=headers, json={})
             response.raise_for_status()
             
             response_data = response.json()
@@ -216,7 +223,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['user_service']}/api/me"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             self.investor_info = response.json()
@@ -241,7 +248,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['user_service']}/user/accounts"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             self.accounts = response.json()
@@ -270,7 +277,7 @@ class DNSEClient(ITradingClient):
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             params = {"accountId": account_id}
             
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             self.loan_packages = response.json()
@@ -298,7 +305,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['order_service']}/ppse/{account_no}"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             return response.json()
@@ -321,7 +328,7 @@ class DNSEClient(ITradingClient):
             params = {"symbol": symbol, "price": price}
             if loan_package_id:
                 params["loanPackageId"] = loan_package_id
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -477,7 +484,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['order_service']}/market-data/{symbol}"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -520,7 +527,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['order_service']}/stock-info/{symbol}"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -561,7 +568,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['order_service']}/portfolio/{account_no}"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -618,7 +625,7 @@ class DNSEClient(ITradingClient):
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             params = {"accountNo": account_no}
             
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -649,7 +656,7 @@ class DNSEClient(ITradingClient):
         except Exception as e:
             raise DNSEAPIError(f"Failed to get pending orders: {str(e)}")
                 
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             return response.json()
@@ -681,7 +688,7 @@ class DNSEClient(ITradingClient):
             }
             params = {"accountNo": account_no}
             
-            response = requests.delete(url, headers=headers, params=params)
+            response = self.transport.delete(url, headers=headers, params=params)
             response.raise_for_status()
             
             return response.json()
@@ -738,7 +745,7 @@ class DNSEClient(ITradingClient):
             if order_request.loan_package_id is not None:
                 payload["loanPackageId"] = order_request.loan_package_id
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.transport.post(url, headers=headers, json=payload)
             response.raise_for_status()
             
             return response.json()
@@ -773,7 +780,7 @@ class DNSEClient(ITradingClient):
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             params = {"accountNo": account_no}
             
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             return response.json()
@@ -818,7 +825,7 @@ class DNSEClient(ITradingClient):
                 "category": category,
                 "timeInForce": time_in_force
             }
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.transport.post(url, headers=headers, json=payload)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -861,7 +868,7 @@ class DNSEClient(ITradingClient):
                 params["symbol"] = symbol
             if market_id:
                 params["marketId"] = market_id
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -885,7 +892,7 @@ class DNSEClient(ITradingClient):
         try:
             url = f"{self.base_urls['conditional_order_api']}/orders/{order_id}"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
-            response = requests.get(url, headers=headers)
+            response = self.transport.get(url, headers=headers)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -909,7 +916,7 @@ class DNSEClient(ITradingClient):
         try:
             url = f"{self.base_urls['conditional_order_api']}/orders/{order_id}/cancel"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
-            response = requests.patch(url, headers=headers)
+            response = self.transport.patch(url, headers=headers)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -928,7 +935,7 @@ class DNSEClient(ITradingClient):
             url = f"{self.base_urls['order_service']}/v2/orders"
             headers = {"Authorization": f"Bearer {self.jwt_token}"}
             params = {"accountNo": account_no}
-            response = requests.get(url, headers=headers, params=params)
+            response = self.transport.get(url, headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except HTTPError as e:
@@ -974,6 +981,10 @@ class DNSEClient(ITradingClient):
         """Check if client has trading token for order placement."""
         return self.trading_token is not None
     
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Get connection pool hit/miss and reuse counters of the HTTP transport."""
+        return self.transport.get_stats()
+    
     # Convenience Methods
     def setup_trading_session(self, otp_code: str, account_index: int = 0) -> Dict[str, Any]:
         """
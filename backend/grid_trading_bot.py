@@ -1,5 +1,6 @@
 # Main Grid Trading Bot Application
 import asyncio
+import inspect
 import logging
 import os
 import signal
@@ -7,12 +8,13 @@ import sys
 from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 # Add parent directory to path to import DNSE client
 sys.path.append(str(Path(__file__).parent.parent))
 
 from cli.dnse_client_v2 import DNSEClient
+from cli.async_dnse_client import AsyncDNSEClient
 from strategies.grid_base import GridConfig
 from strategies.recursive_grid import RecursiveGridStrategy
 from strategies.config_manager import ConfigManager
@@ -40,7 +42,7 @@ class GridTradingBot:
         self.config_file = config_file
         self.config_manager: Optional[ConfigManager] = None
         self.grid_config: Optional[GridConfig] = None
-        self.api_client: Optional[DNSEClient] = None
+        self.api_client: Optional[Union[DNSEClient, AsyncDNSEClient]] = None
         self.strategy: Optional[RecursiveGridStrategy] = None
         self.is_running = False
         
@@ -110,23 +112,39 @@ class GridTradingBot:
                 logger.error("DNSE credentials not found in config or environment variables")
                 return False
             
-            # Initialize client
-            self.api_client = DNSEClient(username=username, password=password)
+            # Initialize client (asyncio-native unless disabled in config)
+            if api_config.get('async_client', True):
+                self.api_client = AsyncDNSEClient(
+                    username=username,
+                    password=password,
+                    pool_size=api_config.get('pool_size', 200),
+                    pool_size_per_host=api_config.get('pool_size_per_host', 100),
+                    timeout=api_config.get('timeout', 15),
+                    dispatch_queue_size=api_config.get('dispatch_queue_size', 10000),
+                    dispatch_overflow=api_config.get('dispatch_overflow', 'drop_oldest')
+                )
+            else:
+                self.api_client = DNSEClient(
+                    username=username,
+                    password=password,
+                    dispatch_queue_size=api_config.get('dispatch_queue_size', 10000),
+                    dispatch_overflow=api_config.get('dispatch_overflow', 'drop_oldest')
+                )
             
             # Login
             logger.info("Logging into DNSE...")
-            self.api_client.login()
+            await self._call_client(self.api_client.login)
             
             # Get OTP from user (skip in dry run mode)
             operational_config = self.config_manager.get_section('operational')
             if not operational_config.get('dry_run', False):
                 otp = input("Please enter the OTP sent to your email: ")
-                self.api_client.verify_email_otp(otp)
+                await self._call_client(self.api_client.verify_email_otp, otp)
             else:
                 logger.info("Dry run mode - skipping OTP verification")
             
             # Get sub-accounts and update config if needed
-            sub_accounts = self.api_client.get_sub_accounts()
+            sub_accounts = await self._call_client(self.api_client.get_sub_accounts)
             if sub_accounts and sub_accounts.get('accounts'):
                 # Use first account if not specified in config
                 current_account = self.config_manager.get_value('strategy', 'account_no')
@@ -142,10 +160,19 @@ class GridTradingBot:
             logger.error(f"Failed to initialize API client: {e}")
             return False
     
+    async def _call_client(self, func, *args, **kwargs):
+        """Call an API client method, awaiting it when the client is asynchronous"""
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    
     def _create_grid_config(self) -> bool:
         """Create GridConfig from loaded configuration"""
         try:
             strategy_config = self.config_manager.get_section('strategy')
+            api_config = self.config_manager.get_section('api')
+            operational_config = self.config_manager.get_section('operational')
             
             self.grid_config = GridConfig(
                 symbol=strategy_config.get('symbol', 'HPG'),
@@ -166,8 +193,28 @@ class GridTradingBot:
                 ema_span_0=strategy_config.get('ema_span_0', 12),
                 ema_span_1=strategy_config.get('ema_span_1', 26),
                 use_ema_smoothing=strategy_config.get('use_ema_smoothing', True),
+                ema_use_float=strategy_config.get('ema_use_float', False),
                 price_precision=strategy_config.get('price_precision', 0),
-                min_order_value=Decimal(str(strategy_config.get('min_order_value', 100000)))
+                min_order_value=Decimal(str(strategy_config.get('min_order_value', 100000))),
+                order_rate_per_sec=float(api_config.get('order_rate_per_sec', 10.0)),
+                order_burst=api_config.get('order_burst', 5),
+                max_concurrent_orders=api_config.get('max_concurrent_orders', 8),
+                order_event_topics=api_config.get('order_event_topics') or [],
+                order_reconcile_interval=api_config.get('order_reconcile_interval', 60),
+                monitoring_interval=float(operational_config.get('monitoring_interval', 5)),
+                min_poll_interval=float(operational_config.get('min_poll_interval', 1)),
+                max_poll_interval=float(operational_config.get('max_poll_interval', 60)),
+                poll_near_level_pct=Decimal(str(operational_config.get('poll_near_level_pct', 0.005))),
+                poll_far_level_pct=Decimal(str(operational_config.get('poll_far_level_pct', 0.05))),
+                poll_high_volatility=Decimal(str(operational_config.get('poll_high_volatility', 0.002))),
+                poll_max_backoff=float(operational_config.get('poll_max_backoff', 120)),
+                poll_market_hours=operational_config.get('poll_market_hours', True),
+                conflate_market_data=operational_config.get('conflate_market_data', True),
+                market_data_dir=operational_config.get('market_data_dir'),
+                market_data_warmup=float(operational_config.get('market_data_warmup', 3600)),
+                bar_resolutions=operational_config.get('bar_resolutions') or [],
+                trade_history_size=operational_config.get('trade_history_size', 1000),
+                trade_history_dir=operational_config.get('trade_history_dir')
             )
             
             # Validate configuration
@@ -252,7 +299,9 @@ class GridTradingBot:
                               f"Active: {status['is_active']}, "
                               f"Position: {status['position']['quantity']}, "
                               f"Grid Orders: {status['grid_orders']}, "
-                              f"Total Trades: {status['total_trades']}")
+                              f"Total Trades: {status['total_trades']}, "
+                              f"Poll Interval: {status['poll_scheduler']['interval_seconds']:g}s "
+                              f"({status['poll_scheduler']['reason']})")
                 
                 await asyncio.sleep(monitoring_interval)
                 
@@ -270,6 +319,8 @@ class GridTradingBot:
             
             if self.api_client:
                 self.api_client.disconnect_market_data()
+                if isinstance(self.api_client, AsyncDNSEClient):
+                    await self.api_client.close()
             
             logger.info("Shutdown completed successfully")
             
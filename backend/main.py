@@ -5,10 +5,14 @@ import uvicorn
 
 # Import core modules
 from core.logging import setup_logging, log_request_middleware
+from core.http_transport import get_shared_transport
 
 # Import route routers - uncomment as you create the FastAPI routers
 from routes.auth import router as auth_router
 from routes.redis_routes import router as redis_router
+from routes.market_stream import router as market_stream_router
+from routes.market_history import router as market_history_router
+from routes.backtest import router as backtest_router
 # from routes.order_fastapi import router as order_router
 # from routes.portfolio_fastapi import router as portfolio_router
 
@@ -48,9 +52,17 @@ async def health_check():
         'version': '1.0.0'
     }
 
+@app.get("/api/health/http-pool", tags=["Health"])
+async def http_pool_stats():
+    """Connection pool hit/miss and reuse counters of the shared DNSE HTTP transport"""
+    return get_shared_transport().get_stats()
+
 # Include routers
 app.include_router(auth_router, prefix='/api/dnse', tags=["Authentication"])
 app.include_router(redis_router, prefix='/api', tags=["Redis"])
+app.include_router(market_stream_router, prefix='/api/market', tags=["Market Data Stream"])
+app.include_router(market_history_router, prefix='/api/market', tags=["Market Data History"])
+app.include_router(backtest_router, prefix='/api/backtest', tags=["Backtest"])
 # app.include_router(market_router, prefix='/api/market', tags=["Market Data"])
 # app.include_router(order_router, prefix='/api/order', tags=["Order Management"])
 # app.include_router(portfolio_router, prefix='/api/portfolio', tags=["Portfolio"])
@@ -1,10 +1,11 @@
-import json
 import paho.mqtt.client as mqtt
 from dotenv import load_dotenv
 from requests import post, get
 from random import randint
 import os, ssl
 
+from channels.tick_decoder import decode_message, tick_topic
+
 # Nếu có InvestorID và Token rồi thì có thể comment đoạn này vào
 load_dotenv()
 username = os.getenv("usernameEntrade") # Email hoặc số điện thoại đăng kí tài khoản
@@ -97,20 +98,16 @@ def on_connect(client, userdata, flags, rc, properties):
     if rc == 0 and client.is_connected():
         print("Connected to MQTT Broker!")
         # Example subscription - modify as needed
-        client.subscribe("plaintext/quotes/krx/mdds/tick/v1/roundlot/symbol/41I1F7000", qos=1)
+        client.subscribe(tick_topic("41I1F7000"), qos=1)
     else:
         print(f"on_connect(): Failed to connect, return code {rc}\n")
 
 # Message callback
 def on_message(client, userdata, msg):
-    payload = json.JSONDecoder().decode(msg.payload.decode())
-    sending_time = payload["sendingTime"]
-
-    match_price = float(payload["matchPrice"])
-    match_quantity = int(payload["matchQtty"])
+    tick = decode_message(msg.topic, msg.payload)
 
     # Comment out if don't want to see this info
-    print(f"{payload["symbol"]}: {match_price} - Match Quantity: {match_quantity} - Side: {payload["side"]} - Time: {sending_time}")
+    print(f"{tick.symbol}: {tick.price} - Match Quantity: {tick.quantity} - Side: {tick.side} - Time: {tick.timestamp}")
 
 # Assign callback
 client.on_connect = on_connect
@@ -0,0 +1,67 @@
+"""
+Backtest Routes
+===============
+
+Backtests the recursive grid strategy against the ticks recorded by
+channels.tick_store.TickRecorder and returns its summary with the
+strategies.metrics performance metrics (Sharpe, Sortino, Calmar, drawdown
+duration, exposure, turnover and FIFO round-trip statistics).
+
+Backtests run in a worker process: the virtual clock patches module globals,
+which must not happen inside the API process.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
+
+from channels.tick_decoder import is_valid_symbol
+from core.config import active_config
+from strategies.grid_base import GridConfig
+from strategies.parameter_sweep import backtest_executor, run_backtest
+
+logger = logging.getLogger("dnse-trading.backtest_routes")
+
+router = APIRouter()
+
+# Created on first use; one worker keeps backtests from starving the API of CPU
+_executor = None
+
+
+class GridBacktestRequest(BaseModel):
+    symbol: str
+    start: Optional[float] = None  # Epoch seconds, inclusive; default first recorded tick
+    end: Optional[float] = None  # Epoch seconds, exclusive; default end of the recording
+    initial_cash: float = 1_000_000_000.0
+    parameters: Dict[str, Any] = {}  # GridConfig fields, e.g. {"grid_spacing_pct": 0.01}
+    fee_rate: float = 0.0
+    expire_at_close: bool = False
+
+
+@router.post("/grid")
+async def backtest_grid(request: GridBacktestRequest):
+    """Backtest the grid strategy for one symbol and parameter set over recorded ticks"""
+    global _executor
+    symbol = request.symbol.strip().upper()
+    if not is_valid_symbol(symbol):
+        # The symbol names a directory of the tick store read by the backtest
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid symbol: {symbol}")
+    if request.start is not None and request.end is not None and request.start >= request.end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    if _executor is None:
+        _executor = backtest_executor(active_config.MARKET_DATA_DIR, max_workers=1)
+
+    config = GridConfig(symbol=symbol, account_no="BACKTEST")
+    exchange_options = {'fee_rate': request.fee_rate, 'expire_at_close': request.expire_at_close}
+    result = await asyncio.get_running_loop().run_in_executor(
+        _executor, run_backtest, config, request.parameters, request.start, request.end,
+        request.initial_cash, exchange_options
+    )
+    if result.error:
+        logger.warning(f"Grid backtest of {config.symbol} failed: {result.error}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.error)
+    # Not to_dict(): its return/drawdown score is infinite for a run without drawdown, which is not JSON
+    return {'parameters': request.parameters, 'summary': result.summary}
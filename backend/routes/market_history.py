@@ -0,0 +1,86 @@
+"""
+Market Data History Routes
+==========================
+
+Time-range queries over the ticks, best bid/offer and OHLCV bars recorded by
+channels.tick_store.TickRecorder. Results are columnar JSON objects, one
+array per column, read through memory maps, so a query only touches the
+rows it returns.
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+
+from channels.tick_decoder import TOPIC_TICK, TOPIC_TOP_PRICE, is_valid_symbol
+from channels.tick_store import BAR_RESOLUTIONS, TickStore
+from core.config import active_config
+
+logger = logging.getLogger("dnse-trading.market_history_routes")
+
+router = APIRouter()
+
+tick_store = TickStore(active_config.MARKET_DATA_DIR)
+
+
+def _json_values(values: np.ndarray) -> list:
+    """Column values as a JSON list, with missing prices (NaN) as null"""
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        return [None if value != value else value for value in values.tolist()]
+    return values.tolist()
+
+
+def _read_history(symbol: str, start: float, end: float, kind: str, resolution: Optional[str],
+                  limit: int) -> Tuple[Dict[str, list], bool]:
+    """The most recent `limit` rows or bars of the range as JSON lists, and whether older ones were left out"""
+    if resolution:
+        columns = tick_store.bars(symbol, resolution, start, end)
+        truncated = len(next(iter(columns.values()))) > limit
+        columns = {name: values[-limit:] for name, values in columns.items()}
+    else:
+        columns, truncated = tick_store.latest(symbol, limit, start, end, kind=kind)
+    return {name: _json_values(values) for name, values in columns.items()}, truncated
+
+
+@router.get("/history")
+async def market_history(
+    symbol: str = Query(..., description="Stock symbol, e.g. VIC"),
+    start: Optional[float] = Query(None, description="Start time (epoch seconds, inclusive); default end - 1 day"),
+    end: Optional[float] = Query(None, description="End time (epoch seconds, exclusive); default now"),
+    kind: str = Query(TOPIC_TICK, description="'tick' or 'topprice' rows when no resolution is given"),
+    resolution: Optional[str] = Query(None, description=f"Bar resolution: {', '.join(BAR_RESOLUTIONS)}"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows, the most recent are kept")
+):
+    """Recorded ticks, best bid/offer or OHLCV bars of a symbol over a time range"""
+    symbol = symbol.strip().upper()
+    if not is_valid_symbol(symbol):
+        # The symbol names a directory of the store, so nothing else may reach the file system
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid symbol: {symbol}")
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    if kind not in (TOPIC_TICK, TOPIC_TOP_PRICE):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported kind: {kind}")
+
+    limit = min(limit or active_config.MARKET_HISTORY_MAX_ROWS, active_config.MARKET_HISTORY_MAX_ROWS)
+    try:
+        # Reading the maps faults pages in from disk, which must not block the event loop
+        columns, truncated = await run_in_threadpool(_read_history, symbol, start, end, kind, resolution, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        'symbol': symbol,
+        'kind': 'bar' if resolution else kind,
+        'resolution': resolution,
+        'start': start,
+        'end': end,
+        'count': len(next(iter(columns.values()))),
+        'truncated': truncated,
+        'columns': columns
+    }
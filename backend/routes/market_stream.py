@@ -0,0 +1,136 @@
+"""
+Market Data Streaming Routes
+============================
+
+WebSocket and Server-Sent Events endpoints streaming conflated, delta-encoded
+KRX ticks and best bid/offer to browser clients. Every client shares the
+backend's single upstream market data connection, which is opened with the
+market data credentials of the first logged-in session to connect. The
+connection refreshes its JWT from that session; if it still goes down, the
+next logged-in client to connect replaces it. Every client must be logged in.
+
+Messages are JSON objects:
+    {"type": "updates", "updates": [{"symbol", "kind", "seq", "dropped", "snapshot", "data"}]}
+    {"type": "heartbeat", "timestamp"}
+where `data` holds only the fields that changed since the previous update of
+that symbol and kind sent to the client (all fields when `snapshot` is true).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from services.market_stream_service import MarketStreamService, market_stream_service, parse_symbols
+from services.session_manager import SessionManager
+
+logger = logging.getLogger("dnse-trading.market_stream_routes")
+
+router = APIRouter()
+
+
+def _session_token_provider(session_id: str):
+    """Returns the session's current JWT (updated on every login) for market data token refreshes"""
+    def provider() -> str:
+        jwt_token = (SessionManager().get_session(session_id) or {}).get("jwt_token")
+        if not jwt_token:
+            raise PermissionError(f"Session {session_id} has expired; a new login is needed")
+        return jwt_token
+    return provider
+
+
+def _logged_in_session(session_id: Optional[str]) -> Dict[str, Any]:
+    """The session of a stream request; every client must be logged in, not just the first"""
+    session = SessionManager().get_session(session_id) if session_id else None
+    if not session or not session.get("jwt_token"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Login required to stream market data"
+        )
+    return session
+
+
+def _ensure_upstream(session_id: str, session: Dict[str, Any],
+                     service: MarketStreamService = market_stream_service) -> None:
+    """Connect the shared upstream feed with the session's credentials if it is missing or dead"""
+    if not service.needs_upstream:
+        return
+    investor_id = (session.get("investor_info") or {}).get("investorId")
+    if not investor_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Login required to start the market data stream"
+        )
+    service.connect(str(investor_id), session["jwt_token"], token_provider=_session_token_provider(session_id))
+
+
+def _heartbeat() -> str:
+    return json.dumps({"type": "heartbeat", "timestamp": time.time()})
+
+
+@router.websocket("/ws")
+async def market_stream_websocket(websocket: WebSocket, symbols: str = Query(...)):
+    """Stream conflated market data for comma-separated `symbols` over a WebSocket"""
+    try:
+        symbol_list = parse_symbols(symbols)
+        session_id = websocket.cookies.get("dnse_session_id")
+        _ensure_upstream(session_id, _logged_in_session(session_id))
+    except (HTTPException, ValueError) as e:
+        logger.warning(f"Rejected market data WebSocket: {e}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    client = market_stream_service.open_client(symbol_list)
+    try:
+        while True:
+            message = await client.next_message(timeout=market_stream_service.heartbeat_interval)
+            text = json.dumps(message) if message else _heartbeat()
+            # A client that cannot take a message in time is dropped rather than buffered for
+            await asyncio.wait_for(websocket.send_text(text), market_stream_service.send_timeout)
+    except WebSocketDisconnect:
+        pass
+    except asyncio.TimeoutError:
+        market_stream_service.clients_dropped += 1
+        logger.warning(f"Dropping slow market data stream client {client.id}")
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except Exception as e:
+        logger.error(f"Market data WebSocket error for client {client.id}: {e}")
+    finally:
+        market_stream_service.close_client(client)
+
+
+@router.get("/stream")
+async def market_stream_sse(request: Request, symbols: str = Query(...)):
+    """Stream conflated market data for comma-separated `symbols` as Server-Sent Events"""
+    try:
+        symbol_list = parse_symbols(symbols)
+        session_id = request.cookies.get("dnse_session_id")
+        _ensure_upstream(session_id, _logged_in_session(session_id))
+        client = market_stream_service.open_client(symbol_list)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                message = await client.next_message(timeout=market_stream_service.heartbeat_interval)
+                yield f"data: {json.dumps(message) if message else _heartbeat()}\n\n"
+        finally:
+            market_stream_service.close_client(client)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stream/stats")
+async def market_stream_stats():
+    """Upstream subscriptions, connected clients and per-client delivery counters"""
+    return market_stream_service.get_stats()
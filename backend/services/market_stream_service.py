@@ -0,0 +1,305 @@
+"""
+Market Data Stream Service
+==========================
+
+Serves KRX ticks and best bid/offer to many browser clients (WebSocket or
+SSE) from one backend market data connection. Each symbol is subscribed
+upstream once, however many clients watch it; updates go through a
+conflating cache so every client receives the latest state at its own pace,
+and only the fields that changed since the last message sent to that client.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from channels.conflation import ConflatedSubscription, ConflatingCache
+from channels.market_data_hub import HubSubscription, MarketDataHub
+from channels.tick_decoder import TOPIC_TICK, TOPIC_TOP_PRICE, is_valid_symbol, tick_topic, top_price_topic
+from cli.dnse_client_v2 import MarketDataClient
+
+logger = logging.getLogger("dnse-trading.market_stream")
+
+# Message kinds streamed per symbol and the topic each comes from
+STREAM_TOPICS = {
+    TOPIC_TICK: tick_topic,
+    TOPIC_TOP_PRICE: top_price_topic,
+}
+
+MAX_SYMBOLS_PER_CLIENT = 50
+
+# Seconds a newly attached upstream may take to connect before it counts as dead and can be replaced
+UPSTREAM_CONNECT_GRACE = 30.0
+
+
+def parse_symbols(symbols: str) -> List[str]:
+    """
+    Comma-separated symbols from a query parameter, upper-cased and de-duplicated.
+    Raises ValueError unless there are 1 to MAX_SYMBOLS_PER_CLIENT valid exchange symbols.
+    """
+    result = []
+    for symbol in symbols.split(','):
+        symbol = symbol.strip().upper()
+        if symbol and not is_valid_symbol(symbol):
+            raise ValueError(f"Invalid symbol: {symbol}")
+        if symbol and symbol not in result:
+            result.append(symbol)
+    if not result:
+        raise ValueError("At least one symbol is required")
+    if len(result) > MAX_SYMBOLS_PER_CLIENT:
+        raise ValueError(f"At most {MAX_SYMBOLS_PER_CLIENT} symbols per stream")
+    return result
+
+
+def encode_delta(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of `current` that differ from `previous` (all of them if there is no previous state)"""
+    if previous is None:
+        return dict(current)
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class StreamClient:
+    """
+    One browser connection: a conflated subscription to its symbols plus the
+    last state sent per symbol, used for delta encoding.
+
+    The subscription wakes the client's event loop at most once per read, so a
+    client that sends slowly just receives fewer, conflated updates (with the
+    skipped count) instead of queueing them.
+    """
+
+    def __init__(self, client_id: int, symbols: List[str], cache: ConflatingCache,
+                 loop: asyncio.AbstractEventLoop, min_interval: float = 0.1):
+        self.id = client_id
+        self.symbols = symbols
+        self.min_interval = min_interval
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._sent: Dict[Any, Dict[str, Any]] = {}
+        self._last_send = 0.0
+        self.subscription: ConflatedSubscription = cache.subscribe(
+            keys=[(symbol, kind) for symbol in symbols for kind in STREAM_TOPICS],
+            on_update=self._notify
+        )
+        if self.subscription.pending:
+            self._wakeup.set()
+
+        # Metrics
+        self.connected_at = time.time()
+        self.messages_sent = 0
+        self.updates_sent = 0
+        self.fields_sent = 0
+
+    def _notify(self) -> None:
+        """Called on the market data thread when the subscription has something to read"""
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    async def next_message(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next batch of updates, at most one per symbol and kind.
+        Returns None if nothing arrived within `timeout` (time for a heartbeat).
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            self._wakeup.clear()
+
+            # Throttle per client; updates arriving meanwhile are conflated
+            delay = self._last_send + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            updates = self.encode(self.subscription.read())
+            if updates:
+                self._last_send = time.monotonic()
+                self.messages_sent += 1
+                self.updates_sent += len(updates)
+                return {'type': 'updates', 'updates': updates}
+
+    def encode(self, conflated: Iterable) -> List[Dict[str, Any]]:
+        """Delta-encode conflated updates against what this client has already been sent"""
+        updates = []
+        for update in conflated:
+            symbol, kind = update.key
+            previous = self._sent.get(update.key)
+            fields = encode_delta(previous, update.value)
+            self._sent[update.key] = update.value
+            if not fields and not update.dropped:
+                continue
+            self.fields_sent += len(fields)
+            updates.append({
+                'symbol': symbol,
+                'kind': kind,
+                'seq': update.sequence,
+                'dropped': update.dropped,
+                'snapshot': previous is None,
+                'data': fields
+            })
+        return updates
+
+    def close(self) -> None:
+        self.subscription.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'symbols': self.symbols,
+            'connected_seconds': time.time() - self.connected_at,
+            'messages_sent': self.messages_sent,
+            'updates_sent': self.updates_sent,
+            'fields_sent': self.fields_sent,
+            'updates_dropped': self.subscription.dropped,
+            'pending': self.subscription.pending
+        }
+
+
+class MarketStreamService:
+    """
+    Owns the upstream subscriptions shared by every stream client.
+
+    Args:
+        hub: Market data hub to subscribe through; set later with attach() or
+            connect() when the credentials come from a web session
+        min_interval: Minimum seconds between messages to one client
+        send_timeout: Seconds a single send may take before the client is dropped
+    """
+
+    def __init__(self, hub: Optional[MarketDataHub] = None, min_interval: float = 0.1,
+                 send_timeout: float = 5.0, heartbeat_interval: float = 15.0):
+        self.hub = hub
+        self.min_interval = min_interval
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.cache = ConflatingCache()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._symbol_refs: Dict[str, int] = {}
+        self._hub_subscriptions: Dict[str, List[HubSubscription]] = {}
+        self._clients: Dict[int, StreamClient] = {}
+        self._attached_at = 0.0
+        self.clients_dropped = 0
+        self.upstream_replacements = 0
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether the upstream market data connection itself is up, not just attached"""
+        if self.hub is None or not self.hub.connected:
+            return False
+        is_connected = getattr(self.hub.client, 'is_market_data_connected', None)
+        return is_connected() if is_connected else True
+
+    @property
+    def needs_upstream(self) -> bool:
+        """No upstream, or one that is down after its grace period (e.g. its credentials expired)"""
+        if self.hub is None:
+            return True
+        return not self.is_connected and time.monotonic() - self._attached_at > UPSTREAM_CONNECT_GRACE
+
+    def attach(self, hub: MarketDataHub) -> None:
+        """Use `hub` for upstream subscriptions, connecting it if needed and releasing the previous hub"""
+        with self._lock:
+            if self.hub is hub and hub.connected:
+                return
+            previous, self.hub = self.hub, hub
+            if previous is not None and previous is not hub:
+                # Subscriptions move to the new hub; the old connection is closed with its last user
+                for subscriptions in self._hub_subscriptions.values():
+                    for subscription in subscriptions:
+                        previous.unsubscribe(subscription)
+                self._hub_subscriptions.clear()
+                previous.disconnect()
+                self.upstream_replacements += 1
+            hub.connect()
+            self._attached_at = time.monotonic()
+            for symbol in self._symbol_refs:
+                if symbol not in self._hub_subscriptions:
+                    self._subscribe_upstream(symbol)
+
+    def connect(self, investor_id: str, jwt_token: str,
+                token_provider: Optional[Callable[[], str]] = None) -> None:
+        """
+        Open the shared upstream connection with a user's market data credentials,
+        unless a live one exists. `token_provider` returns a fresh JWT when the
+        connection refreshes its token; without one the feed stops when the JWT
+        expires, until a later caller replaces it.
+        """
+        if not self.needs_upstream:
+            return
+        client = MarketDataClient(investor_id, jwt_token)
+        client.market_data_token_provider = token_provider
+        self.attach(MarketDataHub.for_client(client))
+        logger.info(f"Market data stream connected upstream as investor {investor_id}")
+
+    def _subscribe_upstream(self, symbol: str) -> None:
+        self._hub_subscriptions[symbol] = [
+            self.hub.subscribe(topic(symbol), self._on_message) for topic in STREAM_TOPICS.values()
+        ]
+
+    def _on_message(self, topic: str, record: Any) -> None:
+        """Hub callback: store the latest record per (symbol, kind)"""
+        kind = getattr(record, 'kind', None)
+        if kind not in STREAM_TOPICS:
+            return
+        fields = record.to_dict()
+        del fields['symbol']
+        self.cache.publish((record.symbol, kind), fields, record.timestamp or None)
+
+    def open_client(self, symbols: List[str], loop: Optional[asyncio.AbstractEventLoop] = None) -> StreamClient:
+        """Register a stream client, subscribing upstream to symbols nobody was watching yet"""
+        if not symbols:
+            raise ValueError("At least one symbol is required")
+        if len(symbols) > MAX_SYMBOLS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_SYMBOLS_PER_CLIENT} symbols per stream")
+        with self._lock:
+            for symbol in symbols:
+                self._symbol_refs[symbol] = self._symbol_refs.get(symbol, 0) + 1
+                if self._symbol_refs[symbol] == 1 and self.hub is not None:
+                    self._subscribe_upstream(symbol)
+            client = StreamClient(
+                next(self._ids), symbols, self.cache, loop or asyncio.get_running_loop(), self.min_interval
+            )
+            self._clients[client.id] = client
+        logger.info(f"Stream client {client.id} opened for {', '.join(symbols)}")
+        return client
+
+    def close_client(self, client: StreamClient) -> None:
+        """Unregister a stream client, releasing upstream subscriptions nobody else needs"""
+        client.close()
+        with self._lock:
+            if self._clients.pop(client.id, None) is None:
+                return
+            for symbol in client.symbols:
+                self._symbol_refs[symbol] -= 1
+                if self._symbol_refs[symbol]:
+                    continue
+                del self._symbol_refs[symbol]
+                for subscription in self._hub_subscriptions.pop(symbol, []):
+                    self.hub.unsubscribe(subscription)
+        logger.info(f"Stream client {client.id} closed after {client.messages_sent} messages")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = [client.get_stats() for client in self._clients.values()]
+            symbols = dict(self._symbol_refs)
+        return {
+            'connected': self.is_connected,
+            'upstream_replacements': self.upstream_replacements,
+            'clients': len(clients),
+            'clients_dropped': self.clients_dropped,
+            'symbols': symbols,
+            'cache': self.cache.get_stats(),
+            'hub': self.hub.get_stats() if self.hub else None,
+            'client_stats': clients
+        }
+
+
+# Shared by the WebSocket and SSE routes
+market_stream_service = MarketStreamService()
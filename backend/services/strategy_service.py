@@ -1,9 +1,42 @@
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional, Union
 from dataclasses import dataclass
+from operator import itemgetter
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 
+from channels.tick_store import BAR_COLUMNS, TickStore
+from strategies.metrics import calculate_metrics, trade_columns
+
+# Backtest modes of execute_strategy
+MODE_BAR = 'bar'
+MODE_VECTORIZED = 'vectorized'
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average; NaN until `window` values are available"""
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if window <= len(values):
+        cumsum = np.cumsum(np.r_[0.0, values])
+        result[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (span + 1), seeded with the first value"""
+    return pd.Series(np.asarray(values, dtype=float)).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _forward_fill(values: np.ndarray, initial: float = 0.0) -> np.ndarray:
+    """Replace NaNs with the last non-NaN value before them (`initial` at the start)"""
+    values = np.r_[initial, values]
+    index = np.where(np.isnan(values), 0, np.arange(len(values)))
+    return values[np.maximum.accumulate(index)][1:]
+
+
 @dataclass
 class StrategyResult:
     trades: list
@@ -12,11 +45,51 @@ class StrategyResult:
     portfolio: Dict[str, Any]
 
 class StrategyService:
-    def __init__(self, initial_capital: float = 100_000_000):  # 100M VND default
+    def __init__(self, initial_capital: float = 100_000_000,  # 100M VND default
+                 tick_store: Optional[TickStore] = None):
         self.initial_capital = initial_capital
+        self.tick_store = tick_store
     
-    def execute_strategy(self, strategy_code: str, price_data: list, parameters: Dict[str, Any]) -> StrategyResult:
-        """Execute a trading strategy on historical data"""
+    def load_price_data(self, symbol: str, resolution: str = '1d', start: Optional[float] = None,
+                        end: Optional[float] = None) -> list:
+        """Bars aggregated from recorded ticks, in the format execute_strategy expects"""
+        if self.tick_store is None:
+            raise ValueError("No tick store configured for historical data")
+        bars = self.tick_store.bars(symbol, resolution, start, end)
+        return [
+            {
+                'date': datetime.fromtimestamp(bar_time),
+                'open': open_,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume
+            }
+            for bar_time, open_, high, low, close, volume in zip(*(bars[column].tolist() for column in BAR_COLUMNS))
+        ]
+    
+    def load_price_columns(self, symbol: str, resolution: str = '1d', start: Optional[float] = None,
+                           end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Bars aggregated from recorded ticks as NumPy columns, for the vectorized mode"""
+        if self.tick_store is None:
+            raise ValueError("No tick store configured for historical data")
+        return self.tick_store.bars(symbol, resolution, start, end)
+    
+    def execute_strategy(self, strategy_code: str, price_data: Union[list, Mapping[str, np.ndarray]],
+                         parameters: Dict[str, Any], mode: str = MODE_BAR) -> StrategyResult:
+        """
+        Execute a trading strategy on historical data.
+        
+        In the default per-bar mode the strategy is called for every bar with a
+        dict of that bar and the portfolio, and returns a signal dict or None;
+        use it for path-dependent logic. In the vectorized mode it is called
+        once, see _execute_vectorized.
+        """
+        if mode == MODE_VECTORIZED:
+            return self._execute_vectorized(strategy_code, price_data, parameters)
+        if mode != MODE_BAR:
+            raise ValueError(f"Unknown backtest mode: {mode}")
+        
         portfolio = {
             'cash': self.initial_capital,
             'position': 0,
@@ -25,6 +98,7 @@ class StrategyService:
         
         trades = []
         equity_curve = [portfolio['cash']]
+        position_values = [0.0]
         
         try:
             # Create strategy function
@@ -49,15 +123,104 @@ class StrategyService:
                         portfolio['history'].append(trade)
                 
                 # Update equity curve
-                current_value = portfolio['cash'] + (portfolio['position'] * bar['close'])
-                equity_curve.append(current_value)
+                position_value = portfolio['position'] * bar['close']
+                equity_curve.append(portfolio['cash'] + position_value)
+                position_values.append(position_value)
         
         except Exception as e:
             raise Exception(f"Strategy execution error: {str(e)}")
         
-        metrics = self._calculate_metrics(equity_curve, trades)
+        metrics = calculate_metrics(equity_curve, self._bar_timestamps([bar['date'] for bar in price_data]),
+                                    trade_columns(trades), position_values)
+        return StrategyResult(trades, equity_curve, metrics, portfolio)
+    
+    def _execute_vectorized(self, strategy_code: str, price_data: Union[list, Mapping[str, np.ndarray]],
+                            parameters: Dict[str, Any]) -> StrategyResult:
+        """
+        Vectorized backtest: the strategy is called once as strategy(data, parameters)
+        with `data` mapping open/high/low/close/volume to NumPy arrays (sma/ema and np
+        are available to it), and returns the target position in shares after each
+        bar's close (NaN keeps the previous target). Trades fill at the close, like
+        the per-bar mode; targets below zero are clipped (no shorting) and the first
+        bar is skipped. Targets must be affordable: unlike the per-bar mode, buys are
+        not rejected one by one when cash runs out, the backtest fails instead.
+        """
+        try:
+            data = self._price_columns(price_data)
+            close = data['close']
+            strategy_func = eval(f"lambda data, parameters: ({strategy_code})(data, parameters)")
+            
+            targets = np.asarray(strategy_func(data, parameters), dtype=float)
+            if targets.shape != close.shape:
+                raise ValueError(f"Strategy returned {targets.shape[0] if targets.ndim else 'a scalar'} "
+                                 f"targets for {len(close)} bars")
+            targets[:1] = 0.0  # Skip first bar
+            position = np.floor(np.maximum(_forward_fill(targets), 0.0)).astype(np.int64)
+            
+            # Fills, cash and equity as array operations
+            quantity = np.diff(position, prepend=0)
+            cash = self.initial_capital - np.cumsum(quantity * close)
+            equity = cash + position * close
+            if len(cash) and cash.min() < 0:
+                bar = int(np.argmax(cash < 0))
+                raise ValueError(f"Target positions need more cash than available at bar {bar}; "
+                                 "scale them down or use the per-bar mode")
+            
+            trades = []
+            for i in np.flatnonzero(quantity).tolist():
+                qty = int(abs(quantity[i]))
+                value = qty * float(close[i])
+                side = 'buy' if quantity[i] > 0 else 'sell'
+                trades.append({
+                    'date': data['date'][i] if 'date' in data else datetime.fromtimestamp(float(data['time'][i])),
+                    'side': side,
+                    'price': float(close[i]),
+                    'quantity': qty,
+                    'cost' if side == 'buy' else 'proceeds': value,
+                    'reason': 'Target position'
+                })
+        except Exception as e:
+            raise Exception(f"Strategy execution error: {str(e)}")
+        
+        portfolio = {
+            'cash': float(cash[-1]) if len(cash) else self.initial_capital,
+            'position': int(position[-1]) if len(position) else 0,
+            'history': trades
+        }
+        equity_curve = [self.initial_capital] + equity[1:].tolist()
+        position_values = position * close
+        metrics = calculate_metrics(equity_curve, self._bar_timestamps(data.get('date', data.get('time'))),
+                                    trade_columns(trades), position_values)
         return StrategyResult(trades, equity_curve, metrics, portfolio)
     
+    @staticmethod
+    def _bar_timestamps(dates) -> Optional[np.ndarray]:
+        """Bar times as epoch seconds from datetimes or numbers, None if they are neither"""
+        if dates is None:
+            return None
+        if len(dates) and isinstance(dates[0], datetime):
+            return np.array([date.timestamp() for date in dates])
+        try:
+            return np.asarray(dates, dtype=float)
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def _price_columns(price_data: Union[list, Mapping[str, np.ndarray]]) -> Dict[str, Any]:
+        """NumPy columns of bar dicts, or of a column mapping such as TickStore.bars() (float columns are not copied)"""
+        if isinstance(price_data, Mapping):
+            data = {column: np.asarray(price_data[column], dtype=float) for column in PRICE_COLUMNS}
+            # Bar open times (epoch seconds) are only turned into datetimes for the bars that trade
+            for column in ('date', 'time'):
+                if column in price_data:
+                    data[column] = price_data[column]
+            return data
+        get_columns = itemgetter(*PRICE_COLUMNS)
+        rows = np.array([get_columns(bar) for bar in price_data], dtype=float).reshape(-1, len(PRICE_COLUMNS))
+        data = {column: np.ascontiguousarray(rows[:, i]) for i, column in enumerate(PRICE_COLUMNS)}
+        data['date'] = [bar['date'] for bar in price_data]
+        return data
+    
     def _process_signal(self, signal: Dict[str, Any], bar: Dict[str, Any], portfolio: Dict[str, Any]) -> Dict[str, Any]:
         """Process a trading signal and update portfolio"""
         if signal['side'] == 'buy' and portfolio['cash'] >= signal['quantity'] * bar['close']:
@@ -89,48 +252,3 @@ class StrategyService:
             }
         
         return None
-    
-    def _calculate_metrics(self, equity_curve: list, trades: list) -> Dict[str, Any]:
-        """Calculate trading performance metrics"""
-        if len(equity_curve) < 2:
-            return {}
-        
-        initial_capital = equity_curve[0]
-        final_value = equity_curve[-1]
-        
-        # Calculate returns
-        returns = np.diff(equity_curve) / equity_curve[:-1]
-        
-        # Risk metrics
-        total_return = (final_value - initial_capital) / initial_capital
-        volatility = np.std(returns) * np.sqrt(252) if len(returns) > 1 else 0
-        mean_return = np.mean(returns) * 252
-        sharpe_ratio = mean_return / volatility if volatility > 0 else 0
-        
-        # Drawdown
-        underwater = pd.Series(equity_curve).expanding(min_periods=1).max() - equity_curve
-        max_drawdown = max(underwater / pd.Series(equity_curve).expanding(min_periods=1).max())
-        
-        # Trade analysis
-        winning_trades = [t for t in trades if t.get('proceeds', 0) - t['quantity'] * t['price'] > 0]
-        losing_trades = [t for t in trades if t.get('proceeds', 0) - t['quantity'] * t['price'] <= 0]
-        
-        win_rate = len(winning_trades) / len(trades) if trades else 0
-        avg_win = np.mean([t.get('proceeds', 0) - t['quantity'] * t['price'] for t in winning_trades]) if winning_trades else 0
-        avg_loss = np.mean([t.get('proceeds', 0) - t['quantity'] * t['price'] for t in losing_trades]) if losing_trades else 0
-        
-        return {
-            'total_return': total_return,
-            'sharpe_ratio': sharpe_ratio,
-            'max_drawdown': max_drawdown,
-            'volatility': volatility,
-            'win_rate': win_rate,
-            'total_trades': len(trades),
-            'winning_trades': len(winning_trades),
-            'losing_trades': len(losing_trades),
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
-            'sortino_ratio': sharpe_ratio * 1.4,  # Approximation
-            'calmar_ratio': total_return / abs(max_drawdown) if max_drawdown != 0 else 0
-        }
@@ -21,7 +21,17 @@ class ConfigManager:
             "mqtt_host": "datafeed-lts-krx.dnse.com.vn",
             "mqtt_port": 443,
             "timeout": 15,
-            "retry_attempts": 3
+            "retry_attempts": 3,
+            "async_client": True,
+            "pool_size": 200,
+            "pool_size_per_host": 100,
+            "order_rate_per_sec": 10.0,
+            "order_burst": 5,
+            "max_concurrent_orders": 8,
+            "order_event_topics": [],
+            "order_reconcile_interval": 60,
+            "dispatch_queue_size": 10000,
+            "dispatch_overflow": "drop_oldest"
         },
         "strategy": {
             "symbol": "HPG",
@@ -42,6 +52,7 @@ class ConfigManager:
             "ema_span_0": 12,
             "ema_span_1": 26,
             "use_ema_smoothing": True,
+            "ema_use_float": False,
             "price_precision": 0,
             "min_order_value": 100000
         },
@@ -54,6 +65,19 @@ class ConfigManager:
         },
         "operational": {
             "monitoring_interval": 5,
+            "min_poll_interval": 1,
+            "max_poll_interval": 60,
+            "poll_near_level_pct": 0.005,
+            "poll_far_level_pct": 0.05,
+            "poll_high_volatility": 0.002,
+            "poll_max_backoff": 120,
+            "poll_market_hours": True,
+            "conflate_market_data": True,
+            "market_data_dir": "market_data",
+            "market_data_warmup": 3600,
+            "bar_resolutions": ["1m", "5m", "1d"],
+            "trade_history_size": 1000,
+            "trade_history_dir": "trade_history",
             "log_level": "INFO",
             "log_file": "grid_bot.log",
             "enable_market_data_stream": True,
@@ -212,7 +236,13 @@ class ConfigManager:
             self.validation_errors.append("API timeout must be positive")
         if api_config.get('retry_attempts', 0) < 0:
             self.validation_errors.append("Retry attempts must be non-negative")
-    
+
+        # Validate market data dispatch settings
+        if api_config.get('dispatch_queue_size', 1) < 1:
+            self.validation_errors.append("Dispatch queue size must be positive")
+        if api_config.get('dispatch_overflow', 'drop_oldest') not in ('drop_oldest', 'conflate'):
+            self.validation_errors.append("Dispatch overflow must be 'drop_oldest' or 'conflate'")
+
     def _validate_strategy_config(self) -> None:
         """Validate strategy configuration"""
         strategy_config = self.config.get('strategy', {})
@@ -259,6 +289,14 @@ class ConfigManager:
         
         if op_config.get('monitoring_interval', 0) <= 0:
             self.validation_errors.append("Monitoring interval must be positive")
+        elif not (0 < op_config.get('min_poll_interval', 1) <= op_config['monitoring_interval']
+                  <= op_config.get('max_poll_interval', 60)):
+            self.validation_errors.append("Poll intervals must satisfy 0 < min <= monitoring interval <= max")
+        
+        valid_resolutions = ['1s', '1m', '5m', '15m', '30m', '1h', '1d']
+        invalid_resolutions = [r for r in op_config.get('bar_resolutions', []) if r not in valid_resolutions]
+        if invalid_resolutions:
+            self.validation_errors.append(f"Bar resolutions must be among: {', '.join(valid_resolutions)}")
         
         valid_log_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
         if op_config.get('log_level', 'INFO') not in valid_log_levels:
@@ -0,0 +1,345 @@
+# Order execution utilities for grid trading
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# DNSE order statuses (lower-cased, underscores removed) that are still working on the book
+OPEN_ORDER_STATUSES = {'pending', 'pendingnew', 'new', 'partiallyfilled'}
+
+# Statuses after which an order never works again
+TERMINAL_ORDER_STATUSES = {'filled', 'canceled', 'cancelled', 'rejected', 'expired'}
+
+def order_id_of(order: Dict[str, Any]) -> Optional[str]:
+    """Get the order ID from an order payload ('id' in the DNSE API, 'orderId' in older payloads)"""
+    order_id = order.get('id', order.get('orderId'))
+    return str(order_id) if order_id is not None else None
+
+def order_status_of(order: Dict[str, Any]) -> str:
+    """Get the normalized order status ('partiallyFilled' and 'PARTIALLY_FILLED' -> 'partiallyfilled')"""
+    status = order.get('orderStatus', order.get('status')) or ''
+    return str(status).replace('_', '').lower()
+
+def order_filled_qty_of(order: Dict[str, Any]) -> int:
+    """Get the cumulative filled quantity ('fillQuantity' in the DNSE API, 'executedQuantity' in older payloads)"""
+    filled = order.get('fillQuantity', order.get('executedQuantity'))
+    try:
+        return int(filled or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def order_avg_price_of(order: Dict[str, Any]) -> Optional[Decimal]:
+    """Get the average fill price, or None if the payload doesn't carry one"""
+    price = order.get('averagePrice')
+    if price in (None, ''):
+        return None
+    try:
+        return Decimal(str(price))
+    except InvalidOperation:
+        return None
+
+def extract_orders(response: Any) -> List[Dict[str, Any]]:
+    """Get the order list from a get_orders response (either {'orders': [...]} or a bare list)"""
+    if isinstance(response, dict):
+        return response.get('orders') or []
+    return list(response or [])
+
+@dataclass
+class OrderChange:
+    """What changed on one order since it was last seen"""
+    order_id: str
+    status: str
+    previous_status: Optional[str]
+    filled_quantity: int  # Cumulative filled quantity
+    fill_quantity: int  # Quantity newly filled since the previous update
+    fill_price: Optional[Decimal] = None  # Average price of the newly filled quantity
+
+    @property
+    def is_open(self) -> bool:
+        """False only once the order reached an explicit terminal status"""
+        return self.status not in TERMINAL_ORDER_STATUSES
+
+class OrderStateTracker:
+    """
+    Remembers the last seen status and filled quantity of each order and turns
+    repeated full snapshots (polls or pushed events) into incremental changes.
+
+    update() returns None when nothing moved, so unchanged orders cost one dict
+    lookup. Fills are reported as deltas of the cumulative filled quantity, so a
+    partial fill seen by both the event stream and a poll is counted once, and
+    stale updates that would move an order backwards are ignored. An update
+    without a status, or with one not listed above (deal events often carry
+    none), keeps the order's previous status.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, Tuple[str, int, Optional[Decimal]]] = {}  # id -> (status, filled, avg price)
+
+        # Statistics
+        self.updates_seen = 0
+        self.changes_dispatched = 0
+        self.stale_ignored = 0
+
+    def update(self, order: Dict[str, Any]) -> Optional[OrderChange]:
+        """Record the latest state of an order; returns the change, or None if nothing moved"""
+        order_id = order_id_of(order)
+        if order_id is None:
+            return None
+        self.updates_seen += 1
+
+        status = order_status_of(order)
+        filled = order_filled_qty_of(order)
+        avg_price = order_avg_price_of(order)
+
+        previous = self._states.get(order_id)
+        if previous is None:
+            prev_status, prev_filled, prev_avg = None, 0, None
+        else:
+            prev_status, prev_filled, prev_avg = previous
+            if status not in OPEN_ORDER_STATUSES and status not in TERMINAL_ORDER_STATUSES:
+                status = prev_status
+            if status == prev_status and filled == prev_filled:
+                return None
+            reopened = prev_status in TERMINAL_ORDER_STATUSES and status not in TERMINAL_ORDER_STATUSES
+            if filled < prev_filled or reopened:
+                # Older snapshot arriving after a newer one
+                self.stale_ignored += 1
+                return None
+
+        self._states[order_id] = (status, filled, avg_price)
+
+        fill_quantity = filled - prev_filled
+        fill_price = None
+        if fill_quantity > 0 and avg_price is not None:
+            if prev_filled and prev_avg is not None:
+                # Back out the price of the new fills from the cumulative average
+                fill_price = (avg_price * filled - prev_avg * prev_filled) / fill_quantity
+            else:
+                fill_price = avg_price
+
+        self.changes_dispatched += 1
+        return OrderChange(
+            order_id=order_id,
+            status=status,
+            previous_status=prev_status,
+            filled_quantity=filled,
+            fill_quantity=fill_quantity,
+            fill_price=fill_price
+        )
+
+    def forget(self, order_id: Any) -> None:
+        """Stop tracking an order that is no longer of interest"""
+        self._states.pop(str(order_id), None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get tracker statistics"""
+        return {
+            'tracked_orders': len(self._states),
+            'updates_seen': self.updates_seen,
+            'changes_dispatched': self.changes_dispatched,
+            'stale_ignored': self.stale_ignored
+        }
+
+class TokenBucket:
+    """
+    Asyncio token-bucket rate limiter.
+
+    Allows bursts of up to `capacity` requests and a sustained rate of `rate`
+    requests per second. Callers reserve their tokens immediately, so concurrent
+    waiters are released in arrival order without needing a lock.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else self.rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+        # Statistics
+        self.total_acquired = 0
+        self.total_throttled = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available; returns the time spent waiting in seconds"""
+        self._refill()
+        self._tokens -= tokens
+        self.total_acquired += 1
+
+        if self._tokens >= 0:
+            return 0.0
+
+        wait = -self._tokens / self.rate
+        self.total_throttled += 1
+        self.total_wait_seconds += wait
+        await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take `tokens` without waiting; returns False if the bucket is empty"""
+        self._refill()
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        self.total_acquired += 1
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get rate limiter statistics"""
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'acquired': self.total_acquired,
+            'throttled': self.total_throttled,
+            'total_wait_seconds': self.total_wait_seconds
+        }
+
+class LatencyTracker:
+    """Keeps the most recent request latencies and summarizes them"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+
+    def record(self, latency_ms: float) -> None:
+        """Record a latency sample in milliseconds"""
+        self.samples.append(latency_ms)
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        """Get count, average, median, p95 and max of the retained samples"""
+        if not self.samples:
+            return {'count': self.count}
+
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {
+            'count': self.count,
+            'avg_ms': sum(ordered) / n,
+            'p50_ms': ordered[n // 2],
+            'p95_ms': ordered[min(n - 1, int(n * 0.95))],
+            'max_ms': ordered[-1]
+        }
+
+@dataclass
+class CancelReport:
+    """Outcome of a bulk cancel"""
+    requested: int = 0
+    cancelled: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)  # order_id -> last error
+    still_open: List[str] = field(default_factory=list)
+    retries: int = 0
+    reconcile_passes: int = 0
+    flat_seconds: Optional[float] = None  # Time until the book was confirmed flat
+
+    @property
+    def is_flat(self) -> bool:
+        return self.flat_seconds is not None
+
+class BulkCancelEngine:
+    """
+    Cancels many orders in parallel with bounded concurrency and per-order retry,
+    then reconciles against the order book and re-cancels anything still working
+    until the book is flat or the reconcile passes are exhausted.
+    """
+
+    def __init__(self, cancel_func: Callable[[Any], Awaitable[Any]],
+                 fetch_orders_func: Callable[[], Awaitable[Any]],
+                 max_concurrency: int = 8, max_attempts: int = 3,
+                 retry_delay: float = 0.2, reconcile_passes: int = 2,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.cancel_func = cancel_func
+        self.fetch_orders_func = fetch_orders_func
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.reconcile_passes = reconcile_passes
+        self.rate_limiter = rate_limiter
+
+    async def cancel_all(self, order_ids: Iterable[Any]) -> CancelReport:
+        """Cancel every order in `order_ids` and report how long the book took to go flat"""
+        started = time.monotonic()
+        by_key = {str(order_id): order_id for order_id in order_ids}
+        report = CancelReport(requested=len(by_key))
+        if not by_key:
+            report.flat_seconds = 0.0
+            return report
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending = list(by_key)
+        open_ids: Optional[Set[str]] = None
+
+        for pass_no in range(self.reconcile_passes + 1):
+            if pass_no > 0:
+                report.reconcile_passes += 1
+                logger.warning(f"Reconcile pass {pass_no}: re-cancelling {len(pending)} orders still open")
+
+            await asyncio.gather(*(
+                self._cancel_one(by_key[key], key, semaphore, report) for key in pending
+            ))
+
+            open_ids = await self._fetch_open_ids(set(by_key))
+            if open_ids is None:
+                break
+            if not open_ids:
+                report.flat_seconds = time.monotonic() - started
+                break
+            pending = sorted(open_ids)
+
+        if open_ids is None:
+            # Order book unavailable: anything we failed to cancel may still be working
+            report.still_open = sorted(report.failed)
+        else:
+            report.still_open = sorted(open_ids)
+        return report
+
+    async def _cancel_one(self, order_id: Any, key: str, semaphore: asyncio.Semaphore,
+                          report: CancelReport) -> bool:
+        for attempt in range(self.max_attempts):
+            if attempt > 0:
+                report.retries += 1
+                await asyncio.sleep(self.retry_delay * (2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire()
+                    await self.cancel_func(order_id)
+                if key not in report.cancelled:
+                    report.cancelled.append(key)
+                report.failed.pop(key, None)
+                return True
+            except Exception as e:
+                report.failed[key] = str(e)
+                logger.debug(f"Cancel attempt {attempt + 1} for order {key} failed: {e}")
+
+        logger.error(f"Failed to cancel order {key} after {self.max_attempts} attempts: {report.failed[key]}")
+        return False
+
+    async def _fetch_open_ids(self, order_ids: Set[str]) -> Optional[Set[str]]:
+        """Get which of `order_ids` are still working on the book; None if the book can't be read"""
+        try:
+            orders = extract_orders(await self.fetch_orders_func())
+        except Exception as e:
+            logger.error(f"Failed to fetch orders for cancel reconciliation: {e}")
+            return None
+
+        return {
+            order_id_of(order) for order in orders
+            if order_id_of(order) in order_ids and order_status_of(order) in OPEN_ORDER_STATUSES
+        }
@@ -1,6 +1,7 @@
 # Core grid trading base classes and utilities
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Any
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union, Any
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime
 import math
@@ -8,16 +9,179 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-@dataclass
 class GridLevel:
-    """Represents a single level in the grid"""
-    price: Decimal
-    quantity: int
-    side: str  # 'BUY' or 'SELL'
-    order_id: Optional[str] = None
-    is_filled: bool = False
-    filled_time: Optional[datetime] = None
-    grid_index: int = 0
+    """Represents a single level in the grid (slotted, grids can hold hundreds of levels)"""
+    __slots__ = ('price', 'quantity', 'side', 'order_id', 'is_filled', 'filled_time', 'grid_index')
+    
+    def __init__(self, price: Decimal, quantity: int, side: str,  # side: 'BUY' or 'SELL'
+                 order_id: Optional[str] = None, is_filled: bool = False,
+                 filled_time: Optional[datetime] = None, grid_index: int = 0):
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.order_id = order_id
+        self.is_filled = is_filled
+        self.filled_time = filled_time
+        self.grid_index = grid_index
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"GridLevel({fields})"
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GridLevel):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    __hash__ = None  # Mutable, like the dataclass it replaces
+
+class GridBook:
+    """
+    Grid levels keyed by order ID, with a sorted price index per side.
+
+    Works as a drop-in for the old order_id -> GridLevel dict, and keeps live
+    counters so that counting open orders, checking for an existing order at a
+    price and finding the level nearest to a price don't scan the whole grid.
+    Open levels are indexed; filled ones stay in the book until removed.
+    Levels must not be re-priced or re-sided while they are in the book.
+    """
+
+    SIDES = ('BUY', 'SELL')
+
+    def __init__(self):
+        self._levels: Dict[str, GridLevel] = {}
+        self._prices: Dict[str, List[Decimal]] = {side: [] for side in self.SIDES}  # sorted open prices
+        self._at_price: Dict[str, Dict[Decimal, int]] = {side: {} for side in self.SIDES}  # open price -> count
+        self._open_notional: Dict[str, Decimal] = {side: Decimal('0') for side in self.SIDES}
+        self._filled_ids: Set[str] = set()
+
+    # Mapping interface
+    def __getitem__(self, order_id: str) -> GridLevel:
+        return self._levels[order_id]
+
+    def __setitem__(self, order_id: str, level: GridLevel) -> None:
+        if order_id in self._levels:
+            self._unindex(order_id, self._levels[order_id])
+        self._levels[order_id] = level
+        self._index(order_id, level)
+
+    def __delitem__(self, order_id: str) -> None:
+        self._unindex(order_id, self._levels.pop(order_id))
+
+    def __contains__(self, order_id: object) -> bool:
+        return order_id in self._levels
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._levels)
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def get(self, order_id: Optional[str], default: Optional[GridLevel] = None) -> Optional[GridLevel]:
+        return self._levels.get(order_id, default)
+
+    def pop(self, order_id: str, default: Optional[GridLevel] = None) -> Optional[GridLevel]:
+        level = self._levels.pop(order_id, None)
+        if level is None:
+            return default
+        self._unindex(order_id, level)
+        return level
+
+    def keys(self):
+        return self._levels.keys()
+
+    def values(self):
+        return self._levels.values()
+
+    def items(self):
+        return self._levels.items()
+
+    # Index maintenance
+    def _index(self, order_id: str, level: GridLevel) -> None:
+        if level.is_filled:
+            self._filled_ids.add(order_id)
+            return
+        side = level.side
+        insort(self._prices[side], level.price)
+        self._at_price[side][level.price] = self._at_price[side].get(level.price, 0) + 1
+        self._open_notional[side] += level.price * level.quantity
+
+    def _unindex(self, order_id: str, level: GridLevel) -> None:
+        if order_id in self._filled_ids:
+            self._filled_ids.discard(order_id)
+            return
+        side = level.side
+        prices = self._prices[side]
+        del prices[bisect_left(prices, level.price)]
+        remaining = self._at_price[side][level.price] - 1
+        if remaining:
+            self._at_price[side][level.price] = remaining
+        else:
+            del self._at_price[side][level.price]
+        self._open_notional[side] -= level.price * level.quantity
+
+    def mark_filled(self, order_id: str, filled_time: Optional[datetime] = None) -> Optional[GridLevel]:
+        """Mark a level filled and move it out of the open index"""
+        level = self._levels.get(order_id)
+        if level is None or level.is_filled:
+            return level
+        self._unindex(order_id, level)
+        level.is_filled = True
+        level.filled_time = filled_time or datetime.now()
+        self._index(order_id, level)
+        return level
+
+    # Queries
+    def count_open(self, side: Optional[str] = None) -> int:
+        """Number of open levels on one side, or both"""
+        if side:
+            return len(self._prices[side])
+        return sum(len(prices) for prices in self._prices.values())
+
+    def count_filled(self) -> int:
+        return len(self._filled_ids)
+
+    def open_notional(self, side: Optional[str] = None) -> Decimal:
+        """Sum of price * quantity over open levels on one side, or both"""
+        if side:
+            return self._open_notional[side]
+        return sum(self._open_notional.values(), Decimal('0'))
+
+    def has_open_price(self, side: str, price: Decimal) -> bool:
+        """Whether an open level already sits at this price"""
+        return price in self._at_price[side]
+
+    def open_prices(self, side: str) -> List[Decimal]:
+        """Open level prices on one side, ascending"""
+        return list(self._prices[side])
+
+    def nearest_open_price(self, price: Decimal, side: Optional[str] = None) -> Optional[Decimal]:
+        """Open level price closest to `price` on one side, or both"""
+        best = None
+        for s in ((side,) if side else self.SIDES):
+            prices = self._prices[s]
+            i = bisect_left(prices, price)
+            for candidate in prices[max(0, i - 1):i + 1]:
+                if best is None or abs(candidate - price) < abs(best - price):
+                    best = candidate
+        return best
+
+    def filled_order_ids(self) -> List[str]:
+        return list(self._filled_ids)
+
+    def open_order_ids(self) -> List[str]:
+        return [order_id for order_id in self._levels if order_id not in self._filled_ids]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get live book counters"""
+        return {
+            'levels': len(self._levels),
+            'open_buys': self.count_open('BUY'),
+            'open_sells': self.count_open('SELL'),
+            'filled': self.count_filled(),
+            'open_buy_notional': float(self._open_notional['BUY']),
+            'open_sell_notional': float(self._open_notional['SELL'])
+        }
 
 @dataclass
 class GridPosition:
@@ -84,11 +248,41 @@ class GridConfig:
     ema_span_0: int = 12
     ema_span_1: int = 26
     use_ema_smoothing: bool = True
+    ema_use_float: bool = False  # Float EMAs are faster, Decimal EMAs are exact
     
     # Operational
     price_precision: int = 0  # For VN stocks, typically 1 VND precision
     min_order_value: Decimal = Decimal('100000')  # 100k VND minimum order
     
+    # Order Throttling
+    order_rate_per_sec: float = 10.0  # Sustained order requests per second
+    order_burst: int = 5  # Requests allowed back-to-back before throttling
+    max_concurrent_orders: int = 8  # Maximum in-flight order requests
+    
+    # Order Events
+    order_event_topics: List[str] = field(default_factory=list)  # MQTT order/deal topics, {account_no}/{symbol} placeholders
+    order_reconcile_interval: int = 60  # Seconds between safety polls while the event stream is healthy
+    
+    # Monitoring Loop Scheduling
+    monitoring_interval: float = 5.0  # Base seconds between monitoring iterations
+    min_poll_interval: float = 1.0  # Used when price is near a level or volatility is high
+    max_poll_interval: float = 60.0  # Used when the market is closed or price is far from every level
+    poll_near_level_pct: Decimal = Decimal('0.005')  # 0.5% from a level counts as near
+    poll_far_level_pct: Decimal = Decimal('0.05')  # 5% from every level counts as far
+    poll_high_volatility: Decimal = Decimal('0.002')  # Volatility that counts as high
+    poll_max_backoff: float = 120.0  # Cap on the exponential backoff after API errors
+    poll_market_hours: bool = True  # Relax to max_poll_interval outside trading sessions
+    
+    # Market Data
+    conflate_market_data: bool = True  # Process only the latest price per symbol instead of every tick
+    market_data_dir: Optional[str] = None  # Ticks and best bid/offer are recorded here, not recorded if None
+    market_data_warmup: float = 3600.0  # Seconds of recorded ticks replayed into price history at startup
+    bar_resolutions: List[str] = field(default_factory=list)  # OHLC bars built from ticks (and recorded), e.g. '1m'
+    
+    # Trade History
+    trade_history_size: int = 1000  # Trades kept in memory
+    trade_history_dir: Optional[str] = None  # Older trades are appended here, dropped if None
+    
     def validate(self) -> List[str]:
         """Validate configuration parameters"""
         errors = []
@@ -108,48 +302,100 @@ class GridConfig:
         if self.ddown_factor < 1:
             errors.append("DCA factor must be >= 1")
             
+        if self.order_rate_per_sec <= 0 or self.order_burst < 1 or self.max_concurrent_orders < 1:
+            errors.append("Order rate, burst and concurrency must be positive")
+            
+        if not 0 < self.min_poll_interval <= self.monitoring_interval <= self.max_poll_interval:
+            errors.append("Poll intervals must satisfy 0 < min <= monitoring interval <= max")
+            
+        if self.trade_history_size < 1:
+            errors.append("Trade history size must be positive")
+            
         return errors
 
+class IncrementalEMA:
+    """
+    Exponential moving averages for several spans, updated in O(1) per price.
+
+    Each EMA is seeded with the first price and then follows
+    ema += alpha * (price - ema), alpha = 2 / (span + 1), so the values never
+    drift from the full-history EMA. Decimal mode is exact; float mode is
+    faster and returns floats.
+    """
+    
+    def __init__(self, spans: Sequence[int], use_float: bool = False):
+        if not spans or any(span < 1 for span in spans):
+            raise ValueError("EMA spans must be positive")
+        self.spans = tuple(spans)
+        self.use_float = use_float
+        self._alphas = tuple(
+            2.0 / (span + 1) if use_float else Decimal('2') / Decimal(span + 1)
+            for span in self.spans
+        )
+        self._values: Optional[List[Union[Decimal, float]]] = None
+        self.count = 0
+    
+    def update(self, price: Union[Decimal, float]) -> Tuple[Union[Decimal, float], ...]:
+        """Add a price and return the EMA for each span"""
+        price = float(price) if self.use_float else (price if isinstance(price, Decimal) else Decimal(str(price)))
+        values = self._values
+        if values is None:
+            self._values = values = [price] * len(self.spans)
+        else:
+            for i, alpha in enumerate(self._alphas):
+                values[i] += alpha * (price - values[i])
+        self.count += 1
+        return tuple(values)
+    
+    @property
+    def values(self) -> Optional[Tuple[Union[Decimal, float], ...]]:
+        return tuple(self._values) if self._values is not None else None
+    
+    def value(self, span: int) -> Optional[Union[Decimal, float]]:
+        """Current EMA for one span, None before the first price"""
+        if self._values is None:
+            return None
+        return self._values[self.spans.index(span)]
+    
+    def reset(self) -> None:
+        self._values = None
+        self.count = 0
+    
+    @staticmethod
+    def series(prices: Iterable[float], spans: Sequence[int]) -> Dict[int, Any]:
+        """
+        Compute the EMA of a whole price array for each span (for backtests).
+
+        Uses pandas' ewm (adjust=False), which follows the same recursion and
+        seed as update(); returns span -> numpy array.
+        """
+        import pandas as pd  # Only needed for batch computation
+        
+        prices = pd.Series(prices, dtype='float64')
+        return {span: prices.ewm(span=span, adjust=False).mean().to_numpy() for span in spans}
+
 class EMASmoother:
     """Exponential Moving Average calculator for smoothing entries"""
     
-    def __init__(self, span_0: int = 12, span_1: int = 26):
+    def __init__(self, span_0: int = 12, span_1: int = 26, use_float: bool = False):
         self.span_0 = span_0
         self.span_1 = span_1
-        self.ema_0_values = []
-        self.ema_1_values = []
+        self.engine = IncrementalEMA((span_0, span_1), use_float=use_float)
         
     def add_price(self, price: Decimal) -> Tuple[Optional[Decimal], Optional[Decimal]]:
         """Add a new price and return updated EMAs"""
-        self.ema_0_values.append(price)
-        self.ema_1_values.append(price)
-        
-        # Keep only necessary values for calculation
-        if len(self.ema_0_values) > self.span_0 * 2:
-            self.ema_0_values = self.ema_0_values[-self.span_0:]
-        if len(self.ema_1_values) > self.span_1 * 2:
-            self.ema_1_values = self.ema_1_values[-self.span_1:]
-            
-        ema_0 = self._calculate_ema(self.ema_0_values, self.span_0)
-        ema_1 = self._calculate_ema(self.ema_1_values, self.span_1)
-        
+        ema_0, ema_1 = self.engine.update(price)
         return ema_0, ema_1
     
-    def _calculate_ema(self, values: List[Decimal], span: int) -> Optional[Decimal]:
-        """Calculate EMA for given values and span"""
-        if len(values) == 0:
-            return None
-            
-        if len(values) == 1:
-            return values[0]
-            
-        multiplier = Decimal('2') / (Decimal(str(span)) + Decimal('1'))
-        ema = values[0]
-        
-        for value in values[1:]:
-            ema = (value * multiplier) + (ema * (Decimal('1') - multiplier))
-            
-        return ema
+    @property
+    def ema_0(self) -> Optional[Decimal]:
+        values = self.engine.values
+        return values[0] if values else None
+    
+    @property
+    def ema_1(self) -> Optional[Decimal]:
+        values = self.engine.values
+        return values[1] if values else None
 
 class PriceUtils:
     """Utility functions for price calculations"""
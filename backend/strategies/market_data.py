@@ -2,9 +2,18 @@
 import asyncio
 import json
 import logging
+import time
 from decimal import Decimal
-from typing import Dict, Optional, Callable, Any
-from datetime import datetime, timedelta
+from typing import Dict, Optional, Callable, Any, Union
+from datetime import datetime
+
+from .price_history import PriceHistory
+from .rolling_stats import TickStatistics
+from channels.conflation import ConflatedSubscription, ConflatingCache
+from channels.connection_manager import GapEvent
+from channels.market_data_hub import HubSubscription, MarketDataHub
+from channels.tick_decoder import Tick, TopPrice, tick_topic, top_price_topic
+from channels.tick_store import TickStore
 
 logger = logging.getLogger(__name__)
 
@@ -13,18 +22,30 @@ class MarketDataHandler:
     Handles real-time market data streams for the grid trading bot
     """
     
-    def __init__(self, api_client, symbol: str):
+    def __init__(self, api_client, symbol: str, hub: Optional[MarketDataHub] = None):
         self.api_client = api_client
         self.symbol = symbol
+        # Connection shared with every other handler on the same client
+        self.hub = hub
+        self._subscriptions: list[HubSubscription] = []
         self.current_price: Optional[Decimal] = None
         self.last_update: Optional[datetime] = None
         
         # Callbacks for price updates
         self.price_callbacks: list[Callable[[Decimal], None]] = []
         
-        # Price history for analysis
-        self.price_history: list[Dict[str, Any]] = []
+        # Price history for analysis (ring buffer, raw payloads are not kept)
         self.max_history_size = 1000
+        self.price_history = PriceHistory(self.max_history_size)
+        self.tick_stats = TickStatistics()
+        
+        # Latest price per symbol for conflated subscribers
+        self.conflation = ConflatingCache()
+        
+        # Updates possibly missed while the market data connection was down
+        self.gap_callbacks: list[Callable[[GapEvent], None]] = []
+        self.last_gap: Optional[GapEvent] = None
+        self.gap_count = 0
         
         # Connection status
         self.is_connected = False
@@ -34,16 +55,17 @@ class MarketDataHandler:
         try:
             logger.info(f"Connecting to market data for {self.symbol}")
             
-            # Connect to MQTT market data
-            self.api_client.connect_market_data()
+            # Connect to MQTT market data through the shared hub
+            if self.hub is None:
+                self.hub = MarketDataHub.for_client(self.api_client)
+            self.hub.connect()
+            self.hub.add_gap_listener(self._on_gap)
             
-            # Subscribe to price updates for the symbol
-            price_topic = f"market/price/{self.symbol}"
-            self.api_client.subscribe(price_topic, self._on_price_update)
+            # Subscribe to KRX matched trades for the symbol, decoded into Tick records
+            self._subscriptions.append(self.hub.subscribe(tick_topic(self.symbol), self._on_price_update))
             
-            # Also subscribe to order book updates if available
-            orderbook_topic = f"market/orderbook/{self.symbol}"
-            self.api_client.subscribe(orderbook_topic, self._on_orderbook_update)
+            # Also subscribe to best bid/offer updates
+            self._subscriptions.append(self.hub.subscribe(top_price_topic(self.symbol), self._on_orderbook_update))
             
             self.is_connected = True
             logger.info(f"Successfully connected to market data for {self.symbol}")
@@ -57,35 +79,62 @@ class MarketDataHandler:
         """Disconnect from market data stream"""
         try:
             if self.is_connected:
-                self.api_client.disconnect_market_data()
+                # Leave the hub; the upstream connection closes with its last user
+                for subscription in self._subscriptions:
+                    self.hub.unsubscribe(subscription)
+                self._subscriptions.clear()
+                self.hub.remove_gap_listener(self._on_gap)
+                self.hub.disconnect()
                 self.is_connected = False
                 logger.info("Disconnected from market data")
         except Exception as e:
             logger.error(f"Error disconnecting from market data: {e}")
     
-    def _on_price_update(self, topic: str, payload: Dict[str, Any]) -> None:
+    def _on_gap(self, gap: GapEvent) -> None:
+        """Hub gap listener: the first update for the symbol after a reconnect"""
+        if gap.symbol != self.symbol:
+            return
+        self.last_gap = gap
+        self.gap_count += 1
+        logger.warning(f"Market data for {self.symbol} resumed after a {gap.duration:.1f}s gap")
+        for callback in self.gap_callbacks:
+            try:
+                callback(gap)
+            except Exception as e:
+                logger.error(f"Error in gap callback: {e}")
+    
+    def _on_price_update(self, topic: str, payload: Union[Tick, Dict[str, Any]]) -> None:
         """Handle incoming price updates"""
         try:
-            # Extract price from payload (format may vary based on DNSE API)
-            price_data = payload.get('data', payload)
-            
-            # Try different possible price field names
-            price = None
-            for price_field in ['price', 'last_price', 'close', 'current_price']:
-                if price_field in price_data:
-                    price = Decimal(str(price_data[price_field]))
-                    break
-            
-            if price is None:
-                logger.warning(f"Could not extract price from payload: {payload}")
-                return
+            if isinstance(payload, Tick):
+                price = Decimal(str(payload.price))
+                volume = payload.quantity
+                timestamp = payload.timestamp or None
+            else:
+                # Untyped payload (format may vary based on DNSE API)
+                price_data = payload.get('data', payload)
+                
+                # Try different possible price field names
+                price = None
+                for price_field in ['price', 'last_price', 'close', 'current_price']:
+                    if price_field in price_data:
+                        price = Decimal(str(price_data[price_field]))
+                        break
+                
+                if price is None:
+                    logger.warning(f"Could not extract price from payload: {payload}")
+                    return
+                volume = price_data.get('volume', price_data.get('matchQtty', 0)) or 0
+                timestamp = None
             
             # Update current price
             self.current_price = price
             self.last_update = datetime.now()
             
-            # Add to price history
-            self._add_to_history(price_data)
+            # Add to price history and streaming statistics
+            self._add_to_history(price)
+            self.tick_stats.update(float(price), float(volume))
+            self.conflation.publish(self.symbol, price, timestamp)
             
             # Notify callbacks
             for callback in self.price_callbacks:
@@ -99,11 +148,14 @@ class MarketDataHandler:
         except Exception as e:
             logger.error(f"Error processing price update: {e}")
     
-    def _on_orderbook_update(self, topic: str, payload: Dict[str, Any]) -> None:
+    def _on_orderbook_update(self, topic: str, payload: Union[TopPrice, Dict[str, Any]]) -> None:
         """Handle incoming order book updates"""
         try:
             # Extract bid/ask prices for better price discovery
-            orderbook = payload.get('data', payload)
+            if isinstance(payload, TopPrice):
+                orderbook = {'bids': payload.bids, 'asks': payload.offers}
+            else:
+                orderbook = payload.get('data', payload)
             
             if 'bids' in orderbook and 'asks' in orderbook:
                 bids = orderbook['bids']
@@ -121,6 +173,7 @@ class MarketDataHandler:
                         if not self.current_price or abs(mid_price - self.current_price) > Decimal('0.01'):
                             self.current_price = mid_price
                             self.last_update = datetime.now()
+                            self.conflation.publish(self.symbol, mid_price)
                             
                             # Notify callbacks
                             for callback in self.price_callbacks:
@@ -132,33 +185,50 @@ class MarketDataHandler:
         except Exception as e:
             logger.error(f"Error processing orderbook update: {e}")
     
-    def _add_to_history(self, price_data: Dict[str, Any]) -> None:
-        """Add price data to history"""
+    def _add_to_history(self, price: Decimal) -> None:
+        """Add a price tick to history"""
         try:
-            history_entry = {
-                'timestamp': datetime.now(),
-                'price': float(self.current_price) if self.current_price else None,
-                'data': price_data
-            }
-            
-            self.price_history.append(history_entry)
-            
-            # Limit history size
-            if len(self.price_history) > self.max_history_size:
-                self.price_history = self.price_history[-self.max_history_size:]
-                
+            self.price_history.append(float(price))
         except Exception as e:
             logger.error(f"Error adding to price history: {e}")
     
+    def warm_up(self, store: TickStore, lookback_seconds: float = 3600.0) -> int:
+        """Replay recently recorded ticks into price history and statistics; returns the ticks replayed"""
+        now = time.time()
+        ticks = store.query(self.symbol, now - lookback_seconds, now, columns=('timestamp', 'price', 'quantity'))
+        start = max(0, len(ticks['timestamp']) - self.max_history_size)
+        replayed = 0
+        for timestamp, price, quantity in zip(ticks['timestamp'][start:].tolist(), ticks['price'][start:].tolist(),
+                                              ticks['quantity'][start:].tolist()):
+            self.price_history.append(price, timestamp)
+            self.tick_stats.update(price, float(quantity))
+            replayed += 1
+        if replayed:
+            logger.info(f"Warmed up {self.symbol} market data with {replayed} recorded ticks")
+        return replayed
+    
     def add_price_callback(self, callback: Callable[[Decimal], None]) -> None:
         """Add a callback function to be called on price updates"""
         self.price_callbacks.append(callback)
     
+    def add_gap_callback(self, callback: Callable[[GapEvent], None]) -> None:
+        """Add callback for updates missed while disconnected (called on the dispatch thread)"""
+        self.gap_callbacks.append(callback)
+    
     def remove_price_callback(self, callback: Callable[[Decimal], None]) -> None:
         """Remove a price callback"""
         if callback in self.price_callbacks:
             self.price_callbacks.remove(callback)
     
+    def subscribe_conflated(self, on_update: Optional[Callable[[], None]] = None) -> ConflatedSubscription:
+        """
+        Subscribe to the latest price only: each read() returns at most one
+        update per symbol with its sequence number and the count of skipped
+        ticks. `on_update` is called from the market data thread when the
+        subscription has something new to read.
+        """
+        return self.conflation.subscribe(on_update=on_update)
+    
     def get_current_price(self) -> Optional[Decimal]:
         """Get the current market price"""
         return self.current_price
@@ -177,37 +247,30 @@ class MarketDataHandler:
     
     def get_price_history(self, limit: Optional[int] = None) -> list[Dict[str, Any]]:
         """Get price history"""
-        if limit:
-            return self.price_history[-limit:]
-        return self.price_history.copy()
+        timestamps, prices = self.price_history.latest(limit)
+        return [
+            {'timestamp': datetime.fromtimestamp(ts), 'price': price}
+            for ts, price in zip(timestamps.tolist(), prices.tolist())
+        ]
+    
+    def get_dispatch_stats(self) -> Optional[Dict[str, Any]]:
+        """Get the API client's market data dispatch queue metrics, if it has one"""
+        get_stats = getattr(self.api_client, 'get_dispatch_stats', None)
+        return get_stats() if callable(get_stats) else None
+    
+    def get_hub_stats(self) -> Optional[Dict[str, Any]]:
+        """Get subscription and fan-out counters of the shared market data hub"""
+        return self.hub.get_stats() if self.hub else None
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get streaming tick statistics (rolling mean/std, min/max, VWAP, returns)"""
+        return self.tick_stats.snapshot()
     
     def calculate_volatility(self, period_minutes: int = 60) -> Optional[Decimal]:
         """Calculate price volatility over the specified period"""
         try:
-            cutoff_time = datetime.now() - timedelta(minutes=period_minutes)
-            recent_prices = [
-                Decimal(str(entry['price'])) 
-                for entry in self.price_history 
-                if entry['timestamp'] >= cutoff_time and entry['price'] is not None
-            ]
-            
-            if len(recent_prices) < 2:
-                return None
-            
-            # Calculate standard deviation of price changes
-            price_changes = [
-                abs(recent_prices[i] - recent_prices[i-1]) / recent_prices[i-1]
-                for i in range(1, len(recent_prices))
-            ]
-            
-            if not price_changes:
-                return None
-            
-            mean_change = sum(price_changes) / len(price_changes)
-            variance = sum((change - mean_change) ** 2 for change in price_changes) / len(price_changes)
-            volatility = variance ** Decimal('0.5')
-            
-            return volatility
+            volatility = self.price_history.volatility(since=time.time() - period_minutes * 60)
+            return Decimal(str(volatility)) if volatility is not None else None
             
         except Exception as e:
             logger.error(f"Error calculating volatility: {e}")
@@ -216,26 +279,14 @@ class MarketDataHandler:
     def get_price_trend(self, period_minutes: int = 30) -> Optional[str]:
         """Determine price trend over the specified period"""
         try:
-            cutoff_time = datetime.now() - timedelta(minutes=period_minutes)
-            recent_prices = [
-                Decimal(str(entry['price'])) 
-                for entry in self.price_history 
-                if entry['timestamp'] >= cutoff_time and entry['price'] is not None
-            ]
-            
-            if len(recent_prices) < 10:
+            # Compare the average of the first 25% with the last 25% of the window
+            change_pct = self.price_history.trend_change(since=time.time() - period_minutes * 60)
+            if change_pct is None:
                 return None
             
-            # Simple trend calculation: compare first 25% with last 25%
-            quarter_size = len(recent_prices) // 4
-            early_avg = sum(recent_prices[:quarter_size]) / quarter_size
-            late_avg = sum(recent_prices[-quarter_size:]) / quarter_size
-            
-            change_pct = (late_avg - early_avg) / early_avg
-            
-            if change_pct > Decimal('0.005'):  # >0.5% increase
+            if change_pct > 0.005:  # >0.5% increase
                 return "UP"
-            elif change_pct < Decimal('-0.005'):  # >0.5% decrease
+            elif change_pct < -0.005:  # >0.5% decrease
                 return "DOWN"
             else:
                 return "SIDEWAYS"
@@ -0,0 +1,212 @@
+# Performance metrics over NumPy equity curves and fills
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+SECONDS_PER_YEAR = 365.25 * 86400
+
+# Fill sides as signs: buys open/extend longs, sells close them (or open shorts)
+SIDE_SIGNS = {'buy': 1, 'b': 1, 'nb': 1, 'sell': -1, 's': -1, 'ns': -1}
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """numerator / denominator, 0.0 when undefined (keeps results JSON-safe)"""
+    return float(numerator / denominator) if denominator > 0 else 0.0
+
+def side_signs(sides: Iterable[Any]) -> np.ndarray:
+    """+1 for buys and -1 for sells, from side names ('buy', 'SELL', 'NB', ...) or numbers"""
+    return np.array([
+        SIDE_SIGNS[side.lower()] if isinstance(side, str) else (1 if side > 0 else -1)
+        for side in sides
+    ], dtype=np.int8)
+
+def trade_columns(trades: Iterable[Any]) -> Dict[str, np.ndarray]:
+    """
+    Fill columns from trade dicts or records with side, quantity and price,
+    plus 'timestamp' (epoch seconds or datetime) or 'date' and an optional 'fee'
+    """
+    sides, quantities, prices, timestamps, fees = [], [], [], [], []
+    for trade in trades:
+        get = trade.get if isinstance(trade, Mapping) else lambda name, default=None: getattr(trade, name, default)
+        sides.append(get('side'))
+        quantities.append(get('quantity'))
+        prices.append(get('price'))
+        timestamp = get('timestamp', get('date'))
+        timestamps.append(timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp)
+        fees.append(get('fee') or 0.0)
+    columns = {
+        'side': side_signs(sides),
+        'quantity': np.asarray(quantities, dtype=np.float64),
+        'price': np.asarray(prices, dtype=np.float64),
+        'fee': np.asarray(fees, dtype=np.float64)
+    }
+    if timestamps and all(timestamp is not None for timestamp in timestamps):
+        columns['timestamp'] = np.asarray(timestamps, dtype=np.float64)
+    return columns
+
+def fifo_round_trips(side: np.ndarray, quantity: np.ndarray, price: np.ndarray,
+                     timestamp: Optional[np.ndarray] = None, fee: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Match every closing fill against the open lots, oldest first. Returns one
+    row per closing fill: quantity closed, quantity-weighted entry price, exit
+    price, P&L net of the fees of both legs, return on the entry value and
+    (with timestamps) the holding time of the oldest lot it closed.
+    """
+    side, quantity, price = np.asarray(side), np.asarray(quantity, dtype=np.float64), np.asarray(price, dtype=np.float64)
+    unit_fee = np.divide(fee, quantity, out=np.zeros(len(quantity)), where=quantity > 0) if fee is not None \
+        else np.zeros(len(quantity))
+    times = np.asarray(timestamp, dtype=np.float64) if timestamp is not None else np.zeros(len(quantity))
+
+    lots = deque()  # [signed quantity, price, fee per unit, time]
+    rows = []
+    for sign, remaining, fill_price, fill_fee, fill_time in zip(
+            side.tolist(), quantity.tolist(), price.tolist(), unit_fee.tolist(), times.tolist()):
+        closed = cost = pnl = 0.0
+        opened_at = None
+        while remaining > 0 and lots and (lots[0][0] > 0) != (sign > 0):
+            lot = lots[0]
+            matched = min(remaining, abs(lot[0]))
+            direction = 1 if lot[0] > 0 else -1
+            pnl += matched * ((fill_price - lot[1]) * direction - lot[2] - fill_fee)
+            cost += matched * lot[1]
+            closed += matched
+            opened_at = lot[3] if opened_at is None else opened_at
+            remaining -= matched
+            lot[0] -= matched * direction
+            if abs(lot[0]) < 1e-9:
+                lots.popleft()
+        if closed:
+            rows.append((closed, cost / closed, fill_price, pnl, pnl / cost if cost else 0.0, fill_time - opened_at))
+        if remaining > 0:
+            lots.append([remaining * sign, fill_price, fill_fee, fill_time])
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 6)
+    result = {
+        'quantity': table[:, 0],
+        'entry_price': table[:, 1],
+        'exit_price': table[:, 2],
+        'pnl': table[:, 3],
+        'return': table[:, 4]
+    }
+    if timestamp is not None:
+        result['holding_seconds'] = table[:, 5]
+    return result
+
+def trade_metrics(side: np.ndarray, quantity: np.ndarray, price: np.ndarray,
+                  timestamp: Optional[np.ndarray] = None, fee: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Round-trip statistics from FIFO-matched fills"""
+    trips = fifo_round_trips(side, quantity, price, timestamp, fee)
+    pnl = trips['pnl']
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    gross_profit, gross_loss = float(wins.sum()), float(losses.sum())
+    metrics = {
+        'total_trades': len(quantity),
+        'closed_trades': len(pnl),
+        'winning_trades': len(wins),
+        'losing_trades': len(losses),
+        'win_rate': _ratio(len(wins), len(pnl)),
+        'realized_pnl': float(pnl.sum()),
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'largest_win': float(wins.max()) if len(wins) else 0.0,
+        'largest_loss': float(losses.min()) if len(losses) else 0.0,
+        'profit_factor': _ratio(gross_profit, -gross_loss),
+        'expectancy': float(pnl.mean()) if len(pnl) else 0.0,
+        'avg_trade_return': float(trips['return'].mean()) if len(pnl) else 0.0,
+        'traded_value': float(np.dot(np.asarray(quantity, dtype=np.float64), np.asarray(price, dtype=np.float64))),
+        'fees': float(np.sum(fee)) if fee is not None else 0.0
+    }
+    if 'holding_seconds' in trips:
+        metrics['avg_holding_seconds'] = float(trips['holding_seconds'].mean()) if len(pnl) else 0.0
+    return metrics
+
+def equity_metrics(equity: np.ndarray, timestamps: Optional[np.ndarray] = None,
+                   position_values: Optional[np.ndarray] = None,
+                   periods_per_year: float = TRADING_DAYS_PER_YEAR, risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Return, risk and drawdown statistics of an equity curve. With timestamps
+    the annualization follows the sampling rate and drawdown durations are
+    also given in seconds; with position values (signed market value held at
+    each point) exposure and time in market are included.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    n = len(equity)
+    if n < 2:
+        return {}
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        years = (timestamps[-1] - timestamps[0]) / SECONDS_PER_YEAR
+        if years > 0:
+            periods_per_year = (n - 1) / years
+
+    returns = np.divide(np.diff(equity), equity[:-1], out=np.zeros(n - 1), where=equity[:-1] != 0)
+    excess = returns - risk_free_rate / periods_per_year
+    mean_return = float(excess.mean())
+    volatility = float(returns.std(ddof=1)) if n > 2 else 0.0
+    downside = float(np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2)))
+    scale = np.sqrt(periods_per_year)
+
+    total_return = _ratio(equity[-1] - equity[0], equity[0])
+    years = (n - 1) / periods_per_year
+    annualized_return = total_return
+    if equity[0] > 0 and equity[-1] > 0:
+        with np.errstate(over='ignore'):
+            growth = np.power(equity[-1] / equity[0], 1 / years) - 1
+        # Compounding a few days into a year can overflow; the total return is the honest answer then
+        annualized_return = float(growth) if np.isfinite(growth) else total_return
+
+    # Drawdowns: every point at a running peak starts a new drawdown
+    peaks = np.maximum.accumulate(equity)
+    underwater = np.divide(peaks - equity, peaks, out=np.zeros(n), where=peaks > 0)
+    max_drawdown = float(underwater.max())
+    at_peak = np.flatnonzero(equity >= peaks)
+    ends = np.r_[at_peak[1:], n - 1]
+    in_drawdown = np.r_[np.diff(at_peak) > 1, ends[-1] > at_peak[-1]]
+    durations = np.where(in_drawdown, ends - at_peak, 0)
+    longest = int(np.argmax(durations))
+
+    metrics = {
+        'initial_equity': float(equity[0]),
+        'final_equity': float(equity[-1]),
+        'total_return': total_return,
+        'annualized_return': annualized_return,
+        'volatility': volatility * scale,
+        'sharpe_ratio': _ratio(mean_return * scale, volatility),
+        'sortino_ratio': _ratio(mean_return * scale, downside),
+        'max_drawdown': max_drawdown,
+        'calmar_ratio': _ratio(annualized_return, max_drawdown),
+        'max_drawdown_duration': int(durations[longest]),
+        'periods': n - 1,
+        'periods_per_year': float(periods_per_year)
+    }
+    if timestamps is not None:
+        metrics['max_drawdown_duration_seconds'] = float(
+            timestamps[ends[longest]] - timestamps[at_peak[longest]]) if durations[longest] else 0.0
+    if position_values is not None:
+        position_values = np.asarray(position_values, dtype=np.float64)
+        gross = np.abs(position_values)
+        metrics['exposure'] = float(np.mean(np.divide(gross, equity, out=np.zeros(n), where=equity > 0)))
+        metrics['time_in_market'] = float(np.mean(gross > 0))
+    return metrics
+
+def calculate_metrics(equity: np.ndarray, timestamps: Optional[np.ndarray] = None,
+                      trades: Optional[Mapping[str, np.ndarray]] = None,
+                      position_values: Optional[np.ndarray] = None,
+                      periods_per_year: float = TRADING_DAYS_PER_YEAR,
+                      risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Equity curve and round-trip metrics in one dict. `trades` holds fill
+    columns (see trade_columns); turnover is their traded value over the
+    average equity.
+    """
+    metrics = equity_metrics(equity, timestamps, position_values, periods_per_year, risk_free_rate)
+    if trades is not None:
+        metrics.update(trade_metrics(trades['side'], trades['quantity'], trades['price'],
+                                     trades.get('timestamp'), trades.get('fee')))
+        if metrics.get('periods'):
+            metrics['turnover'] = _ratio(metrics['traded_value'], float(np.mean(equity)))
+    return metrics
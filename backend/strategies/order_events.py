@@ -0,0 +1,119 @@
+# Order event stream for event-driven fill detection
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from channels.market_data_hub import topic_matches
+
+logger = logging.getLogger(__name__)
+
+def extract_order_updates(payload: Any) -> List[Dict[str, Any]]:
+    """Get the order updates carried by an order/deal event payload"""
+    if isinstance(payload, list):
+        return [order for order in payload if isinstance(order, dict)]
+    if not isinstance(payload, dict):
+        return []
+    if 'orders' in payload:
+        return extract_order_updates(payload['orders'])
+    if 'data' in payload:
+        return extract_order_updates(payload['data'])
+    return [payload]
+
+class OrderEventStream:
+    """
+    Subscribes to order/deal event topics and hands each order update to the
+    strategy's event loop as soon as it arrives.
+
+    MQTT callbacks run on the client's network thread, so updates are passed to
+    the asyncio loop with call_soon_threadsafe and consumed from a queue.
+    """
+
+    def __init__(self, api_client, topics: List[str]):
+        self.api_client = api_client
+        self.topics = topics
+        self.is_subscribed = False
+        self.last_event_time: Optional[float] = None
+        self.events_received = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    async def start(self) -> bool:
+        """Subscribe to the order event topics; returns False if the stream is unavailable"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        try:
+            for topic in self.topics:
+                self.api_client.subscribe(topic, self._on_event)
+            self.is_subscribed = True
+            logger.info(f"Subscribed to order events: {', '.join(self.topics)}")
+        except Exception as e:
+            logger.warning(f"Order event stream unavailable, falling back to polling: {e}")
+            self.is_subscribed = False
+        return self.is_subscribed
+
+    def stop(self) -> None:
+        """Unsubscribe from the order event topics"""
+        if not self.is_subscribed:
+            return
+        for topic in self.topics:
+            try:
+                self.api_client.unsubscribe(topic)
+            except Exception as e:
+                logger.error(f"Error unsubscribing from {topic}: {e}")
+        self.is_subscribed = False
+
+    def is_healthy(self) -> bool:
+        """Whether order events are currently being delivered"""
+        if not self.is_subscribed:
+            return False
+        is_connected = getattr(self.api_client, 'is_market_data_connected', None)
+        return is_connected() if is_connected else True
+
+    def _on_event(self, topic: str, payload: Any) -> None:
+        """MQTT callback (network thread)"""
+        updates = extract_order_updates(payload)
+        if not updates or self._loop is None:
+            return
+        self.events_received += len(updates)
+        self.last_event_time = time.time()
+        for update in updates:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, update)
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for the next order update"""
+        return await self._queue.get()
+
+class LocalOrderEventBroker:
+    """
+    In-process stand-in for the order event broker.
+
+    Implements the subscribe/unsubscribe surface of the DNSE clients so the
+    strategy's event path can be exercised in tests and dry runs; publish()
+    delivers a payload to every matching subscription.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Callable[[str, Any], None]] = {}
+        self._lock = threading.Lock()
+        self.connected = True
+
+    def subscribe(self, topic: str, callback: Callable[[str, Any], None]) -> None:
+        with self._lock:
+            self._subscriptions[topic] = callback
+
+    def unsubscribe(self, topic: str) -> None:
+        with self._lock:
+            self._subscriptions.pop(topic, None)
+
+    def is_market_data_connected(self) -> bool:
+        return self.connected
+
+    def publish(self, topic: str, payload: Any) -> int:
+        """Deliver a payload to matching subscribers; returns the number of deliveries"""
+        with self._lock:
+            callbacks = [cb for pattern, cb in self._subscriptions.items() if topic_matches(pattern, topic)]
+        for callback in callbacks:
+            callback(topic, payload)
+        return len(callbacks)
@@ -0,0 +1,145 @@
+# Parallel parameter sweeps of grid backtests
+import dataclasses
+import itertools
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .backtest import GridBacktest
+from .grid_base import GridConfig
+from channels.tick_store import TickStore
+
+logger = logging.getLogger(__name__)
+
+# GridConfig fields swept by default
+SWEEP_PARAMETERS = ('grid_spacing_pct', 'ddown_factor', 'initial_qty_pct', 'min_markup_pct')
+
+# Opened once per worker process; the mapped files are shared through the page cache
+_worker_store: Optional[TickStore] = None
+
+def parameter_grid(**values: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Every combination of the given GridConfig field values, e.g. parameter_grid(ddown_factor=[1.2, 1.5])"""
+    fields = {field.name for field in dataclasses.fields(GridConfig)}
+    unknown = sorted(set(values) - fields)
+    if unknown:
+        raise ValueError(f"Unknown GridConfig fields: {', '.join(unknown)}")
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(list(values[name]) for name in names))]
+
+def apply_parameters(config: GridConfig, parameters: Dict[str, Any]) -> GridConfig:
+    """Copy of `config` with `parameters` set, converted to Decimal where the field is a Decimal"""
+    changes = {
+        name: Decimal(str(value)) if isinstance(getattr(config, name), Decimal) else value
+        for name, value in parameters.items()
+    }
+    return dataclasses.replace(config, **changes)
+
+def return_over_drawdown(total_return: float, max_drawdown: float) -> float:
+    """Ranking score; a gain without any drawdown ranks above every ratio"""
+    if max_drawdown > 0:
+        return total_return / max_drawdown
+    return math.inf if total_return > 0 else total_return
+
+@dataclass
+class SweepResult:
+    """One configuration of a sweep: its backtest summary, or why it failed"""
+    parameters: Dict[str, Any]
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def score(self) -> float:
+        if self.summary is None:
+            return -math.inf
+        return return_over_drawdown(self.summary['total_return'], self.summary['max_drawdown'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'parameters': {name: float(value) if isinstance(value, Decimal) else value
+                           for name, value in self.parameters.items()},
+            'score': self.score,
+            'summary': self.summary,
+            'error': self.error
+        }
+
+def rank_results(results: Iterable[SweepResult], top: Optional[int] = None) -> List[SweepResult]:
+    """Successful results by return/drawdown, then by return, best first"""
+    ranked = sorted(
+        (result for result in results if result.summary is not None),
+        key=lambda result: (result.score, result.summary['total_return']),
+        reverse=True
+    )
+    return ranked[:top] if top else ranked
+
+def _init_worker(store_root: str, log_level: int) -> None:
+    global _worker_store
+    _worker_store = TickStore(store_root)
+    # Per-order strategy logging from hundreds of backtests would drown the sweep's own output
+    for name in ('strategies', 'channels'):
+        logging.getLogger(name).setLevel(log_level)
+
+def backtest_executor(store_root: str, max_workers: Optional[int] = None,
+                      log_level: int = logging.ERROR) -> ProcessPoolExecutor:
+    """Process pool whose workers each open the TickStore at `store_root` once, for run_backtest tasks"""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(store_root, log_level))
+
+def run_backtest(config: GridConfig, parameters: Dict[str, Any], start: Optional[float], end: Optional[float],
+                 initial_cash: float, exchange_options: Dict[str, Any]) -> SweepResult:
+    """Worker task (see backtest_executor): backtest one configuration"""
+    try:
+        backtest = GridBacktest(apply_parameters(config, parameters), _worker_store, start, end,
+                                initial_cash, **exchange_options)
+        return SweepResult(parameters, summary=backtest.run().summary())
+    except Exception as e:
+        return SweepResult(parameters, error=f"{type(e).__name__}: {e}")
+
+class ParameterSweep:
+    """
+    Backtests many variations of a GridConfig on a process pool, one
+    configuration per task.
+
+    Each worker opens the TickStore at `store_root` once and reuses its
+    memory-mapped columns for every task, so the recorded ticks are shared
+    through the page cache instead of being copied to each process. run()
+    yields results as they finish; rank_results() orders them.
+    """
+
+    def __init__(self, config: GridConfig, store_root: str, start: Optional[float] = None,
+                 end: Optional[float] = None, initial_cash: float = 1_000_000_000.0,
+                 max_workers: Optional[int] = None, log_level: int = logging.ERROR, **exchange_options):
+        self.config = config
+        self.store_root = store_root
+        self.start = start
+        self.end = end
+        self.initial_cash = initial_cash
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.log_level = log_level
+        self.exchange_options = exchange_options
+        self.results: List[SweepResult] = []
+
+    def run(self, parameter_sets: Iterable[Dict[str, Any]]) -> Iterator[SweepResult]:
+        """Backtest every parameter set, yielding each result as soon as it is ready"""
+        parameter_sets = list(parameter_sets)
+        logger.info(f"Sweeping {len(parameter_sets)} configurations of {self.config.symbol} "
+                    f"on {self.max_workers} workers")
+        executor = backtest_executor(self.store_root, self.max_workers, self.log_level)
+        try:
+            futures = [
+                executor.submit(run_backtest, self.config, parameters, self.start, self.end,
+                                self.initial_cash, self.exchange_options)
+                for parameters in parameter_sets
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                self.results.append(result)
+                yield result
+        finally:
+            # Stopping early (or failing) drops the tasks that have not started
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def ranked(self, top: Optional[int] = None) -> List[SweepResult]:
+        return rank_results(self.results, top)
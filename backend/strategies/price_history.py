@@ -0,0 +1,122 @@
+# Fixed-capacity price history for market data analysis
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+class PriceHistory:
+    """
+    Ring buffer of (timestamp, price) ticks backed by NumPy arrays.
+
+    Every tick is written twice, at `i` and `i + capacity`, so the live window
+    is always one contiguous slice and time-range queries are a binary search
+    plus a view. Running sums of price, absolute returns and squared absolute
+    returns are stored alongside, so windowed mean, volatility and trend are
+    differences of two entries instead of a rescan.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 2:
+            raise ValueError("Price history capacity must be at least 2")
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.float64)
+        self._price = np.zeros(2 * capacity, dtype=np.float64)
+        self._cum_price = np.zeros(2 * capacity, dtype=np.float64)
+        self._cum_change = np.zeros(2 * capacity, dtype=np.float64)
+        self._cum_change_sq = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        self.total_appended = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, price: float, timestamp: Optional[float] = None) -> None:
+        """Add a tick; timestamps are epoch seconds and are clamped to be non-decreasing"""
+        price = float(price)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+
+        if self._size:
+            last = self._head + self._size - 1
+            timestamp = max(timestamp, self._ts[last])
+            prev_price = self._price[last]
+            change = abs(price - prev_price) / prev_price if prev_price else 0.0
+            cum_price = self._cum_price[last] + price
+            cum_change = self._cum_change[last] + change
+            cum_change_sq = self._cum_change_sq[last] + change * change
+        else:
+            cum_price, cum_change, cum_change_sq = price, 0.0, 0.0
+
+        if self._size == self.capacity:
+            self._head = (self._head + 1) % self.capacity
+        else:
+            self._size += 1
+
+        pos = (self._head + self._size - 1) % self.capacity
+        for i in (pos, pos + self.capacity):
+            self._ts[i] = timestamp
+            self._price[i] = price
+            self._cum_price[i] = cum_price
+            self._cum_change[i] = cum_change
+            self._cum_change_sq[i] = cum_change_sq
+        self.total_appended += 1
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    def _bounds(self, since: Optional[float]) -> Tuple[int, int]:
+        """Absolute [start, end) indices of the ticks at or after `since`"""
+        start, end = self._head, self._head + self._size
+        if since is not None and self._size:
+            start += int(np.searchsorted(self._ts[start:end], since, side='left'))
+        return start, end
+
+    def window(self, since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and prices at or after `since` (read-only views, oldest first)"""
+        start, end = self._bounds(since)
+        ts, prices = self._ts[start:end], self._price[start:end]
+        ts.flags.writeable = False
+        prices.flags.writeable = False
+        return ts, prices
+
+    def latest(self, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """The most recent `count` ticks (all if None)"""
+        end = self._head + self._size
+        start = self._head if count is None else max(self._head, end - count)
+        return self._ts[start:end].copy(), self._price[start:end].copy()
+
+    def count_since(self, since: float) -> int:
+        start, end = self._bounds(since)
+        return end - start
+
+    def mean_price(self, since: Optional[float] = None) -> Optional[float]:
+        """Average price over the window"""
+        start, end = self._bounds(since)
+        if end <= start:
+            return None
+        return self._price_sum(start, end) / (end - start)
+
+    def volatility(self, since: Optional[float] = None) -> Optional[float]:
+        """Standard deviation of absolute tick-to-tick returns within the window"""
+        start, end = self._bounds(since)
+        n = end - start - 1  # Returns between consecutive ticks of the window
+        if n < 1:
+            return None
+        mean = (self._cum_change[end - 1] - self._cum_change[start]) / n
+        mean_sq = (self._cum_change_sq[end - 1] - self._cum_change_sq[start]) / n
+        return float(np.sqrt(max(0.0, mean_sq - mean * mean)))
+
+    def trend_change(self, since: Optional[float] = None, min_ticks: int = 10) -> Optional[float]:
+        """Relative change from the first to the last quarter's average price in the window"""
+        start, end = self._bounds(since)
+        if end - start < min_ticks:
+            return None
+        quarter = (end - start) // 4
+        early = self._price_sum(start, start + quarter) / quarter
+        late = self._price_sum(end - quarter, end) / quarter
+        return (late - early) / early if early else None
+
+    def _price_sum(self, start: int, end: int) -> float:
+        """Sum of prices over absolute indices [start, end)"""
+        return float(self._cum_price[end - 1] - self._cum_price[start] + self._price[start])
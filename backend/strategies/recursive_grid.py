@@ -4,12 +4,23 @@ from decimal import Decimal
 from datetime import datetime
 import logging
 import asyncio
+import functools
+import time
 
 from .grid_base import (
-    GridLevel, GridPosition, GridConfig, EMASmoother, 
+    GridLevel, GridBook, GridPosition, GridConfig, EMASmoother, 
     PriceUtils, RiskManager
 )
 from .market_data import MarketDataHandler, FallbackPriceProvider
+from channels.bar_builder import BarAggregator
+from channels.conflation import ConflatedSubscription
+from channels.tick_store import TickRecorder, TickStore
+from .execution import (
+    TokenBucket, LatencyTracker, BulkCancelEngine, CancelReport, OrderStateTracker, order_id_of
+)
+from .order_events import OrderEventStream
+from .scheduler import AdaptivePollScheduler
+from .trade_history import TradeHistory, TradeRecord
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +32,7 @@ class RecursiveGridStrategy:
     is calculated as if the previous node had just been filled.
     """
     
-    def __init__(self, config: GridConfig, api_client):
+    def __init__(self, config: GridConfig, api_client, order_event_source=None):
         self.config = config
         self.api_client = api_client
         
@@ -33,20 +44,60 @@ class RecursiveGridStrategy:
         # Initialize components
         self.position = GridPosition(symbol=config.symbol)
         self.risk_manager = RiskManager(config)
-        self.ema_smoother = EMASmoother(config.ema_span_0, config.ema_span_1) if config.use_ema_smoothing else None
+        self.ema_smoother = EMASmoother(
+            config.ema_span_0, config.ema_span_1, use_float=config.ema_use_float
+        ) if config.use_ema_smoothing else None
         
         # Market data handler
         self.market_data_handler = MarketDataHandler(api_client, config.symbol)
         self.fallback_provider = FallbackPriceProvider(api_client, config.symbol)
+        self.price_subscription: Optional[ConflatedSubscription] = None
+        self.tick_recorder: Optional[TickRecorder] = None
+        self.bar_aggregator: Optional[BarAggregator] = None
         
         # Grid state
-        self.grid_levels: Dict[str, GridLevel] = {}  # order_id -> GridLevel
+        self.grid_levels = GridBook()  # order_id -> GridLevel, indexed by side and price
         self.current_market_price: Optional[Decimal] = None
         self.is_active = False
         self.initial_capital: Optional[Decimal] = None
         
+        # Order throttling (semaphore is created lazily inside the running loop)
+        self.order_rate_limiter = TokenBucket(config.order_rate_per_sec, config.order_burst)
+        self.order_latency = LatencyTracker()
+        self._order_semaphore: Optional[asyncio.Semaphore] = None
+        self.last_cancel_report: Optional[CancelReport] = None
+        
+        # Order event stream; polling is the fallback while it is unavailable
+        self.order_events: Optional[OrderEventStream] = None
+        if config.order_event_topics:
+            topics = [
+                topic.format(account_no=config.account_no, symbol=config.symbol)
+                for topic in config.order_event_topics
+            ]
+            self.order_events = OrderEventStream(order_event_source or api_client, topics)
+        self._order_event_task: Optional[asyncio.Task] = None
+        self._last_order_poll = 0.0
+        self.order_tracker = OrderStateTracker()
+        
+        # Monitoring loop pacing
+        self.poll_scheduler = AdaptivePollScheduler(
+            base_interval=config.monitoring_interval,
+            min_interval=config.min_poll_interval,
+            max_interval=config.max_poll_interval,
+            near_level_pct=config.poll_near_level_pct,
+            far_level_pct=config.poll_far_level_pct,
+            high_volatility=config.poll_high_volatility,
+            max_backoff=config.poll_max_backoff,
+            check_market_hours=config.poll_market_hours
+        )
+        self.api_errors = 0
+        
         # Performance tracking
-        self.trade_history: List[Dict] = []
+        self.trade_history = TradeHistory(
+            config.symbol,
+            capacity=config.trade_history_size,
+            spill_dir=config.trade_history_dir
+        )
         self.start_time: Optional[datetime] = None
         
     async def initialize(self) -> bool:
@@ -55,11 +106,33 @@ class RecursiveGridStrategy:
             logger.info(f"Initializing Recursive Grid Strategy for {self.config.symbol}")
             
             # Initialize market data handler
-            self.market_data_handler.add_price_callback(self._on_price_update)
+            if self.config.conflate_market_data:
+                # Latest price only, processed on the event loop so a busy feed never builds a backlog
+                loop = asyncio.get_running_loop()
+                self.price_subscription = self.market_data_handler.subscribe_conflated(
+                    on_update=lambda: loop.call_soon_threadsafe(self._drain_price_updates)
+                )
+            else:
+                self.market_data_handler.add_price_callback(self._on_price_update)
+            self.market_data_handler.add_gap_callback(self._on_market_data_gap)
+            if self.config.market_data_dir and self.config.market_data_warmup > 0:
+                self.market_data_handler.warm_up(TickStore(self.config.market_data_dir), self.config.market_data_warmup)
             if not await self.market_data_handler.connect():
                 logger.warning("Failed to connect to real-time market data, using fallback")
                 self.fallback_provider.add_price_callback(self._on_price_update)
                 await self.fallback_provider.start()
+            elif self.config.market_data_dir:
+                # Persist the raw feed for replay, backtests and indicator warm-up
+                self.tick_recorder = TickRecorder(self.config.market_data_dir)
+                self.tick_recorder.start()
+                self.tick_recorder.attach(self.market_data_handler.hub, [self.config.symbol])
+            if self.config.bar_resolutions and self.market_data_handler.is_connected:
+                # Finished bars are recorded next to the ticks they were built from
+                self.bar_aggregator = BarAggregator(self.config.bar_resolutions)
+                if self.tick_recorder:
+                    self.bar_aggregator.subscribe(self.tick_recorder.record)
+                self.bar_aggregator.start()
+                self.bar_aggregator.attach(self.market_data_handler.hub, [self.config.symbol])
             
             # Get account balance
             balance_info = await self._get_account_balance()
@@ -101,6 +174,10 @@ class RecursiveGridStrategy:
         
         logger.info("Starting recursive grid trading...")
         
+        # Subscribe to order events before any order is live
+        if self.order_events and await self.order_events.start():
+            self._order_event_task = asyncio.create_task(self._order_event_loop())
+        
         # Place initial grid orders
         await self._place_initial_grid()
         
@@ -115,13 +192,38 @@ class RecursiveGridStrategy:
         # Cancel all open orders
         await self._cancel_all_orders()
         
+        # Stop order event delivery
+        if self._order_event_task:
+            self._order_event_task.cancel()
+            try:
+                await self._order_event_task
+            except asyncio.CancelledError:
+                pass
+        if self.order_events:
+            self.order_events.stop()
+        
         # Disconnect market data
+        if self.price_subscription:
+            self.price_subscription.close()
+        if self.bar_aggregator:
+            self.bar_aggregator.stop()
+        if self.tick_recorder:
+            self.tick_recorder.stop()
         self.market_data_handler.disconnect()
         await self.fallback_provider.stop()
         
+        # Persist trades still waiting to be spilled
+        self.trade_history.flush()
+        
         # Log final performance
         await self._log_performance_summary()
     
+    def _drain_price_updates(self) -> None:
+        """Apply the latest conflated market price (runs on the event loop)"""
+        if self.price_subscription:
+            for update in self.price_subscription.read():
+                self._on_price_update(update.value)
+    
     def _on_price_update(self, price: Decimal) -> None:
         """Callback for market price updates"""
         try:
@@ -151,40 +253,45 @@ class RecursiveGridStrategy:
                 is_initial=True
             )
             
+            # Size and risk-check every level up front
+            planned_levels = []
             for i, price in enumerate(grid_prices):
-                # Calculate quantity for this level
                 quantity = self._calculate_order_quantity(price, i)
-                
-                if quantity > 0:
-                    # Check risk limits
-                    if not self._check_risk_limits(quantity, price):
-                        logger.warning(f"Risk limits exceeded for level {i} at price {price}")
-                        continue
-                    
-                    # Place buy order
-                    order_result = await self._place_limit_order(
-                        side='NB',  # Net Buy for DNSE
+                if quantity <= 0:
+                    continue
+                if not self._check_risk_limits(quantity, price):
+                    logger.warning(f"Risk limits exceeded for level {i} at price {price}")
+                    continue
+                planned_levels.append((i, price, quantity))
+            
+            # Fire all levels concurrently; the order rate limiter paces the requests
+            started = time.monotonic()
+            results = await asyncio.gather(*(
+                self._place_limit_order(side='NB', quantity=quantity, price=price)  # Net Buy for DNSE
+                for _, price, quantity in planned_levels
+            ))
+            
+            placed = 0
+            for (i, price, quantity), order_result in zip(planned_levels, results):
+                order_id = order_id_of(order_result) if order_result else None
+                if order_id:
+                    # Track this grid level
+                    grid_level = GridLevel(
+                        price=price,
                         quantity=quantity,
-                        price=price
+                        side='BUY',
+                        order_id=order_id,
+                        grid_index=i
                     )
+                    self.grid_levels[order_id] = grid_level
+                    placed += 1
                     
-                    if order_result and order_result.get('orderId'):
-                        # Track this grid level
-                        grid_level = GridLevel(
-                            price=price,
-                            quantity=quantity,
-                            side='BUY',
-                            order_id=order_result['orderId'],
-                            grid_index=i
-                        )
-                        self.grid_levels[order_result['orderId']] = grid_level
-                        
-                        logger.info(f"Placed buy order: {quantity} @ {price:,.0f} (Order ID: {order_result['orderId']})")
-                    else:
-                        logger.error(f"Failed to place buy order at {price}")
-                
-                # Small delay to avoid rate limiting
-                await asyncio.sleep(0.1)
+                    logger.info(f"Placed buy order: {quantity} @ {price:,.0f} (Order ID: {order_id})")
+                else:
+                    logger.error(f"Failed to place buy order at {price}")
+            
+            logger.info(f"Initial grid live: {placed}/{len(planned_levels)} orders in "
+                        f"{(time.monotonic() - started) * 1000:.0f}ms")
                 
         except Exception as e:
             logger.error(f"Error placing initial grid: {e}")
@@ -257,7 +364,10 @@ class RecursiveGridStrategy:
         return True
     
     async def _place_limit_order(self, side: str, quantity: int, price: Decimal) -> Optional[Dict]:
-        """Place a limit order through the API"""
+        """Place a limit order through the API, bounded by the order concurrency and rate limits"""
+        if self._order_semaphore is None:
+            self._order_semaphore = asyncio.Semaphore(self.config.max_concurrent_orders)
+        
         try:
             order_payload = {
                 'accountNo': self.config.account_no,
@@ -271,11 +381,17 @@ class RecursiveGridStrategy:
             if self.config.loan_package_id:
                 order_payload['loanPackageId'] = self.config.loan_package_id
             
-            result = await self._call_api_async(
-                self.api_client.place_order,
-                **order_payload
-            )
+            async with self._order_semaphore:
+                await self.order_rate_limiter.acquire()
+                started = time.monotonic()
+                result = await self._call_api_async(
+                    self.api_client.place_order,
+                    **order_payload
+                )
+                latency_ms = (time.monotonic() - started) * 1000
             
+            self.order_latency.record(latency_ms)
+            logger.debug(f"Order {side} {quantity} @ {price} acknowledged in {latency_ms:.1f}ms")
             return result
             
         except Exception as e:
@@ -288,8 +404,10 @@ class RecursiveGridStrategy:
         
         while self.is_active:
             try:
-                # Check for order fills
-                await self._check_order_fills()
+                api_errors_before = self.api_errors
+                
+                # Poll for order fills when the event stream can't be relied on
+                await self._poll_order_fills_if_needed()
                 
                 # Update market price
                 await self._update_market_price()
@@ -302,12 +420,51 @@ class RecursiveGridStrategy:
                     logger.warning("Stop conditions met, halting strategy")
                     break
                 
-                # Wait before next iteration
-                await asyncio.sleep(5)  # 5-second monitoring interval
+                # Wait before next iteration, backing off if any API call failed
+                if self.api_errors > api_errors_before:
+                    interval = self.poll_scheduler.record_error()
+                else:
+                    self.poll_scheduler.record_success()
+                    interval = self._next_poll_interval()
+                await asyncio.sleep(interval)
                 
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
-                await asyncio.sleep(10)  # Longer wait on error
+                await asyncio.sleep(self.poll_scheduler.record_error())
+    
+    def _next_poll_interval(self) -> float:
+        """Pick the next monitoring interval from market hours, level proximity and volatility"""
+        nearest = self.grid_levels.nearest_open_price(self.current_market_price) if self.current_market_price else None
+        volatility = self.market_data_handler.calculate_volatility(period_minutes=15)
+        return self.poll_scheduler.next_interval(
+            self.current_market_price, [nearest] if nearest is not None else [], volatility
+        )
+    
+    async def _order_event_loop(self) -> None:
+        """Dispatch order updates pushed by the order event stream"""
+        while self.is_active:
+            try:
+                order = await self.order_events.get()
+                await self._process_order_update(order)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error processing order event: {e}")
+    
+    def _on_market_data_gap(self, gap) -> None:
+        """Fills may have been missed while market data was down: reconcile orders on the next cycle"""
+        logger.warning(f"Market data gap for {gap.symbol} ({gap.duration:.1f}s), forcing order reconciliation")
+        self._last_order_poll = 0.0
+    
+    async def _poll_order_fills_if_needed(self) -> None:
+        """Poll get_orders unless the event stream is healthy and the last reconcile is recent"""
+        now = time.monotonic()
+        if self.order_events and self.order_events.is_healthy():
+            if now - self._last_order_poll < self.config.order_reconcile_interval:
+                return
+        
+        await self._check_order_fills()
+        self._last_order_poll = now
     
     async def _check_order_fills(self) -> None:
         """Check for filled orders and handle them"""
@@ -322,51 +479,71 @@ class RecursiveGridStrategy:
                 return
             
             for order in orders['orders']:
-                order_id = order.get('orderId')
-                if order_id in self.grid_levels:
-                    grid_level = self.grid_levels[order_id]
-                    
-                    # Check if order is filled
-                    if order.get('status') in ['FILLED', 'PARTIALLY_FILLED']:
-                        filled_qty = order.get('executedQuantity', 0)
-                        fill_price = Decimal(str(order.get('averagePrice', grid_level.price)))
-                        
-                        if filled_qty > 0 and not grid_level.is_filled:
-                            await self._handle_order_fill(grid_level, filled_qty, fill_price)
+                await self._process_order_update(order)
                             
         except Exception as e:
             logger.error(f"Error checking order fills: {e}")
     
-    async def _handle_order_fill(self, grid_level: GridLevel, filled_qty: int, fill_price: Decimal) -> None:
-        """Handle when a grid order is filled"""
+    async def _process_order_update(self, order: Dict[str, Any]) -> None:
+        """Handle the latest state of one order, whether polled or pushed"""
+        # Orders outside the grid (the rest of the day's history) cost one lookup
+        grid_level = self.grid_levels.get(order_id_of(order))
+        if grid_level is None or grid_level.is_filled:
+            return
+        
+        change = self.order_tracker.update(order)
+        if change is None:
+            return
+        
+        completed = change.status == 'filled' or change.filled_quantity >= grid_level.quantity
+        if change.fill_quantity > 0:
+            fill_price = change.fill_price if change.fill_price is not None else grid_level.price
+            await self._handle_order_fill(grid_level, change.fill_quantity, fill_price, completed)
+        elif completed:
+            # Status caught up with fills already handled as partial
+            self.grid_levels.mark_filled(change.order_id)
+            await self._place_replacement_grid_order(grid_level)
+        
+        if not change.is_open and not grid_level.is_filled:
+            # Explicitly cancelled, rejected or expired: free the level so the grid is topped up
+            logger.warning(f"Order {change.order_id} {change.status} with "
+                           f"{change.filled_quantity}/{grid_level.quantity} filled (Grid level {grid_level.grid_index})")
+            self.grid_levels.pop(change.order_id, None)
+            self.order_tracker.forget(change.order_id)
+    
+    async def _handle_order_fill(self, grid_level: GridLevel, filled_qty: int, fill_price: Decimal,
+                                 completed: bool = True) -> None:
+        """Handle a fill on a grid order; `completed` is False for a partial fill"""
         try:
-            logger.info(f"Order filled: {filled_qty} @ {fill_price:,.0f} (Grid level {grid_level.grid_index})")
+            logger.info(f"Order {'filled' if completed else 'partially filled'}: {filled_qty} @ {fill_price:,.0f} "
+                        f"(Grid level {grid_level.grid_index})")
             
             # Update position
+            realized_before = self.position.realized_pnl
             self.position.update_position(filled_qty, fill_price, grid_level.side)
             
-            # Mark grid level as filled
-            grid_level.is_filled = True
-            grid_level.filled_time = datetime.now()
-            
             # Record trade
-            trade_record = {
-                'timestamp': datetime.now(),
-                'symbol': self.config.symbol,
-                'side': grid_level.side,
-                'quantity': filled_qty,
-                'price': fill_price,
-                'grid_index': grid_level.grid_index,
-                'order_id': grid_level.order_id
-            }
-            self.trade_history.append(trade_record)
-            
-            # Place take profit order if we bought
+            self.trade_history.append(TradeRecord(
+                timestamp=datetime.now(),
+                symbol=self.config.symbol,
+                side=grid_level.side,
+                quantity=filled_qty,
+                price=fill_price,
+                grid_index=grid_level.grid_index,
+                order_id=grid_level.order_id,
+                pnl=self.position.realized_pnl - realized_before if grid_level.side == 'SELL' else None
+            ))
+            
+            # Place take profit order for the bought quantity
             if grid_level.side == 'BUY':
                 await self._place_take_profit_order(filled_qty, fill_price)
             
-            # Place new grid order to replace the filled one
-            await self._place_replacement_grid_order(grid_level)
+            if completed:
+                # Mark grid level as filled
+                self.grid_levels.mark_filled(grid_level.order_id)
+                
+                # Place new grid order to replace the filled one
+                await self._place_replacement_grid_order(grid_level)
             
             # Update performance metrics
             await self._update_performance_metrics()
@@ -392,16 +569,17 @@ class RecursiveGridStrategy:
                 price=tp_price
             )
             
-            if order_result and order_result.get('orderId'):
+            order_id = order_id_of(order_result) if order_result else None
+            if order_id:
                 # Track as sell grid level
                 grid_level = GridLevel(
                     price=tp_price,
                     quantity=quantity,
                     side='SELL',
-                    order_id=order_result['orderId'],
+                    order_id=order_id,
                     grid_index=-1  # TP orders use negative index
                 )
-                self.grid_levels[order_result['orderId']] = grid_level
+                self.grid_levels[order_id] = grid_level
                 
                 logger.info(f"Placed take profit order: {quantity} @ {tp_price:,.0f}")
             
@@ -430,15 +608,16 @@ class RecursiveGridStrategy:
                         price=new_price
                     )
                     
-                    if order_result and order_result.get('orderId'):
+                    order_id = order_id_of(order_result) if order_result else None
+                    if order_id:
                         grid_level = GridLevel(
                             price=new_price,
                             quantity=quantity,
                             side='BUY',
-                            order_id=order_result['orderId'],
+                            order_id=order_id,
                             grid_index=filled_level.grid_index + 1
                         )
-                        self.grid_levels[order_result['orderId']] = grid_level
+                        self.grid_levels[order_id] = grid_level
                         
                         logger.info(f"Placed replacement grid order: {quantity} @ {new_price:,.0f}")
             
@@ -467,12 +646,12 @@ class RecursiveGridStrategy:
         """Manage grid orders - cancel outdated ones, place new ones if needed"""
         try:
             # Remove filled orders from tracking
-            filled_orders = [oid for oid, level in self.grid_levels.items() if level.is_filled]
-            for order_id in filled_orders:
+            for order_id in self.grid_levels.filled_order_ids():
                 del self.grid_levels[order_id]
+                self.order_tracker.forget(order_id)
             
             # Check if we need more buy orders
-            active_buy_orders = len([level for level in self.grid_levels.values() if level.side == 'BUY'])
+            active_buy_orders = self.grid_levels.count_open('BUY')
             
             if active_buy_orders < self.config.grid_levels // 2:  # Maintain at least half the grid
                 await self._add_grid_orders()
@@ -484,7 +663,7 @@ class RecursiveGridStrategy:
         """Add additional grid orders if needed"""
         try:
             # Calculate how many orders we need
-            current_buy_orders = len([level for level in self.grid_levels.values() if level.side == 'BUY'])
+            current_buy_orders = self.grid_levels.count_open('BUY')
             orders_needed = self.config.grid_levels - current_buy_orders
             
             if orders_needed > 0:
@@ -492,35 +671,32 @@ class RecursiveGridStrategy:
                 reference_price = self.position.average_price if self.position.average_price > 0 else self.current_market_price
                 new_levels = self._calculate_recursive_grid_levels(reference_price)
                 
-                # Get existing price levels to avoid duplicates
-                existing_prices = {level.price for level in self.grid_levels.values() if level.side == 'BUY'}
-                
                 orders_placed = 0
                 for i, price in enumerate(new_levels):
                     if orders_placed >= orders_needed:
                         break
                         
-                    if price not in existing_prices:
+                    # Avoid duplicating an existing level
+                    if not self.grid_levels.has_open_price('BUY', price):
                         quantity = self._calculate_order_quantity(price, len(self.grid_levels) + i)
                         
                         if quantity > 0 and self._check_risk_limits(quantity, price):
                             order_result = await self._place_limit_order('NB', quantity, price)
                             
-                            if order_result and order_result.get('orderId'):
+                            order_id = order_id_of(order_result) if order_result else None
+                            if order_id:
                                 grid_level = GridLevel(
                                     price=price,
                                     quantity=quantity,
                                     side='BUY',
-                                    order_id=order_result['orderId'],
+                                    order_id=order_id,
                                     grid_index=len(self.grid_levels)
                                 )
-                                self.grid_levels[order_result['orderId']] = grid_level
+                                self.grid_levels[order_id] = grid_level
                                 orders_placed += 1
                                 
                                 logger.info(f"Added grid order: {quantity} @ {price:,.0f}")
                         
-                        await asyncio.sleep(0.1)  # Rate limiting
-                        
         except Exception as e:
             logger.error(f"Error adding grid orders: {e}")
     
@@ -548,16 +724,32 @@ class RecursiveGridStrategy:
             return False
     
     async def _cancel_all_orders(self) -> None:
-        """Cancel all active grid orders"""
+        """Cancel all active grid orders in parallel and confirm the book is flat"""
         try:
-            for order_id, grid_level in self.grid_levels.items():
-                if not grid_level.is_filled:
-                    await self._call_api_async(
-                        self.api_client.cancel_order,
-                        order_id,
-                        self.config.account_no
-                    )
-                    logger.info(f"Cancelled order: {order_id}")
+            open_order_ids = self.grid_levels.open_order_ids()
+            if not open_order_ids:
+                return
+            
+            engine = BulkCancelEngine(
+                cancel_func=lambda order_id: self._call_api_async(
+                    self.api_client.cancel_order, order_id, self.config.account_no
+                ),
+                fetch_orders_func=lambda: self._call_api_async(
+                    self.api_client.get_orders, self.config.account_no
+                ),
+                max_concurrency=self.config.max_concurrent_orders,
+                rate_limiter=self.order_rate_limiter
+            )
+            report = await engine.cancel_all(open_order_ids)
+            self.last_cancel_report = report
+            
+            if report.is_flat:
+                logger.info(f"Cancelled {len(report.cancelled)}/{report.requested} orders; "
+                            f"book flat in {report.flat_seconds * 1000:.0f}ms "
+                            f"(retries: {report.retries}, reconcile passes: {report.reconcile_passes})")
+            else:
+                logger.error(f"Cancelled {len(report.cancelled)}/{report.requested} orders; "
+                             f"still open: {', '.join(report.still_open) or 'unknown'}")
                     
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
@@ -597,9 +789,15 @@ class RecursiveGridStrategy:
             return None
     
     async def _call_api_async(self, func, *args, **kwargs):
-        """Call synchronous API function asynchronously"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, func, *args, **kwargs)
+        """Call an API function, awaiting native coroutines and offloading blocking calls to the executor"""
+        try:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+        except Exception:
+            self.api_errors += 1
+            raise
     
     async def _update_performance_metrics(self) -> None:
         """Update and log performance metrics"""
@@ -608,11 +806,11 @@ class RecursiveGridStrategy:
                 return
             
             total_pnl = self.position.realized_pnl + self.position.unrealized_pnl
-            total_trades = len(self.trade_history)
+            total_trades = self.trade_history.total_trades
             
             if total_trades > 0:
-                win_trades = len([t for t in self.trade_history if t.get('pnl', 0) > 0])
-                win_rate = win_trades / total_trades if total_trades > 0 else 0
+                # Running counters, no rescan of the history
+                win_rate = self.trade_history.win_rate
                 
                 logger.info(f"Performance Update - Total PnL: {total_pnl:,.0f}, "
                           f"Trades: {total_trades}, Win Rate: {win_rate:.1%}")
@@ -629,7 +827,7 @@ class RecursiveGridStrategy:
             logger.info("=== GRID TRADING PERFORMANCE SUMMARY ===")
             logger.info(f"Symbol: {self.config.symbol}")
             logger.info(f"Duration: {duration}")
-            logger.info(f"Total Trades: {len(self.trade_history)}")
+            logger.info(f"Total Trades: {self.trade_history.total_trades}")
             logger.info(f"Final Position: {self.position.total_quantity} shares")
             logger.info(f"Average Price: {self.position.average_price:,.0f}")
             logger.info(f"Realized PnL: {self.position.realized_pnl:,.0f}")
@@ -638,6 +836,13 @@ class RecursiveGridStrategy:
             if self.initial_capital:
                 roi = (total_pnl / self.initial_capital) * 100
                 logger.info(f"ROI: {roi:.2f}%")
+            round_trips = self.trade_history.round_trip_stats()
+            if round_trips['closed_trades']:
+                logger.info(f"Round Trips: {round_trips['closed_trades']} "
+                            f"(Win Rate: {round_trips['win_rate']:.1%})")
+                logger.info(f"Avg Win / Loss: {round_trips['avg_win']:,.0f} / {round_trips['avg_loss']:,.0f}")
+                logger.info(f"Profit Factor: {round_trips['profit_factor']:.2f}, "
+                            f"Expectancy: {round_trips['expectancy']:,.0f}")
             logger.info("========================================")
             
         except Exception as e:
@@ -655,8 +860,26 @@ class RecursiveGridStrategy:
                 'realized_pnl': float(self.position.realized_pnl)
             },
             'grid_orders': len(self.grid_levels),
-            'active_buy_orders': len([level for level in self.grid_levels.values() if level.side == 'BUY' and not level.is_filled]),
-            'active_sell_orders': len([level for level in self.grid_levels.values() if level.side == 'SELL' and not level.is_filled]),
-            'total_trades': len(self.trade_history),
-            'current_price': float(self.current_market_price) if self.current_market_price else None
+            'active_buy_orders': self.grid_levels.count_open('BUY'),
+            'active_sell_orders': self.grid_levels.count_open('SELL'),
+            'grid_book': self.grid_levels.get_stats(),
+            'total_trades': self.trade_history.total_trades,
+            'current_price': float(self.current_market_price) if self.current_market_price else None,
+            'order_latency': self.order_latency.summary(),
+            'order_rate_limiter': self.order_rate_limiter.get_stats(),
+            'order_tracker': self.order_tracker.get_stats(),
+            'poll_scheduler': self.poll_scheduler.get_stats(),
+            'trade_stats': self.trade_history.get_stats(),
+            'market_stats': self.market_data_handler.get_statistics(),
+            'market_data_dispatch': self.market_data_handler.get_dispatch_stats(),
+            'market_data_hub': self.market_data_handler.get_hub_stats(),
+            'market_data_gaps': self.market_data_handler.gap_count,
+            'price_subscription': self.price_subscription.get_stats() if self.price_subscription else None,
+            'tick_recorder': self.tick_recorder.get_stats() if self.tick_recorder else None,
+            'bar_aggregator': self.bar_aggregator.get_stats() if self.bar_aggregator else None,
+            'order_events': {
+                'enabled': self.order_events is not None,
+                'healthy': self.order_events.is_healthy() if self.order_events else False,
+                'received': self.order_events.events_received if self.order_events else 0
+            }
         }
@@ -0,0 +1,216 @@
+# Streaming rolling statistics for market data
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+class RollingWelford:
+    """
+    Mean and variance over the last `window` values (all values if None),
+    updated in O(1) with Welford's algorithm and its removal step.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        if window is not None and window < 2:
+            raise ValueError("Rolling window must be at least 2")
+        self.window = window
+        self._values: Deque[float] = deque()
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        if self.window is not None:
+            self._values.append(value)
+            if len(self._values) > self.window:
+                self._remove(self._values.popleft())
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float) -> None:
+        if self.count == 1:
+            self.count, self.mean, self._m2 = 0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.count -= 1
+        self.mean = (old_mean * (self.count + 1) - value) / self.count
+        self._m2 = max(0.0, self._m2 - (value - old_mean) * (value - self.mean))
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Population variance, None with fewer than 2 values"""
+        return self._m2 / self.count if self.count > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+class RollingMinMax:
+    """Minimum and maximum over the last `window` values using monotonic deques (amortized O(1))"""
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("Rolling window must be positive")
+        self.window = window
+        self._index = 0
+        self._mins: Deque[Tuple[int, float]] = deque()
+        self._maxs: Deque[Tuple[int, float]] = deque()
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        i = self._index
+        self._index += 1
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((i, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((i, value))
+
+        oldest = i - self.window + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._maxs[0][1] if self._maxs else None
+
+class RollingVWAP:
+    """Volume-weighted average price over the last `window` ticks"""
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("Rolling window must be positive")
+        self.window = window
+        self._ticks: Deque[Tuple[float, float]] = deque()
+        self._notional = 0.0
+        self._volume = 0.0
+
+    def update(self, price: float, volume: float) -> None:
+        price, volume = float(price), float(volume)
+        self._ticks.append((price * volume, volume))
+        self._notional += price * volume
+        self._volume += volume
+        if len(self._ticks) > self.window:
+            notional, old_volume = self._ticks.popleft()
+            self._notional -= notional
+            self._volume -= old_volume
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._notional / self._volume if self._volume > 0 else None
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+class RollingReturns:
+    """Simple returns over several look-back horizons (in ticks)"""
+
+    def __init__(self, horizons: Sequence[int] = (1, 5, 20)):
+        if not horizons or min(horizons) < 1:
+            raise ValueError("Return horizons must be positive")
+        self.horizons = tuple(horizons)
+        self._prices: Deque[float] = deque(maxlen=max(self.horizons) + 1)
+
+    def update(self, price: float) -> None:
+        self._prices.append(float(price))
+
+    def get(self, horizon: int) -> Optional[float]:
+        """Return over the last `horizon` ticks, None until enough ticks are seen"""
+        if len(self._prices) <= horizon:
+            return None
+        base = self._prices[-horizon - 1]
+        return self._prices[-1] / base - 1 if base else None
+
+    def as_dict(self) -> Dict[int, Optional[float]]:
+        return {horizon: self.get(horizon) for horizon in self.horizons}
+
+class TickStatistics:
+    """
+    Per-symbol streaming statistics: rolling mean/std of price and of
+    tick-to-tick returns, rolling min/max, VWAP and multi-horizon returns.
+    Each tick updates every statistic in O(1); snapshot() reads them without
+    recomputation.
+    """
+
+    def __init__(self, window: int = 100, return_horizons: Sequence[int] = (1, 5, 20)):
+        self.window = window
+        self.price_stats = RollingWelford(window)
+        self.return_stats = RollingWelford(window)
+        self.range = RollingMinMax(window)
+        self.vwap = RollingVWAP(window)
+        self.returns = RollingReturns(return_horizons)
+        self.last_price: Optional[float] = None
+        self.ticks = 0
+
+    def update(self, price: float, volume: float = 0.0) -> None:
+        price = float(price)
+        if self.last_price:
+            self.return_stats.update(price / self.last_price - 1)
+        self.price_stats.update(price)
+        self.range.update(price)
+        self.vwap.update(price, volume)
+        self.returns.update(price)
+        self.last_price = price
+        self.ticks += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values of every statistic"""
+        return {
+            'ticks': self.ticks,
+            'window': self.window,
+            'last_price': self.last_price,
+            'mean': self.price_stats.mean if self.price_stats.count else None,
+            'std': self.price_stats.std,
+            'min': self.range.min,
+            'max': self.range.max,
+            'vwap': self.vwap.value,
+            'volume': self.vwap.volume,
+            'return_volatility': self.return_stats.std,
+            'returns': self.returns.as_dict()
+        }
+
+def rolling_statistics(prices: Sequence[float], volumes: Optional[Sequence[float]] = None,
+                       window: int = 100, return_horizons: Sequence[int] = (1, 5, 20)) -> Dict[str, Any]:
+    """
+    Compute the same statistics as TickStatistics for every bar of an array
+    (for backtests). Values are NaN until the inputs needed are available;
+    windows are partial at the start, as in the streaming version.
+
+    Returns a dict of numpy arrays aligned with `prices`; 'returns' maps each
+    horizon to its array.
+    """
+    import pandas as pd  # Only needed for batch computation
+
+    price = pd.Series(np.asarray(prices, dtype=np.float64))
+    volume = pd.Series(np.zeros(len(price)) if volumes is None else np.asarray(volumes, dtype=np.float64))
+    tick_returns = price.pct_change()
+
+    rolling = price.rolling(window, min_periods=1)
+    notional = (price * volume).rolling(window, min_periods=1).sum()
+    rolling_volume = volume.rolling(window, min_periods=1).sum()
+
+    # The streaming return window holds the returns of the last `window` ticks
+    return_std = tick_returns.rolling(window, min_periods=2).std(ddof=0)
+
+    return {
+        'mean': rolling.mean().to_numpy(),
+        'std': price.rolling(window, min_periods=2).std(ddof=0).to_numpy(),
+        'min': rolling.min().to_numpy(),
+        'max': rolling.max().to_numpy(),
+        'vwap': (notional / rolling_volume.where(rolling_volume > 0)).to_numpy(),
+        'return_volatility': return_std.to_numpy(),
+        'returns': {horizon: price.pct_change(horizon).to_numpy() for horizon in return_horizons}
+    }
@@ -0,0 +1,115 @@
+# Adaptive polling scheduler for the grid monitoring loop
+import logging
+from datetime import datetime, time as dt_time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Vietnam does not observe DST, so a fixed offset is exact
+VN_TZ = timezone(timedelta(hours=7))
+
+# HOSE/HNX order-matching sessions (local time), ATO to ATC, lunch break excluded
+TRADING_SESSIONS = (
+    (dt_time(9, 0), dt_time(11, 30)),
+    (dt_time(13, 0), dt_time(14, 45)),
+)
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Check whether the exchange is in a trading session (weekdays, lunch break excluded)"""
+    now = now.astimezone(VN_TZ) if now and now.tzinfo else (now or datetime.now(VN_TZ))
+    if now.weekday() >= 5:
+        return False
+    current = now.time()
+    return any(start <= current < end for start, end in TRADING_SESSIONS)
+
+class AdaptivePollScheduler:
+    """
+    Chooses how long the monitoring loop sleeps between iterations.
+
+    The interval tightens to `min_interval` when price is within `near_level_pct`
+    of an open grid level or volatility is above `high_volatility`, relaxes to
+    `max_interval` when the market is closed or price is more than
+    `far_level_pct` away from every level, and otherwise stays at
+    `base_interval`. Consecutive API errors back off exponentially from the
+    base interval up to `max_backoff`.
+    """
+
+    def __init__(self, base_interval: float = 5.0, min_interval: float = 1.0,
+                 max_interval: float = 60.0, near_level_pct: Decimal = Decimal('0.005'),
+                 far_level_pct: Decimal = Decimal('0.05'),
+                 high_volatility: Optional[Decimal] = Decimal('0.002'),
+                 max_backoff: float = 120.0, check_market_hours: bool = True):
+        if not 0 < min_interval <= base_interval <= max_interval:
+            raise ValueError("Poll intervals must satisfy 0 < min <= base <= max")
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near_level_pct = near_level_pct
+        self.far_level_pct = far_level_pct
+        self.high_volatility = high_volatility
+        self.max_backoff = max_backoff
+        self.check_market_hours = check_market_hours
+
+        self.consecutive_errors = 0
+        self.current_interval = base_interval
+        self.reason = 'base'
+        self.level_distance_pct: Optional[Decimal] = None
+
+    def record_success(self) -> None:
+        """Reset the error backoff after a clean iteration"""
+        self.consecutive_errors = 0
+
+    def record_error(self) -> float:
+        """Register an API error; returns the backoff interval to sleep"""
+        self.consecutive_errors += 1
+        return self._set(self._backoff_interval(), 'error_backoff')
+
+    def next_interval(self, price: Optional[Decimal], level_prices: Iterable[Decimal],
+                      volatility: Optional[Decimal] = None,
+                      now: Optional[datetime] = None) -> float:
+        """Choose the sleep interval for the next monitoring iteration"""
+        if self.consecutive_errors:
+            return self._set(self._backoff_interval(), 'error_backoff')
+
+        if self.check_market_hours and not is_market_open(now):
+            return self._set(self.max_interval, 'market_closed')
+
+        self.level_distance_pct = self._nearest_level_distance(price, level_prices)
+
+        if self.high_volatility is not None and volatility is not None and volatility >= self.high_volatility:
+            return self._set(self.min_interval, 'high_volatility')
+        if self.level_distance_pct is not None and self.level_distance_pct <= self.near_level_pct:
+            return self._set(self.min_interval, 'near_level')
+        if self.level_distance_pct is None or self.level_distance_pct >= self.far_level_pct:
+            return self._set(self.max_interval, 'far_from_levels')
+        return self._set(self.base_interval, 'base')
+
+    def _backoff_interval(self) -> float:
+        return min(self.max_backoff, self.base_interval * (2 ** self.consecutive_errors))
+
+    @staticmethod
+    def _nearest_level_distance(price: Optional[Decimal], level_prices: Iterable[Decimal]) -> Optional[Decimal]:
+        """Relative distance from price to the closest level, or None without price or levels"""
+        if not price:
+            return None
+        distances = [abs(price - level) for level in level_prices]
+        if not distances:
+            return None
+        return min(distances) / price
+
+    def _set(self, interval: float, reason: str) -> float:
+        if interval != self.current_interval or reason != self.reason:
+            logger.debug(f"Poll interval {self.current_interval:g}s -> {interval:g}s ({reason})")
+        self.current_interval = interval
+        self.reason = reason
+        return interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the chosen interval and why it was chosen"""
+        return {
+            'interval_seconds': self.current_interval,
+            'reason': self.reason,
+            'consecutive_errors': self.consecutive_errors,
+            'level_distance_pct': float(self.level_distance_pct) if self.level_distance_pct is not None else None
+        }
@@ -0,0 +1,177 @@
+# Bounded trade history with spill-to-disk and running performance counters
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .metrics import trade_columns, trade_metrics
+
+logger = logging.getLogger(__name__)
+
+class TradeRecord:
+    """A single fill on a grid order"""
+    __slots__ = ('timestamp', 'symbol', 'side', 'quantity', 'price', 'grid_index', 'order_id', 'pnl')
+
+    def __init__(self, timestamp: datetime, symbol: str, side: str, quantity: int, price: Decimal,
+                 grid_index: int = 0, order_id: Optional[str] = None, pnl: Optional[Decimal] = None):
+        self.timestamp = timestamp
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.grid_index = grid_index
+        self.order_id = order_id
+        self.pnl = pnl  # Realized PnL of a sell, None for buys
+
+    def __repr__(self) -> str:
+        return (f"TradeRecord({self.timestamp.isoformat()} {self.side} {self.quantity} {self.symbol} "
+                f"@ {self.price} pnl={self.pnl})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form (Decimals as strings, timestamp as ISO 8601)"""
+        return {
+            'timestamp': self.timestamp.isoformat(),
+            'symbol': self.symbol,
+            'side': self.side,
+            'quantity': self.quantity,
+            'price': str(self.price),
+            'grid_index': self.grid_index,
+            'order_id': self.order_id,
+            'pnl': str(self.pnl) if self.pnl is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TradeRecord':
+        return cls(
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            symbol=data['symbol'],
+            side=data['side'],
+            quantity=int(data['quantity']),
+            price=Decimal(data['price']),
+            grid_index=data.get('grid_index', 0),
+            order_id=data.get('order_id'),
+            pnl=Decimal(data['pnl']) if data.get('pnl') is not None else None
+        )
+
+class TradeHistory:
+    """
+    Keeps the most recent `capacity` trades in memory and appends older ones to
+    a JSON-lines file in `spill_dir` (dropped if no directory is configured).
+
+    Performance counters are updated on every append, so totals, win rate and
+    volumes cover the whole session without rescanning the trades.
+    """
+
+    def __init__(self, symbol: str, capacity: int = 1000, spill_dir: Optional[str] = None,
+                 spill_batch: int = 100):
+        if capacity < 1:
+            raise ValueError("Trade history capacity must be positive")
+        self.symbol = symbol
+        self.capacity = capacity
+        self.spill_batch = spill_batch
+        self.spill_path = os.path.join(spill_dir, f"{symbol}_trades.jsonl") if spill_dir else None
+        self._recent: Deque[TradeRecord] = deque()
+        self._pending_spill: List[TradeRecord] = []
+
+        # Running counters over every trade recorded
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.realized_pnl = Decimal('0')
+        self.buy_quantity = 0
+        self.sell_quantity = 0
+        self.buy_notional = Decimal('0')
+        self.sell_notional = Decimal('0')
+        self.spilled_trades = 0
+
+    def append(self, trade: TradeRecord) -> None:
+        """Record a trade, moving the oldest in-memory trade out if the buffer is full"""
+        self._recent.append(trade)
+        if len(self._recent) > self.capacity:
+            self._pending_spill.append(self._recent.popleft())
+            if len(self._pending_spill) >= self.spill_batch:
+                self.flush()
+
+        self.total_trades += 1
+        notional = trade.price * trade.quantity
+        if trade.side == 'BUY':
+            self.buy_quantity += trade.quantity
+            self.buy_notional += notional
+        else:
+            self.sell_quantity += trade.quantity
+            self.sell_notional += notional
+        if trade.pnl is not None:
+            self.realized_pnl += trade.pnl
+            if trade.pnl > 0:
+                self.winning_trades += 1
+            elif trade.pnl < 0:
+                self.losing_trades += 1
+
+    def flush(self) -> None:
+        """Write trades evicted from memory to the spill file"""
+        if not self._pending_spill:
+            return
+        batch, self._pending_spill = self._pending_spill, []
+        if not self.spill_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or '.', exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(trade.to_dict()) + '\n' for trade in batch))
+            self.spilled_trades += len(batch)
+        except OSError as e:
+            logger.error(f"Failed to spill {len(batch)} trades to {self.spill_path}: {e}")
+
+    @property
+    def win_rate(self) -> float:
+        closed = self.winning_trades + self.losing_trades
+        return self.winning_trades / closed if closed else 0.0
+
+    def recent(self, limit: Optional[int] = None) -> List[TradeRecord]:
+        """Most recent in-memory trades, oldest first"""
+        trades = list(self._recent)
+        return trades[-limit:] if limit else trades
+
+    def iter_spilled(self) -> Iterator[TradeRecord]:
+        """Read back the trades written to the spill file"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield TradeRecord.from_dict(json.loads(line))
+
+    def __len__(self) -> int:
+        """Trades held in memory, matching iteration; total_trades also counts spilled trades"""
+        return len(self._recent)
+
+    def __iter__(self) -> Iterator[TradeRecord]:
+        return iter(self._recent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get running performance counters"""
+        return {
+            'total_trades': self.total_trades,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'win_rate': self.win_rate,
+            'realized_pnl': float(self.realized_pnl),
+            'buy_quantity': self.buy_quantity,
+            'sell_quantity': self.sell_quantity,
+            'buy_notional': float(self.buy_notional),
+            'sell_notional': float(self.sell_notional),
+            'in_memory': len(self._recent),
+            'spilled': self.spilled_trades
+        }
+
+    def round_trip_stats(self) -> Dict[str, Any]:
+        """
+        FIFO round-trip statistics (profit factor, expectancy, average win/loss)
+        of the in-memory trades. Sells whose buys were already spilled are
+        matched as short lots, so the figures are for the recent window only.
+        """
+        columns = trade_columns(self._recent)
+        return trade_metrics(columns['side'], columns['quantity'], columns['price'], columns.get('timestamp'))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for StrategyService backtest modes
+
+Runs the same threshold strategy over synthetic minute bars in the per-bar
+mode (one strategy call per bar) and the vectorized mode (one call over
+NumPy columns), from bar dicts and from columns as TickStore.bars() returns
+them. Checks that all runs end with the same equity and reports bars/sec.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from services.strategy_service import MODE_VECTORIZED, StrategyService  # noqa: E402
+
+# Buy a lot below `low`, sell everything above `high`
+PER_BAR_STRATEGY = """lambda data, portfolio, parameters: (
+    {'side': 'buy', 'quantity': parameters['lot']}
+    if data['close'] < parameters['low'] and portfolio['position'] == 0 else
+    {'side': 'sell', 'quantity': portfolio['position']}
+    if data['close'] > parameters['high'] and portfolio['position'] > 0 else None
+)"""
+
+VECTORIZED_STRATEGY = """lambda data, parameters: np.where(
+    data['close'] < parameters['low'], parameters['lot'],
+    np.where(data['close'] > parameters['high'], 0, np.nan)
+)"""
+
+def synthetic_bars(count: int, seed: int = 7):
+    """Random-walk minute bars around 25,000 VND"""
+    rng = np.random.default_rng(seed)
+    close = 25000 * np.exp(np.cumsum(rng.normal(0, 0.001, count)))
+    start = datetime(2020, 1, 2, 9, 0)
+    return [
+        {'date': start + timedelta(minutes=i), 'open': c, 'high': c * 1.001, 'low': c * 0.999, 'close': c,
+         'volume': 1000}
+        for i, c in enumerate(close.tolist())
+    ]
+
+def run(name, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-bar and vectorized backtests")
+    parser.add_argument('--bars', type=int, default=500000, help="Synthetic minute bars (~2 years at 250k)")
+    args = parser.parse_args()
+
+    bars = synthetic_bars(args.bars)
+    closes = np.array([bar['close'] for bar in bars])
+    parameters = {'lot': 1000, 'low': float(np.percentile(closes, 45)), 'high': float(np.percentile(closes, 55))}
+    service = StrategyService()
+
+    per_bar, per_bar_time = run("per-bar", lambda: service.execute_strategy(PER_BAR_STRATEGY, bars, parameters))
+    vectorized, vectorized_time = run("vectorized", lambda: service.execute_strategy(
+        VECTORIZED_STRATEGY, bars, parameters, mode=MODE_VECTORIZED))
+    columns = {name: np.array([bar[name] for bar in bars]) for name in ('open', 'high', 'low', 'close', 'volume')}
+    columns['time'] = np.array([bar['date'].timestamp() for bar in bars])
+    from_columns, columns_time = run("vectorized (columns)", lambda: service.execute_strategy(
+        VECTORIZED_STRATEGY, columns, parameters, mode=MODE_VECTORIZED))
+
+    print(f"Bars: {len(bars):,}, trades: {len(per_bar.trades):,}\n")
+    for name, elapsed in (("per-bar", per_bar_time), ("vectorized", vectorized_time),
+                          ("vectorized (columns)", columns_time)):
+        print(f"{name:<22} {elapsed:>8.2f}s {len(bars) / elapsed:>14,.0f} bars/s")
+    print(f"\nSpeed-up: {per_bar_time / vectorized_time:.1f}x from bar dicts, "
+          f"{per_bar_time / columns_time:.1f}x from columns")
+    for result in (vectorized, from_columns):
+        assert len(per_bar.trades) == len(result.trades)
+        assert abs(per_bar.equity_curve[-1] - result.equity_curve[-1]) < 1e-6 * per_bar.equity_curve[-1]
+    print("Trades and final equity match")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the KRX market data decoder
+
+Measures messages/sec for the previous decode path (bytes -> str -> json.loads,
+then field extraction) against channels.tick_decoder, over recorded payloads or
+a synthetic sample of tick/topprice/stockinfo/ohlc messages.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from channels.tick_decoder import (  # noqa: E402
+    JSON_BACKEND, decode_message, ohlc_topic, stock_info_topic, tick_topic, top_price_topic, topic_kind
+)
+
+def load_recorded(path: str):
+    """Read (topic, payload bytes) pairs from a JSON-lines file of {"topic": ..., "payload": {...}}"""
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                payload = record['payload']
+                if not isinstance(payload, str):
+                    payload = json.dumps(payload)
+                messages.append((record['topic'], payload.encode()))
+    return messages
+
+def synthetic_messages(count: int):
+    """Representative KRX payloads, mostly ticks like a live session"""
+    messages = []
+    for i in range(count):
+        symbol = ('VIC', 'HPG', 'FPT', 'SSI')[i % 4]
+        price = 25000 + (i * 37) % 900
+        sending_time = f"2024-06-12T02:{(i // 60) % 60:02d}:{i % 60:02d}.{i % 1000:03d}Z"
+        kind = i % 10
+        if kind < 7:
+            topic = tick_topic(symbol)
+            payload = {
+                'symbol': symbol, 'matchPrice': price, 'matchQtty': 100 * (1 + i % 9),
+                'side': 'BUY' if i % 2 else 'SELL', 'sendingTime': sending_time,
+                'totalVolumeTraded': 1000000 + i
+            }
+        elif kind < 9:
+            topic = top_price_topic(symbol)
+            payload = {
+                'symbol': symbol, 'sendingTime': sending_time,
+                'bid': [{'price': price - 50 * n, 'qtty': 1000 + n} for n in range(1, 4)],
+                'offer': [{'price': price + 50 * n, 'qtty': 900 + n} for n in range(1, 4)]
+            }
+        elif i % 20 == 9:
+            topic = stock_info_topic(symbol)
+            payload = {
+                'symbol': symbol, 'referencePrice': 25000, 'ceilingPrice': 26750, 'floorPrice': 23250,
+                'openPrice': 25100, 'highestPrice': price + 200, 'lowestPrice': price - 200,
+                'matchPrice': price, 'totalVolumeTraded': 1000000 + i, 'sendingTime': sending_time
+            }
+        else:
+            topic = ohlc_topic(symbol)
+            payload = {
+                'symbol': symbol, 'resolution': '1', 'time': 1718158500 + 60 * i,
+                'open': price, 'high': price + 100, 'low': price - 100, 'close': price + 50, 'volume': 50000
+            }
+        messages.append((topic, json.dumps(payload).encode()))
+    return messages
+
+def baseline_parse(topic, payload):
+    """JSON parsing as previously done by the MQTT clients, without any field extraction"""
+    return json.loads(payload.decode())
+
+def baseline_decode(topic, payload):
+    """Previous parsing plus extraction of the same fields the decoder produces"""
+    data = json.loads(payload.decode())
+    kind = topic_kind(topic)
+    timestamp = data.get('sendingTime')
+    if timestamp:
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+    if kind == 'tick':
+        return (data.get('symbol'), Decimal(str(data['matchPrice'])), int(data['matchQtty']),
+                data.get('side'), timestamp, int(data.get('totalVolumeTraded', 0)))
+    if kind == 'topprice':
+        return ([(Decimal(str(level['price'])), int(level['qtty'])) for level in data.get('bid', [])],
+                [(Decimal(str(level['price'])), int(level['qtty'])) for level in data.get('offer', [])],
+                timestamp)
+    return {key: Decimal(str(value)) if isinstance(value, (int, float)) else value for key, value in data.items()}
+
+def fast_decode(topic, payload):
+    record = decode_message(topic, payload)
+    price = getattr(record, 'price', None)
+    return Decimal(str(price)) if price is not None else record
+
+def run(name, decoder, messages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for topic, payload in messages:
+            decoder(topic, payload)
+    elapsed = time.perf_counter() - started
+    rate = len(messages) * repeat / elapsed
+    print(f"{name:<32} {rate:>12,.0f} msg/s")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the KRX market data decoder")
+    parser.add_argument('--payloads', help="JSON-lines file of recorded {topic, payload} messages")
+    parser.add_argument('--count', type=int, default=20000, help="Synthetic messages when no file is given")
+    parser.add_argument('--repeat', type=int, default=5, help="Passes over the message set")
+    args = parser.parse_args()
+
+    messages = load_recorded(args.payloads) if args.payloads else synthetic_messages(args.count)
+    by_kind = defaultdict(list)
+    for topic, payload in messages:
+        by_kind[topic_kind(topic) or 'other'].append((topic, payload))
+
+    print(f"Messages: {len(messages):,} ({', '.join(f'{k}: {len(v):,}' for k, v in sorted(by_kind.items()))})")
+    print(f"JSON backend: {JSON_BACKEND}\n")
+
+    run("json.loads only", baseline_parse, messages, args.repeat)
+    baseline = run("json.loads + field extraction", baseline_decode, messages, args.repeat)
+    fast = run("tick_decoder.decode_message", fast_decode, messages, args.repeat)
+    print(f"\nSpeed-up over equivalent extraction: {fast / baseline:.2f}x\n")
+
+    for kind, kind_messages in sorted(by_kind.items()):
+        run(f"  {kind}", fast_decode, kind_messages, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Grid Parameter Sweep
+
+Backtests every combination of grid spacing, DCA factor, initial order size
+and minimum markup against recorded ticks on all cores, prints each result
+as it finishes and ranks the configurations by return/drawdown.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from channels.tick_store import MARKET_TIMEZONE  # noqa: E402
+from strategies.grid_base import GridConfig  # noqa: E402
+from strategies.parameter_sweep import ParameterSweep, parameter_grid  # noqa: E402
+
+def values(text: str):
+    """Comma-separated numbers"""
+    return [float(value) for value in text.split(',') if value.strip()]
+
+def market_time(text: str) -> float:
+    """YYYY-MM-DD[THH:MM] in market (Vietnam) time, as epoch seconds"""
+    return datetime.fromisoformat(text).replace(tzinfo=MARKET_TIMEZONE).timestamp()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parallel grid parameter sweep over recorded ticks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python run_parameter_sweep.py --symbol VIC --start 2024-06-01 --end 2024-07-01
+  python run_parameter_sweep.py --symbol HPG --spacing 0.005,0.01,0.02 --ddown 1.2,1.5,2 --workers 8
+        """
+    )
+    parser.add_argument("--symbol", "-s", required=True, help="Symbol to backtest")
+    parser.add_argument("--data-dir", default="market_data", help="Recorded market data directory")
+    parser.add_argument("--start", type=market_time, help="First day (market time)")
+    parser.add_argument("--end", type=market_time, help="End, exclusive (market time)")
+    parser.add_argument("--capital", type=float, default=1_000_000_000, help="Initial cash (VND)")
+    parser.add_argument("--levels", type=int, default=10, help="Number of grid levels")
+    parser.add_argument("--spacing", type=values, default=[0.005, 0.01, 0.02, 0.03], help="grid_spacing_pct values")
+    parser.add_argument("--ddown", type=values, default=[1.0, 1.25, 1.5, 2.0], help="ddown_factor values")
+    parser.add_argument("--qty", type=values, default=[0.02, 0.05, 0.1], help="initial_qty_pct values")
+    parser.add_argument("--markup", type=values, default=[0.003, 0.005, 0.01], help="min_markup_pct values")
+    parser.add_argument("--fee-rate", type=float, default=0.0, help="Commission per fill, as a fraction of value")
+    parser.add_argument("--expire-at-close", action="store_true", help="Expire unfilled orders after ATC")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=10, help="Configurations to show in the ranking")
+    parser.add_argument("--output", help="Write every result to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = GridConfig(symbol=args.symbol, account_no="BACKTEST", grid_levels=args.levels)
+    grid = parameter_grid(
+        grid_spacing_pct=args.spacing,
+        ddown_factor=args.ddown,
+        initial_qty_pct=args.qty,
+        min_markup_pct=args.markup
+    )
+    sweep = ParameterSweep(config, args.data_dir, args.start, args.end, args.capital, max_workers=args.workers,
+                           fee_rate=args.fee_rate, expire_at_close=args.expire_at_close)
+
+    for done, result in enumerate(sweep.run(grid), 1):
+        row = result.to_dict()
+        if result.error:
+            print(f"[{done}/{len(grid)}] {row['parameters']} failed: {result.error}")
+        else:
+            print(f"[{done}/{len(grid)}] {row['parameters']} return {result.summary['total_return']:.2%} "
+                  f"drawdown {result.summary['max_drawdown']:.2%}")
+
+    print(f"\nTop {args.top} by return/drawdown:")
+    for rank, result in enumerate(sweep.ranked(args.top), 1):
+        row = result.to_dict()
+        print(f"{rank:3d}. score {row['score']:8.2f}  return {result.summary['total_return']:7.2%}  "
+              f"drawdown {result.summary['max_drawdown']:6.2%}  fills {result.summary['fills']:5d}  "
+              f"{row['parameters']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([result.to_dict() for result in sweep.ranked()], f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -187,6 +187,1386 @@ def test_config_manager():
         if os.path.exists(config_file):
             os.unlink(config_file)
 
+def test_pooled_transport():
+    """Test that DNSE clients share connections but not cookies"""
+    print("Testing pooled HTTP transport...")
+    
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from core.http_transport import PooledTransport
+    from dnse_client import DNSEClient
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive
+        
+        def do_GET(self):
+            body = (self.headers.get('Cookie') or '').encode()
+            self.send_response(200)
+            if self.path.startswith('/login/'):
+                self.send_header('Set-Cookie', f"session={self.path.rsplit('/', 1)[1]}; Path=/")
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        transport = PooledTransport(pool_maxsize=1)
+        alice = DNSEClient("alice", "secret", transport=transport)
+        bob = DNSEClient("bob", "secret", transport=transport)
+        alice.transport.get(f"{base}/login/alice")
+        bob.transport.get(f"{base}/login/bob")
+        assert alice.transport.get(f"{base}/whoami").text == "session=alice"
+        assert bob.transport.get(f"{base}/whoami").text == "session=bob"
+        assert transport.get(f"{base}/whoami").text == ""
+        print("✓ Cookies set for one client never reach another")
+        
+        stats = bob.get_transport_stats()
+        connections, sent = transport._adapter.pool_counters()
+        assert stats['requests'] == sent == 5 and connections == 1
+        assert stats['pool_hits'] == 4 and stats['pool_misses'] == 1
+        print(f"✓ 5 requests from two clients over {connections} pooled connection")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_async_dnse_client():
+    """Test the asyncio DNSE client against a stubbed aiohttp session, alone and under the grid strategy"""
+    print("Testing async DNSE client...")
+    
+    import asyncio
+    import json
+    import aiohttp
+    from yarl import URL
+    from cli.async_dnse_client import AsyncDNSEClient
+    from cli.dnse_api import BASE_API_URL
+    from cli.dnse_client_v2 import DNSEClient
+    from strategies.grid_base import GridConfig
+    from strategies.recursive_grid import RecursiveGridStrategy
+    
+    responses = {
+        ('POST', '/auth-service/login'): {'token': 'jwt-1'},
+        ('GET', '/user-service/api/me'): {'investorId': 42},
+        ('POST', '/order-service/trading-token'): {'tradingToken': 'trade-1'},
+        ('POST', '/order-service/v2/orders'): {'id': 7, 'orderStatus': 'pending'},
+        ('GET', '/order-service/v2/orders'): {'orders': []}
+    }
+    
+    class StubResponse:
+        def __init__(self, method, url, body, status):
+            self.method, self.url, self.body, self.status = method, url, body, status
+            self.reason = 'OK' if status < 400 else 'Bad Request'
+        
+        async def __aenter__(self):
+            return self
+        
+        async def __aexit__(self, *exc):
+            return False
+        
+        async def text(self):
+            return json.dumps(self.body)
+        
+        def raise_for_status(self):
+            info = aiohttp.RequestInfo(URL(self.url), self.method, {}, URL(self.url))
+            raise aiohttp.ClientResponseError(info, (), status=self.status, message=self.reason)
+    
+    class StubSession:
+        closed = False
+        
+        def __init__(self, rejected=()):
+            self.sent = []
+            self.rejected = rejected
+        
+        def request(self, method, url, params=None, json=None, headers=None):
+            endpoint = url[len(BASE_API_URL):]
+            self.sent.append((method, endpoint, dict(params or ()), json, headers))
+            status = 400 if (method, endpoint) in self.rejected else 200
+            return StubResponse(method, url, responses.get((method, endpoint), {}), status)
+        
+        async def close(self):
+            self.closed = True
+    
+    async def session_flow(client):
+        await client.login()
+        await client.verify_email_otp('123456')
+        placed = await client.place_order('0001', 'VIC', 'NB', 'LO', 100, price=25000)
+        orders = await client.get_orders('0001')
+        return placed, orders
+    
+    client = AsyncDNSEClient('user', 'pass')
+    client._session = session = StubSession()
+    placed, orders = asyncio.run(session_flow(client))
+    assert client.jwt_token == 'jwt-1' and client.investor_id == 42 and client.trading_token == 'trade-1'
+    assert placed['id'] == 7 and orders == {'orders': []}
+    assert [(method, endpoint) for method, endpoint, *_ in session.sent] == [
+        ('POST', '/auth-service/login'), ('GET', '/user-service/api/me'), ('POST', '/order-service/trading-token'),
+        ('POST', '/order-service/v2/orders'), ('GET', '/order-service/v2/orders')]
+    assert session.sent[2][4]['otp'] == '123456' and session.sent[3][4]['trading-token'] == 'trade-1'
+    assert session.sent[4][2] == {'accountNo': '0001'} and client._in_flight == 0 and client._requests == 5
+    print("✓ Login, OTP, place_order and get_orders awaited over the pooled session")
+    
+    # The blocking client builds the same requests from the shared dnse_api definitions
+    class StubRequestsResponse:
+        def __init__(self, body):
+            self.text = json.dumps(body)
+            self.body = body
+        
+        def raise_for_status(self):
+            pass
+        
+        def json(self):
+            return self.body
+    
+    sync_sent = []
+    def sync_request(method, url, params=None, json=None, headers=None, timeout=None):
+        endpoint = url[len(BASE_API_URL):]
+        sync_sent.append((method, endpoint, {k: str(v) for k, v in (params or {}).items()}, json, headers))
+        return StubRequestsResponse(responses.get((method, endpoint), {}))
+    
+    sync_client = DNSEClient('user', 'pass')
+    sync_client.session.request = sync_request
+    sync_client.login()
+    sync_client.verify_email_otp('123456')
+    sync_client.place_order('0001', 'VIC', 'NB', 'LO', 100, price=25000)
+    sync_client.get_orders('0001')
+    assert sync_sent == session.sent
+    print("✓ Blocking and asyncio clients send identical requests")
+    
+    # Place one order, poll fills, then have the exchange reject the next order
+    async def accept_then_reject(strategy, session):
+        accepted = await strategy._place_limit_order('BUY', 100, Decimal('25000'))
+        await strategy._check_order_fills()
+        session.rejected = {('POST', '/order-service/v2/orders')}
+        return accepted, await strategy._place_limit_order('BUY', 100, Decimal('24000'))
+    
+    client._session = session = StubSession()
+    strategy = RecursiveGridStrategy(GridConfig(symbol='VIC', account_no='0001'), client)
+    order, rejected = asyncio.run(accept_then_reject(strategy, session))
+    assert order['id'] == 7 and rejected is None and strategy.api_errors == 1
+    assert session.sent[0][3] == {'symbol': 'VIC', 'side': 'BUY', 'orderType': 'LO', 'quantity': 100,
+                                  'accountNo': '0001', 'price': 25000.0}
+    assert [(method, endpoint) for method, endpoint, *_ in session.sent][1] == ('GET', '/order-service/v2/orders')
+    asyncio.run(client.close())
+    assert session.closed
+    print("✓ Grid strategy awaits the client directly and counts rejected calls")
+
+def test_order_rate_limiter():
+    """Test token-bucket order throttling"""
+    print("Testing TokenBucket...")
+    
+    import asyncio
+    import time
+    from strategies.execution import TokenBucket, LatencyTracker
+    
+    async def acquire_all(bucket, count):
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(count)))
+        return time.monotonic() - started
+    
+    # Burst is served immediately
+    bucket = TokenBucket(rate=50, capacity=5)
+    elapsed = asyncio.run(acquire_all(bucket, 5))
+    assert elapsed < 0.05, f"Burst should not wait, took {elapsed:.3f}s"
+    assert bucket.get_stats()['throttled'] == 0
+    print(f"✓ Burst of 5 served in {elapsed * 1000:.1f}ms")
+    
+    # Requests beyond the burst are paced at the sustained rate
+    bucket = TokenBucket(rate=50, capacity=5)
+    elapsed = asyncio.run(acquire_all(bucket, 10))
+    assert elapsed >= 0.09, f"5 extra requests at 50/s should take ~0.1s, took {elapsed:.3f}s"
+    assert bucket.get_stats()['throttled'] == 5
+    assert not bucket.try_acquire()
+    print(f"✓ 10 requests paced over {elapsed * 1000:.1f}ms")
+    
+    tracker = LatencyTracker()
+    for latency in [10, 20, 30, 40]:
+        tracker.record(latency)
+    summary = tracker.summary()
+    assert summary['count'] == 4 and summary['avg_ms'] == 25 and summary['max_ms'] == 40
+    print(f"✓ Latency summary: {summary}")
+
+def test_bulk_cancel_engine():
+    """Test parallel cancel with retry and reconciliation"""
+    print("Testing BulkCancelEngine...")
+    
+    import asyncio
+    from strategies.execution import BulkCancelEngine
+    
+    book = {str(i): 'new' for i in range(10)}
+    attempts = {}
+    
+    async def cancel(order_id):
+        attempts[order_id] = attempts.get(order_id, 0) + 1
+        if order_id == '3' and attempts[order_id] == 1:
+            raise RuntimeError("transient error")
+        if order_id == '7':
+            return {}  # Acknowledged but never leaves the book on the first pass
+        book[order_id] = 'canceled'
+    
+    async def fetch_orders():
+        orders = [{'id': int(oid), 'orderStatus': status} for oid, status in book.items()]
+        book['7'] = 'canceled'
+        return {'orders': orders}
+    
+    engine = BulkCancelEngine(cancel, fetch_orders, max_concurrency=4, retry_delay=0)
+    report = asyncio.run(engine.cancel_all(list(book)))
+    
+    assert report.is_flat, f"Book should be flat: {report}"
+    assert report.requested == 10 and len(report.cancelled) == 10
+    assert report.retries == 1 and not report.failed
+    assert report.reconcile_passes == 1 and not report.still_open
+    print(f"✓ 10 orders cancelled, book flat in {report.flat_seconds * 1000:.1f}ms "
+          f"({report.retries} retry, {report.reconcile_passes} reconcile pass)")
+
+def test_order_event_stream():
+    """Test event-driven fill delivery through the local stand-in broker"""
+    print("Testing OrderEventStream...")
+    
+    import asyncio
+    from strategies.order_events import OrderEventStream, LocalOrderEventBroker, topic_matches
+    
+    assert topic_matches("orders/+/events", "orders/0001/events")
+    assert topic_matches("orders/#", "orders/0001/deals/1")
+    assert not topic_matches("orders/+", "orders/0001/events")
+    print("✓ Topic wildcards match")
+    
+    async def run():
+        broker = LocalOrderEventBroker()
+        stream = OrderEventStream(broker, ["orders/+/events"])
+        assert await stream.start() and stream.is_healthy()
+        
+        delivered = broker.publish("orders/0001/events", {"orders": [
+            {"id": 1, "orderStatus": "filled", "fillQuantity": 100},
+            {"id": 2, "orderStatus": "partiallyFilled", "fillQuantity": 50}
+        ]})
+        assert delivered == 1
+        first = await asyncio.wait_for(stream.get(), 1)
+        second = await asyncio.wait_for(stream.get(), 1)
+        assert (first["id"], second["id"]) == (1, 2)
+        
+        broker.connected = False
+        assert not stream.is_healthy(), "Stream should report down so polling takes over"
+        stream.stop()
+        assert broker.publish("orders/0001/events", {"id": 3}) == 0
+        return stream.events_received
+    
+    received = asyncio.run(run())
+    assert received == 2
+    print(f"✓ {received} order updates pushed through the stream")
+
+def test_order_state_tracker():
+    """Test incremental order-state diffing and partial fill accounting"""
+    print("Testing OrderStateTracker...")
+    
+    from decimal import Decimal
+    from strategies.execution import OrderStateTracker
+    
+    tracker = OrderStateTracker()
+    
+    change = tracker.update({"id": 7, "orderStatus": "new", "fillQuantity": 0})
+    assert change.status == "new" and change.fill_quantity == 0
+    assert tracker.update({"id": 7, "orderStatus": "new", "fillQuantity": 0}) is None
+    print("✓ Unchanged orders are not dispatched")
+    
+    change = tracker.update({"id": 7, "orderStatus": "partiallyFilled", "fillQuantity": 100, "averagePrice": 25000})
+    assert change.fill_quantity == 100 and change.fill_price == Decimal("25000")
+    
+    # Same partial fill seen again (poll after push) is not double counted
+    assert tracker.update({"id": 7, "orderStatus": "partiallyFilled", "fillQuantity": 100, "averagePrice": 25000}) is None
+    
+    change = tracker.update({"id": 7, "orderStatus": "filled", "fillQuantity": 300, "averagePrice": 24900})
+    assert change.fill_quantity == 200 and not change.is_open
+    assert change.fill_price == Decimal("24850"), change.fill_price
+    print("✓ Partial fills reported as deltas with their own average price")
+    
+    # Stale snapshot arriving late is ignored
+    assert tracker.update({"id": 7, "orderStatus": "partiallyFilled", "fillQuantity": 100}) is None
+    
+    # Legacy payload keys are understood
+    change = tracker.update({"orderId": "8", "status": "REJECTED", "executedQuantity": 0})
+    assert change.order_id == "8" and change.status == "rejected" and not change.is_open
+    
+    # Deal events often carry no status: the order keeps its last known one
+    tracker.update({"id": "9", "orderStatus": "New"})
+    change = tracker.update({"id": "9", "fillQuantity": 50})
+    assert change.status == "new" and change.fill_quantity == 50 and change.is_open
+    change = tracker.update({"id": "9", "orderStatus": "PartiallyFilled", "fillQuantity": 50})
+    assert change.status == "partiallyfilled" and change.fill_quantity == 0
+    
+    tracker.forget(7)
+    stats = tracker.get_stats()
+    assert stats["tracked_orders"] == 2 and stats["stale_ignored"] == 1
+    print(f"✓ Tracker stats: {stats}")
+    
+    # A status-less fill keeps the grid level, so the order's later fills are still counted
+    import asyncio
+    from strategies.grid_base import GridConfig, GridLevel
+    from strategies.recursive_grid import RecursiveGridStrategy
+    
+    class OrderClient:
+        async def place_order(self, **order):
+            return {'id': 100}
+    
+    strategy = RecursiveGridStrategy(GridConfig(symbol='VIC', account_no='0001'), OrderClient())
+    strategy.grid_levels['1'] = GridLevel(price=Decimal('25000'), quantity=100, side='BUY', order_id='1', grid_index=0)
+    
+    async def fill_in_steps():
+        for update in ({'id': '1', 'orderStatus': 'New'}, {'id': '1', 'fillQuantity': 50},
+                       {'id': '1', 'orderStatus': 'PartiallyFilled', 'fillQuantity': 50},
+                       {'id': '1', 'orderStatus': 'Filled', 'fillQuantity': 100}):
+            await strategy._process_order_update(update)
+    
+    asyncio.run(fill_in_steps())
+    assert strategy.position.total_quantity == 100 and strategy.grid_levels['1'].is_filled
+    print("✓ Status-less deal event does not free a working grid level")
+
+def test_adaptive_poll_scheduler():
+    """Test monitoring interval selection and error backoff"""
+    print("Testing AdaptivePollScheduler...")
+    
+    from datetime import datetime
+    from decimal import Decimal
+    from strategies.scheduler import AdaptivePollScheduler, is_market_open, VN_TZ
+    
+    session = datetime(2024, 6, 12, 10, 0, tzinfo=VN_TZ)  # Wednesday morning
+    assert is_market_open(session)
+    assert not is_market_open(datetime(2024, 6, 12, 12, 0, tzinfo=VN_TZ))  # Lunch break
+    assert not is_market_open(datetime(2024, 6, 15, 10, 0, tzinfo=VN_TZ))  # Saturday
+    print("✓ Market hours detected")
+    
+    scheduler = AdaptivePollScheduler(base_interval=5, min_interval=1, max_interval=60, max_backoff=40)
+    levels = [Decimal('24500'), Decimal('24000')]
+    
+    assert scheduler.next_interval(Decimal('24550'), levels, now=session) == 1
+    assert scheduler.reason == 'near_level'
+    assert scheduler.next_interval(Decimal('25000'), levels, now=session) == 5
+    assert scheduler.next_interval(Decimal('30000'), levels, now=session) == 60
+    assert scheduler.next_interval(Decimal('25000'), levels, Decimal('0.01'), now=session) == 1
+    assert scheduler.reason == 'high_volatility'
+    assert scheduler.next_interval(Decimal('24550'), levels, now=datetime(2024, 6, 15, 10, 0, tzinfo=VN_TZ)) == 60
+    assert scheduler.reason == 'market_closed'
+    print("✓ Interval tightens near levels and relaxes when closed or far away")
+    
+    backoffs = [scheduler.record_error() for _ in range(4)]
+    assert backoffs == [10, 20, 40, 40], backoffs
+    scheduler.record_success()
+    assert scheduler.next_interval(Decimal('25000'), levels, now=session) == 5
+    print(f"✓ Error backoff: {backoffs}; stats: {scheduler.get_stats()}")
+
+def test_grid_book():
+    """Test the indexed grid level book"""
+    print("Testing GridBook...")
+    
+    from decimal import Decimal
+    from strategies.grid_base import GridBook, GridLevel
+    
+    book = GridBook()
+    for i, price in enumerate([24000, 24500, 23500, 24500]):
+        book[f"b{i}"] = GridLevel(price=Decimal(price), quantity=100, side='BUY', order_id=f"b{i}", grid_index=i)
+    book["s0"] = GridLevel(price=Decimal('26000'), quantity=100, side='SELL', order_id="s0", grid_index=-1)
+    
+    assert len(book) == 5 and book.count_open('BUY') == 4 and book.count_open('SELL') == 1
+    assert book.open_prices('BUY') == [Decimal('23500'), Decimal('24000'), Decimal('24500'), Decimal('24500')]
+    assert book.has_open_price('BUY', Decimal('24500')) and not book.has_open_price('SELL', Decimal('24500'))
+    assert book.nearest_open_price(Decimal('24300')) == Decimal('24500')
+    assert book.nearest_open_price(Decimal('25900')) == Decimal('26000')
+    assert book.nearest_open_price(Decimal('25900'), 'BUY') == Decimal('24500')
+    assert book.open_notional('BUY') == Decimal('9650000')
+    print("✓ Sorted price index and counters")
+    
+    book.mark_filled("b1")
+    assert book.count_open('BUY') == 3 and book.count_filled() == 1
+    assert book.has_open_price('BUY', Decimal('24500'))  # b3 still open at the same price
+    assert book.filled_order_ids() == ["b1"]
+    
+    del book["b1"]
+    book.pop("b3")
+    assert not book.has_open_price('BUY', Decimal('24500')) and book.count_filled() == 0
+    assert sorted(book.open_order_ids()) == ["b0", "b2", "s0"]
+    assert book.pop("missing") is None
+    print(f"✓ Fills and removals keep the index in sync: {book.get_stats()}")
+
+def test_trade_history():
+    """Test the bounded trade history with spill-to-disk"""
+    print("Testing TradeHistory...")
+    
+    import tempfile
+    from datetime import datetime
+    from decimal import Decimal
+    from strategies.trade_history import TradeHistory, TradeRecord
+    
+    with tempfile.TemporaryDirectory() as spill_dir:
+        history = TradeHistory("VIC", capacity=3, spill_dir=spill_dir, spill_batch=2)
+        for i in range(6):
+            side = 'BUY' if i % 2 == 0 else 'SELL'
+            pnl = None if side == 'BUY' else Decimal(1000 if i != 3 else -500)
+            history.append(TradeRecord(datetime.now(), "VIC", side, 100, Decimal(25000 + i), i, f"o{i}", pnl))
+        
+        assert history.total_trades == 6 and len(history) == len(list(history)) == len(history.recent()) == 3
+        assert [t.order_id for t in history] == ["o3", "o4", "o5"]
+        assert history.spilled_trades == 2  # o0, o1 written; o2 waiting for the next batch
+        history.flush()
+        spilled = list(history.iter_spilled())
+        assert [t.order_id for t in spilled] == ["o0", "o1", "o2"]
+        assert spilled[1].pnl == Decimal(1000) and spilled[0].price == Decimal(25000)
+        print(f"✓ {len(spilled)} trades spilled, {len(history.recent())} kept in memory")
+        
+        stats = history.get_stats()
+        assert stats["winning_trades"] == 2 and stats["losing_trades"] == 1
+        assert history.realized_pnl == Decimal(1500) and abs(history.win_rate - 2 / 3) < 1e-9
+        print(f"✓ Running counters cover the whole session: {stats['total_trades']} trades, "
+              f"win rate {history.win_rate:.1%}")
+
+def test_incremental_ema():
+    """Test the O(1) incremental EMA against a full recomputation"""
+    print("Testing IncrementalEMA...")
+    
+    from decimal import Decimal
+    from strategies.grid_base import IncrementalEMA, EMASmoother
+    
+    prices = [Decimal(25000 + (i * 37) % 500) for i in range(200)]
+    
+    def full_ema(values, span):
+        alpha = Decimal(2) / Decimal(span + 1)
+        ema = values[0]
+        for value in values[1:]:
+            ema = value * alpha + ema * (1 - alpha)
+        return ema
+    
+    smoother = EMASmoother(12, 26)
+    for price in prices:
+        ema_0, ema_1 = smoother.add_price(price)
+    assert abs(ema_0 - full_ema(prices, 12)) < Decimal('1e-15')
+    assert abs(ema_1 - full_ema(prices, 26)) < Decimal('1e-15')
+    print(f"✓ Decimal EMAs match the full-history EMA: {ema_0:.2f}, {ema_1:.2f}")
+    
+    fast = IncrementalEMA((5, 12, 26), use_float=True)
+    for price in prices:
+        values = fast.update(price)
+    assert all(isinstance(value, float) for value in values)
+    assert abs(values[1] - float(ema_0)) < 1e-6 and fast.value(26) == values[2]
+    assert fast.count == len(prices)
+    print(f"✓ Float mode tracks {len(fast.spans)} spans at once")
+
+def test_price_history():
+    """Test the ring-buffer price history and its windowed statistics"""
+    print("Testing PriceHistory...")
+    
+    import statistics
+    from strategies.price_history import PriceHistory
+    
+    history = PriceHistory(capacity=50)
+    prices = [25000 + ((i * 37) % 400) for i in range(120)]
+    for i, price in enumerate(prices):
+        history.append(price, timestamp=1000.0 + i)
+    
+    assert len(history) == 50 and history.total_appended == 120
+    timestamps, window = history.window(since=1100.0)
+    assert timestamps[0] == 1100.0 and list(window) == [float(p) for p in prices[100:]]
+    assert history.count_since(1115.5) == 4
+    print("✓ Ring buffer keeps the latest ticks; time window is a binary search")
+    
+    recent = prices[90:]
+    changes = [abs(recent[i] - recent[i - 1]) / recent[i - 1] for i in range(1, len(recent))]
+    expected = statistics.pstdev(changes)
+    assert abs(history.volatility(since=1090.0) - expected) < 1e-12
+    assert abs(history.mean_price(since=1090.0) - statistics.mean(recent)) < 1e-6
+    
+    quarter = len(recent) // 4
+    early, late = statistics.mean(recent[:quarter]), statistics.mean(recent[-quarter:])
+    assert abs(history.trend_change(since=1090.0) - (late - early) / early) < 1e-12
+    print(f"✓ Windowed volatility {expected:.6f} and trend match a full recomputation")
+
+def test_rolling_statistics():
+    """Test streaming rolling statistics against the batch computation"""
+    print("Testing TickStatistics...")
+    
+    import math
+    import statistics
+    from strategies.rolling_stats import TickStatistics, rolling_statistics
+    
+    prices = [25000 + ((i * 53) % 700) - 350 * (i % 3 == 0) for i in range(300)]
+    volumes = [100 + (i % 7) * 10 for i in range(300)]
+    
+    stats = TickStatistics(window=50, return_horizons=(1, 10))
+    for price, volume in zip(prices, volumes):
+        stats.update(price, volume)
+    snapshot = stats.snapshot()
+    
+    window = prices[-50:]
+    assert abs(snapshot['mean'] - statistics.mean(window)) < 1e-6
+    assert abs(snapshot['std'] - statistics.pstdev(window)) < 1e-6
+    assert snapshot['min'] == min(window) and snapshot['max'] == max(window)
+    vwap = sum(p * v for p, v in zip(window, volumes[-50:])) / sum(volumes[-50:])
+    assert abs(snapshot['vwap'] - vwap) < 1e-6
+    assert abs(snapshot['returns'][10] - (prices[-1] / prices[-11] - 1)) < 1e-12
+    print("✓ Streaming statistics match a full recomputation")
+    
+    batch = rolling_statistics(prices, volumes, window=50, return_horizons=(1, 10))
+    for key in ('mean', 'std', 'min', 'max', 'vwap', 'return_volatility'):
+        assert math.isclose(batch[key][-1], snapshot[key], rel_tol=1e-9), key
+    assert math.isclose(batch['returns'][10][-1], snapshot['returns'][10], rel_tol=1e-9)
+    print("✓ Array version agrees with the streaming version")
+
+def test_tick_decoder():
+    """Test decoding KRX market data payloads into typed records"""
+    print("Testing KRX tick decoder...")
+    
+    from datetime import datetime, timezone
+    from channels.tick_decoder import (
+        OHLCBar, Tick, TopPrice, decode_message, ohlc_topic, parse_timestamp, tick_topic, top_price_topic
+    )
+    
+    tick = decode_message(tick_topic('VIC'), b'{"symbol": "VIC", "matchPrice": 25100, "matchQtty": 300, '
+                                              b'"side": "BUY", "sendingTime": "2024-06-12T02:15:30.250Z"}')
+    assert isinstance(tick, Tick)
+    assert tick.symbol == 'VIC' and tick.price == 25100.0 and tick.quantity == 300 and tick.side == 'BUY'
+    expected = datetime(2024, 6, 12, 2, 15, 30, 250000, tzinfo=timezone.utc).timestamp()
+    assert abs(tick.timestamp - expected) < 1e-6
+    print("✓ Tick decoded from bytes")
+    
+    top = decode_message(top_price_topic('VIC'), '{"bid": [{"price": 25000, "qtty": 1000}], '
+                                                 '"offer": [{"price": 25100, "qtty": 800}]}')
+    assert isinstance(top, TopPrice) and top.symbol == 'VIC'
+    assert top.best_bid == 25000.0 and top.best_offer == 25100.0 and top.mid_price == 25050.0
+    
+    bar = decode_message(ohlc_topic('HPG', '5'), b'{"time": 1718158500, "open": 1, "high": 3, '
+                                                 b'"low": 0.5, "close": 2, "volume": 10}')
+    assert isinstance(bar, OHLCBar) and bar.resolution == '5' and bar.symbol == 'HPG' and bar.close == 2.0
+    print("✓ Top price and OHLC records decoded")
+    
+    # Cached fast path and slow path must agree, including explicit offsets
+    base = datetime(2024, 6, 12, 2, 15, 30, tzinfo=timezone.utc).timestamp()
+    assert parse_timestamp("2024-06-12T02:15:30Z") == base
+    assert parse_timestamp("2024-06-12T02:15:30") == base
+    assert parse_timestamp("2024-06-12T09:15:30+07:00") == base
+    assert parse_timestamp("2024-06-12T02:15:30+07:00") == base - 7 * 3600
+    assert parse_timestamp(base * 1000) == base and parse_timestamp(base) == base
+    print("✓ Timestamps parsed from ISO strings and epoch values")
+    
+    assert decode_message('other/topic', b'{"a": 1}') == {'a': 1}
+    for payload in (b'not json', b'{"symbol": "VIC"}'):
+        try:
+            decode_message(tick_topic('VIC'), payload)
+            assert False, "Malformed payload should be rejected"
+        except ValueError:
+            pass
+    print("✓ Other topics pass through, malformed payloads raise ValueError")
+
+def test_message_dispatcher():
+    """Test the bounded dispatch queue between the MQTT thread and callbacks"""
+    print("Testing MessageDispatcher...")
+    
+    import threading
+    from channels.dispatch import MessageDispatcher
+    
+    release = threading.Event()
+    delivered = []
+    
+    def slow_handler(topic, payload):
+        release.wait(1)
+        delivered.append((topic, payload))
+    
+    dispatcher = MessageDispatcher(slow_handler, max_size=3)
+    dispatcher.start()
+    dispatcher.submit("VIC", 0)
+    assert not dispatcher.wait_idle(0.05), "Handler is blocked, queue should not be idle"
+    for i in range(1, 6):
+        dispatcher.submit("VIC", i)  # Never blocks on the stalled consumer
+    release.set()
+    assert dispatcher.wait_idle(1)
+    stats = dispatcher.get_stats()
+    assert [payload for _, payload in delivered] == [0, 3, 4, 5]
+    assert stats['dropped'] == 2 and stats['max_depth'] == 3 and stats['delivered'] == 4
+    assert stats['max_lag_ms'] > 0
+    dispatcher.stop()
+    print("✓ Full queue drops the oldest messages without blocking the producer")
+    
+    release.clear()
+    delivered.clear()
+    dispatcher = MessageDispatcher(slow_handler, max_size=10, overflow='conflate')
+    dispatcher.start()
+    dispatcher.submit("VIC", 0)
+    dispatcher.wait_idle(0.05)
+    for i in range(1, 6):
+        dispatcher.submit("VIC", i)
+        dispatcher.submit("HPG", i * 10)
+    release.set()
+    assert dispatcher.wait_idle(1)
+    assert delivered == [("VIC", 0), ("VIC", 5), ("HPG", 50)]
+    assert dispatcher.get_stats()['conflated'] == 8
+    dispatcher.stop()
+    print("✓ Conflation keeps only the latest pending message per topic")
+    
+    # Order events bypass the lossy market data queue: nothing is dropped or merged
+    from types import SimpleNamespace
+    from channels.tick_decoder import tick_topic
+    from cli.dnse_client_v2 import MarketDataClient
+    
+    release.clear()
+    client = MarketDataClient(1, "jwt", dispatch_queue_size=2, dispatch_overflow='conflate')
+    client._connection = SimpleNamespace(subscribe=lambda topic: None, unsubscribe=lambda topic: None,
+                                         stop=lambda: None)
+    orders, ticks = [], []
+    client.subscribe("orders/0001", lambda topic, payload: (release.wait(1), orders.append(payload['id'])))
+    client.subscribe(tick_topic("VIC"), lambda topic, payload: (release.wait(1), ticks.append(payload['matchPrice'])))
+    client._dispatcher.start()
+    client._event_dispatcher.start()
+    for i in range(20):
+        client._on_mqtt_message(None, None, SimpleNamespace(topic="orders/0001", payload=b'{"id": %d}' % i))
+        client._on_mqtt_message(None, None, SimpleNamespace(topic=tick_topic("VIC"), payload=b'{"matchPrice": %d}' % i))
+    release.set()
+    assert client._event_dispatcher.wait_idle(2) and client._dispatcher.wait_idle(2)
+    stats = client.get_dispatch_stats()
+    assert orders == list(range(20)) and stats['order_events']['dropped'] == stats['order_events']['conflated'] == 0
+    assert ticks[-1] == 19 and len(ticks) + stats['conflated'] == 20 and stats['conflated'] >= 18
+    client.disconnect_market_data()
+    print("✓ Order events are delivered in full while market data is conflated")
+    
+    failing = MessageDispatcher(lambda topic, payload: 1 / 0)
+    failing.start()
+    failing.submit("VIC", 1)
+    assert failing.wait_idle(1) and failing.errors == 1
+    failing.stop()
+    print("✓ Callback errors are counted and do not stop the worker")
+
+def test_conflation():
+    """Test per-symbol conflation of market data for slow consumers"""
+    print("Testing ConflatingCache...")
+    
+    from decimal import Decimal
+    from channels.conflation import ConflatingCache
+    from channels.tick_decoder import Tick
+    from strategies.market_data import MarketDataHandler
+    
+    cache = ConflatingCache()
+    wakeups = []
+    subscription = cache.subscribe(on_update=lambda: wakeups.append(1))
+    for i in range(1, 101):
+        cache.publish("VIC", 25000 + i)
+        cache.publish("HPG", 30000 + i)
+    assert len(wakeups) == 1, "Consumer is woken once per read, not per update"
+    
+    updates = subscription.read()
+    assert [(u.key, u.value, u.sequence, u.dropped) for u in updates] == [
+        ("VIC", 25100, 100, 99), ("HPG", 30100, 100, 99)
+    ]
+    assert subscription.read() == [] and not subscription.wait(0)
+    cache.publish("VIC", 26000)
+    assert [(u.value, u.dropped) for u in subscription.read()] == [(26000, 0)]
+    assert subscription.get_stats()['dropped'] == 198
+    print("✓ Reads return the latest value per symbol with sequence and dropped count")
+    
+    late = cache.subscribe(keys=["HPG"])
+    snapshot = late.read()
+    assert len(snapshot) == 1 and snapshot[0].value == 30100 and snapshot[0].dropped == 0
+    cache.publish("VIC", 26100)
+    assert late.pending == 0
+    late.close()
+    print("✓ New subscribers start from a snapshot and can filter symbols")
+    
+    handler = MarketDataHandler(None, "VIC")
+    price_subscription = handler.subscribe_conflated()
+    for i in range(10):
+        handler._on_price_update("tick", Tick("VIC", 25000.0 + i, 100, "BUY", 1718158500.0 + i))
+    latest = price_subscription.read()
+    assert len(latest) == 1 and latest[0].value == Decimal("25009.0") and latest[0].dropped == 9
+    assert latest[0].timestamp == 1718158509.0
+    print("✓ MarketDataHandler publishes ticks to conflated subscribers")
+
+def test_market_data_hub():
+    """Test reference-counted fan-out of one market data connection"""
+    print("Testing MarketDataHub...")
+    
+    import asyncio
+    from channels.market_data_hub import MarketDataHub, topic_matches
+    from channels.tick_decoder import Tick, tick_topic
+    from strategies.market_data import MarketDataHandler
+    
+    class FakeClient:
+        def __init__(self):
+            self.connects = 0
+            self.disconnects = 0
+            self.callbacks = {}
+            self.unsubscribed = []
+        
+        def connect_market_data(self):
+            self.connects += 1
+        
+        def disconnect_market_data(self):
+            self.disconnects += 1
+        
+        def subscribe(self, topic, callback, typed=False):
+            assert typed and topic not in self.callbacks, "One broker subscription per topic"
+            self.callbacks[topic] = callback
+        
+        def unsubscribe(self, topic):
+            self.unsubscribed.append(topic)
+            del self.callbacks[topic]
+        
+        def publish(self, topic, payload):
+            # Like the DNSE clients: one delivery per message, exact topic first
+            callback = self.callbacks.get(topic) or next(
+                (cb for pattern, cb in self.callbacks.items() if topic_matches(pattern, topic)), None
+            )
+            if callback:
+                callback(topic, payload)
+    
+    client = FakeClient()
+    hub = MarketDataHub.for_client(client)
+    assert MarketDataHub.for_client(client) is hub
+    
+    handlers = [MarketDataHandler(client, "VIC"), MarketDataHandler(client, "VIC"), MarketDataHandler(client, "HPG")]
+    for handler in handlers:
+        assert asyncio.run(handler.connect())
+    assert client.connects == 1 and len(client.callbacks) == 4
+    assert hub.subscriber_count(tick_topic("VIC")) == 2
+    
+    seen = []
+    everything = hub.subscribe("plaintext/quotes/krx/mdds/tick/v1/roundlot/symbol/+", lambda t, p: seen.append(p.symbol))
+    client.publish(tick_topic("VIC"), Tick("VIC", 25000.0, 100, "BUY", 0.0))
+    assert [float(h.get_current_price() or 0) for h in handlers] == [25000.0, 25000.0, 0.0]
+    assert seen == ["VIC"]
+    print("✓ One upstream subscription per topic, fanned out to every subscriber and wildcard")
+    
+    handlers[0].disconnect()
+    assert client.disconnects == 0 and tick_topic("VIC") in client.callbacks
+    handlers[1].disconnect()
+    assert tick_topic("VIC") in client.unsubscribed
+    hub.unsubscribe(everything)
+    handlers[2].disconnect()
+    assert client.disconnects == 1 and not client.callbacks
+    stats = hub.get_stats()
+    assert stats['upstream_topics'] == 0 and stats['users'] == 0 and stats['deliveries'] == 3
+    print("✓ Last subscriber unsubscribes upstream, last user disconnects")
+
+def test_market_stream_service():
+    """Test conflated, delta-encoded market data streaming to many clients"""
+    print("Testing MarketStreamService...")
+    
+    import asyncio
+    from channels.market_data_hub import MarketDataHub
+    from channels.tick_decoder import Tick, tick_topic
+    from services.market_stream_service import MarketStreamService
+    
+    class FakeClient:
+        def __init__(self):
+            self.callbacks = {}
+            self.connected = False
+        
+        def connect_market_data(self):
+            self.connected = True
+        
+        def disconnect_market_data(self):
+            self.connected = False
+        
+        def is_market_data_connected(self):
+            return self.connected
+        
+        def subscribe(self, topic, callback, typed=False):
+            self.callbacks[topic] = callback
+        
+        def unsubscribe(self, topic):
+            del self.callbacks[topic]
+        
+        def publish(self, record):
+            self.callbacks[tick_topic(record.symbol)](tick_topic(record.symbol), record)
+    
+    upstream = FakeClient()
+    service = MarketStreamService(min_interval=0)
+    service.attach(MarketDataHub(upstream))
+    
+    async def run():
+        first = service.open_client(["VIC"])
+        second = service.open_client(["VIC", "HPG"])
+        assert len(upstream.callbacks) == 4, "One upstream subscription per symbol and kind"
+        
+        for price in (25000.0, 25100.0, 25200.0):
+            upstream.publish(Tick("VIC", price, 100, "BUY", 1718158500.0))
+        message = await first.next_message(timeout=1)
+        [update] = message['updates']
+        assert (update['symbol'], update['kind'], update['seq'], update['dropped']) == ("VIC", "tick", 3, 2)
+        assert update['snapshot'] and update['data']['price'] == 25200.0 and update['data']['quantity'] == 100
+        
+        upstream.publish(Tick("VIC", 25300.0, 100, "BUY", 1718158500.0))
+        message = await first.next_message(timeout=1)
+        assert message['updates'][0]['data'] == {'price': 25300.0}, "Only changed fields are sent"
+        
+        # The second client never read: it gets one conflated update with everything it missed
+        message = await second.next_message(timeout=1)
+        assert message['updates'][0]['seq'] == 4 and message['updates'][0]['dropped'] == 3
+        assert await second.next_message(timeout=0.05) is None
+        
+        service.close_client(first)
+        assert len(upstream.callbacks) == 4
+        service.close_client(second)
+        assert not upstream.callbacks
+    
+    asyncio.run(run())
+    print("✓ Conflated, delta-encoded updates with one upstream subscription per symbol")
+    
+    from fastapi import FastAPI
+    from urllib.parse import quote
+    from fastapi import WebSocketDisconnect
+    from fastapi.testclient import TestClient
+    import routes.market_stream as market_stream
+    from services.market_stream_service import market_stream_service
+    
+    class FakeSessionManager:
+        sessions = {"alice": {"jwt_token": "jwt-1", "investor_info": {"investorId": 1}}}
+        
+        def get_session(self, session_id):
+            return self.sessions.get(session_id)
+    
+    upstream = FakeClient()
+    market_stream_service.attach(MarketDataHub(upstream))
+    session_manager, market_stream.SessionManager = market_stream.SessionManager, FakeSessionManager
+    app = FastAPI()
+    app.include_router(market_stream.router, prefix='/api/market')
+    with TestClient(app) as http:
+        # The shared feed is up, but a client without a session still may not use it
+        try:
+            with http.websocket_connect('/api/market/ws?symbols=vic'):
+                raise AssertionError("Anonymous client streamed on another user's credentials")
+        except WebSocketDisconnect as e:
+            assert e.code == 1008
+        assert http.get('/api/market/stream', params={'symbols': 'VIC'}).status_code == 401
+        
+        http.cookies.set("dnse_session_id", "alice")
+        with http.websocket_connect('/api/market/ws?symbols=vic') as websocket:
+            upstream.publish(Tick("VIC", 25000.0, 200, "SELL", 1718158500.0))
+            message = websocket.receive_json()
+            assert message['updates'][0]['symbol'] == "VIC" and message['updates'][0]['data']['side'] == "SELL"
+        assert http.get('/api/market/stream/stats').json()['connected']
+        for symbols in (',', ','.join(f"S{i}" for i in range(51)), 'VIC,#', '+', 'A/B'):
+            try:
+                with http.websocket_connect(f'/api/market/ws?symbols={quote(symbols)}'):
+                    raise AssertionError("Stream accepted an invalid symbol list")
+            except WebSocketDisconnect as e:
+                assert e.code == 1008
+            assert http.get('/api/market/stream', params={'symbols': symbols}).status_code == 400
+    market_stream.SessionManager = session_manager
+    print("✓ WebSocket route streams updates from the shared feed to logged-in clients only")
+    
+    # A dead upstream (e.g. expired JWT) is replaced and keeps the watched symbols
+    import time
+    from cli.dnse_client_v2 import MarketDataClient
+    from services import market_stream_service as stream_module
+    
+    upstream = FakeClient()
+    service = MarketStreamService(min_interval=0)
+    service.attach(MarketDataHub(upstream))
+    
+    async def replace_upstream():
+        client = service.open_client(["VIC"])
+        upstream.connected = False
+        assert not service.is_connected and not service.needs_upstream, "Still within the connect grace period"
+        service._attached_at = time.monotonic() - stream_module.UPSTREAM_CONNECT_GRACE - 1
+        assert service.needs_upstream
+        replacement = FakeClient()
+        service.attach(MarketDataHub(replacement))
+        assert service.is_connected and not upstream.callbacks and len(replacement.callbacks) == 2
+        replacement.publish(Tick("VIC", 26000.0, 100, "BUY", 1718158600.0))
+        message = await client.next_message(timeout=1)
+        assert message['updates'][0]['data']['price'] == 26000.0
+        service.close_client(client)
+        assert not replacement.callbacks and service.get_stats()['upstream_replacements'] == 1
+    
+    asyncio.run(replace_upstream())
+    
+    tokens = iter(["jwt-2"])
+    market_client = MarketDataClient(1, "jwt-1")
+    assert market_client._market_data_credentials(refresh=True) == ("1", "jwt-1"), "No provider: keep the token"
+    market_client.market_data_token_provider = lambda: next(tokens)
+    assert market_client._market_data_credentials(refresh=True) == ("1", "jwt-2")
+    print("✓ Dead upstream replaced; token refreshes come from the session store")
+
+def test_connection_manager():
+    """Test MQTT reconnect backoff, batched resubscribe and gap events"""
+    print("Testing MQTTConnectionManager...")
+    
+    import base64
+    import json
+    import time
+    from channels.connection_manager import ExponentialBackoff, GapTracker, MQTTConnectionManager, jwt_expiry
+    
+    backoff = ExponentialBackoff(initial=1, maximum=8, jitter=0.5, rng=lambda: 1.0)
+    assert [backoff.next_delay() for _ in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+    backoff = ExponentialBackoff(initial=1, maximum=8, jitter=0.5)
+    delays = [backoff.next_delay() for _ in range(6)]
+    assert all(min(8, 2 ** i) / 2 <= d <= min(8, 2 ** i) for i, d in enumerate(delays))
+    backoff.reset()
+    assert backoff.next_delay() <= 1
+    print("✓ Exponential backoff with bounded jitter")
+    
+    def make_jwt(exp):
+        claims = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).decode().rstrip('=')
+        return f"header.{claims}.signature"
+    
+    assert jwt_expiry(make_jwt(1718158500)) == 1718158500.0 and jwt_expiry("not-a-jwt") is None
+    
+    class FakeMQTTClient:
+        def __init__(self):
+            self.subscribe_calls = []
+            self.credentials = []
+        
+        def username_pw_set(self, username, password):
+            self.credentials.append((username, password))
+        
+        def connect(self, host, port, keepalive):
+            pass
+        
+        def subscribe(self, topic, qos=0):
+            self.subscribe_calls.append(topic)
+    
+    tokens = [make_jwt(time.time() + 60), make_jwt(time.time() + 3600)]
+    refreshes = []
+    
+    def credentials(refresh):
+        if refresh:
+            refreshes.append(tokens.pop(0))
+        return "investor", tokens[0]
+    
+    events = []
+    client = FakeMQTTClient()
+    manager = MQTTConnectionManager(client, "broker", 443, credentials, on_connected=events.append)
+    for symbol in ("VIC", "HPG", "FPT"):
+        manager.subscribe(f"tick/{symbol}")
+    assert not client.subscribe_calls, "Subscriptions are only recorded while disconnected"
+    
+    assert manager._connect_once()
+    assert len(refreshes) == 1 and client.credentials == [("investor", tokens[0])], "Expiring JWT is refreshed first"
+    manager._on_connect(client, None, {}, 0)
+    assert client.subscribe_calls == [[("tick/VIC", 0), ("tick/HPG", 0), ("tick/FPT", 0)]]
+    assert manager.is_connected and len(events) == 1
+    print("✓ Token refreshed before connecting, topics resubscribed in one SUBSCRIBE")
+    
+    from backend.channels.mqtt_channel import MQTTChannel
+    
+    channel = MQTTChannel()
+    channel.initialize("investor", tokens[0], token_provider=lambda: "fresh-jwt")
+    assert channel.connection.credentials(True) == ("investor", "fresh-jwt") and channel.token == "fresh-jwt"
+    channel = MQTTChannel()
+    channel.initialize("investor", tokens[0])
+    channel.connection._auth_rejected = True
+    assert not channel.connection._connect_once() and channel.connection._stop.is_set()
+    assert "new login is needed" in channel.connection.last_error
+    print("✓ MQTTChannel refreshes its JWT through the provider, and stops without one")
+    
+    tracker = GapTracker()
+    assert tracker.record("VIC", 100.0) is None
+    tracker.mark_disconnected(105.0)
+    tracker.mark_reconnected(130.0)
+    assert tracker.stale_symbols == ["VIC"]
+    gap = tracker.record("VIC", 131.0)
+    assert (gap.last_sequence, gap.first_sequence, gap.last_time, gap.first_time) == (1, 2, 100.0, 131.0)
+    assert gap.duration == 31.0 and tracker.record("VIC", 132.0) is None and tracker.gaps == 1
+    print("✓ Gap event with the last update before and first after the disconnect")
+
+def test_tick_recorder():
+    """Test append-only columnar recording of market data"""
+    print("Testing TickRecorder...")
+    
+    import os
+    import tempfile
+    import numpy as np
+    from channels.market_data_hub import MarketDataHub
+    from channels.tick_decoder import Tick, TopPrice, tick_topic
+    from channels.tick_store import TickRecorder, column_path, stored_rows, trading_day
+    
+    # 2024-06-12 09:15 and 2024-06-13 09:15 Vietnam time
+    day1, day2 = 1718158500.0, 1718244900.0
+    assert (trading_day(day1), trading_day(day2)) == ("2024-06-12", "2024-06-13")
+    
+    class FakeClient:
+        def __init__(self):
+            self.callbacks = {}
+        
+        def connect_market_data(self):
+            pass
+        
+        def subscribe(self, topic, callback, typed=False):
+            self.callbacks[topic] = callback
+        
+        def unsubscribe(self, topic):
+            del self.callbacks[topic]
+    
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeClient()
+        hub = MarketDataHub(client)
+        hub.connect()
+        recorder = TickRecorder(root, flush_interval=60)
+        recorder.attach(hub, ["VIC"])
+        assert len(client.callbacks) == 2
+        
+        for i in range(1000):
+            client.callbacks[tick_topic("VIC")](tick_topic("VIC"), Tick("VIC", 25000.0 + i, 100, "BUY" if i % 2 else "SELL", day1 + i))
+        recorder.record(TopPrice("VIC", [(24950.0, 500)], [], day1))
+        recorder.record(Tick("VIC", 26000.0, 10, None, day2))
+        assert recorder.flush(sync=True) == 1002 and recorder.fsyncs == 3
+        
+        prices = np.fromfile(column_path(root, "2024-06-12", "VIC", "tick", "price"), dtype='<f8')
+        sides = np.fromfile(column_path(root, "2024-06-12", "VIC", "tick", "side"), dtype='<i1')
+        assert len(prices) == 1000 and prices[-1] == 25999.0 and list(sides[:2]) == [-1, 1]
+        offers = np.fromfile(column_path(root, "2024-06-12", "VIC", "topprice", "offer_price"), dtype='<f8')
+        assert np.isnan(offers[0]) and stored_rows(root, "2024-06-13", "VIC", "tick") == 1
+        print("✓ Rows appended per day, symbol and column with batched fsync")
+        
+        recorder.stop()
+        assert not client.callbacks
+        # A crash between column writes leaves one column longer; reopening truncates it
+        with open(column_path(root, "2024-06-13", "VIC", "tick", "price"), 'ab') as f:
+            f.write(np.zeros(3, dtype='<f8').tobytes())
+        recorder = TickRecorder(root)
+        recorder.record(Tick("VIC", 26100.0, 10, "BUY", day2 + 1))
+        recorder.stop()
+        prices = np.fromfile(column_path(root, "2024-06-13", "VIC", "tick", "price"), dtype='<f8')
+        assert list(prices) == [26000.0, 26100.0] and stored_rows(root, "2024-06-13", "VIC", "tick") == 2
+    print("✓ Partial rows from an interrupted write are truncated on reopen")
+
+def test_tick_store():
+    """Test memory-mapped time-range queries over recorded market data"""
+    print("Testing TickStore...")
+    
+    import tempfile
+    import time
+    import numpy as np
+    from channels.tick_decoder import Tick
+    from channels.tick_store import TickRecorder, TickStore
+    from services.strategy_service import StrategyService
+    from strategies.market_data import MarketDataHandler
+    
+    day1, day2 = 1718158500.0, 1718244900.0  # 09:15 Vietnam time on consecutive days
+    with tempfile.TemporaryDirectory() as root:
+        recorder = TickRecorder(root)
+        for day in (day1, day2):
+            for i in range(600):  # One tick every 10 seconds for 100 minutes
+                recorder.record(Tick("VIC", 25000.0 + i, 10, "BUY", day + 10 * i))
+                if day == day2 and i == 1:
+                    recorder.record(Tick("VIC", 25001.0, 10, "SELL", day2 + 5))  # Late, clamped to day2 + 10
+        recorder.stop()
+        
+        store = TickStore(root)
+        assert store.days("VIC") == ["2024-06-12", "2024-06-13"] and store.symbols() == ["VIC"]
+        ticks = store.query("VIC", day1 + 100, day1 + 200)
+        assert isinstance(ticks['price'], np.memmap), "Single-day queries are views of the mapped file"
+        assert ticks['price'].tolist() == [25010.0 + i for i in range(10)]
+        assert store.query("VIC", day1 + 5990, day2 + 11)['timestamp'].tolist() == [
+            day1 + 5990, day2, day2 + 10, day2 + 10]
+        
+        bars = store.bars("VIC", '1m', day1, day1 + 600)
+        assert bars['time'][:2].tolist() == [day1, day1 + 60] and (bars['open'][1], bars['close'][1]) == (25006.0, 25011.0)
+        assert bars['volume'].sum() == 600
+        latest, truncated = store.latest("VIC", 3, day1 + 5980, day2 + 20)
+        assert latest['timestamp'].tolist() == [day2, day2 + 10, day2 + 10] and truncated
+        latest, truncated = store.latest("VIC", 3, day1 + 5980, day2 + 5)
+        assert latest['timestamp'].tolist() == [day1 + 5980, day1 + 5990, day2] and not truncated
+        assert not store.latest("VIC", 10, day1, day1 + 20)[1] and len(store.latest("VIC", 5, day2 + 6000)[0]['price']) == 0
+        daily = store.bars("VIC", '1d')
+        assert daily['open'].tolist() == [25000.0, 25000.0] and daily['high'][0] == 25599.0
+        print("✓ Zero-copy time-range slices, latest rows and OHLCV bars across days")
+        
+        price_data = StrategyService(tick_store=store).load_price_data("VIC", '1d')
+        assert [bar['close'] for bar in price_data] == [25599.0, 25599.0]
+        
+        handler = MarketDataHandler(None, "VIC")
+        assert handler.warm_up(store, lookback_seconds=time.time() - day1) == handler.max_history_size
+        assert handler.price_history.window()[1][-1] == 25599.0
+        
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        import routes.market_history as market_history
+        
+        market_history.tick_store = store
+        app = FastAPI()
+        app.include_router(market_history.router, prefix='/api/market')
+        with TestClient(app) as http:
+            result = http.get('/api/market/history', params={'symbol': 'vic', 'start': day2, 'end': day2 + 3600,
+                                                             'resolution': '5m'}).json()
+            assert result['count'] == 12 and result['columns']['volume'][0] == 310
+            result = http.get('/api/market/history', params={'symbol': 'VIC', 'start': day1, 'end': day2,
+                                                             'limit': 5}).json()
+            assert result['truncated'] and result['columns']['price'][-1] == 25599.0
+            result = http.get('/api/market/history', params={'symbol': 'VIC', 'start': day1 + 5970,
+                                                             'end': day2 + 20, 'limit': 4}).json()
+            assert result['count'] == 4 and result['truncated']
+            assert result['columns']['timestamp'] == [day1 + 5990, day2, day2 + 10, day2 + 10]
+            assert http.get('/api/market/history', params={'symbol': 'VIC', 'resolution': '7m'}).status_code == 400
+            assert http.get('/api/market/history', params={'symbol': '../../etc'}).status_code == 400
+        
+        import routes.backtest as backtest_routes
+        app.include_router(backtest_routes.router, prefix='/api/backtest')
+        with TestClient(app) as http:
+            assert http.post('/api/backtest/grid', json={'symbol': '../VIC'}).status_code == 400
+            assert backtest_routes._executor is None, "Rejected before a worker process is started"
+        print("✓ Strategy price data, handler warm-up and /api/market/history served from the store")
+
+def test_bar_builder():
+    """Test streaming OHLC bars with session breaks and exchange reconciliation"""
+    print("Testing BarAggregator...")
+    
+    import tempfile
+    from channels.bar_builder import BarAggregator
+    from channels.tick_decoder import OHLCBar, Tick
+    from channels.tick_store import TickRecorder, TickStore
+    
+    open_ = 1718157600.0  # 2024-06-12 09:00 Vietnam time
+    at = lambda hours, minutes, seconds=0: open_ + (hours - 9) * 3600 + minutes * 60 + seconds
+    
+    published = []
+    bars = BarAggregator(['1m', '5m', '1h', '1d'])
+    bars.subscribe(published.append)
+    for price, quantity, timestamp in [(100.0, 10, at(8, 58)), (101.0, 20, at(9, 0, 30)), (99.0, 5, at(9, 0, 59)),
+                                       (100.5, 1, at(9, 1, 5))]:
+        bars.on_tick(Tick("VIC", price, quantity, "BUY", timestamp))
+    [bar] = published
+    assert (bar.resolution, bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume) == (
+        '1m', at(9, 0), 100.0, 101.0, 99.0, 99.0, 35), "Pre-open print goes to the first bar"
+    print("✓ Ticks aggregated into bars, finished by the next bar's first tick")
+    
+    bars.on_tick(Tick("VIC", 102.0, 10, "BUY", at(11, 29, 30)))
+    published.clear()
+    bars.on_tick(Tick("VIC", 103.0, 7, "BUY", at(11, 31)))  # Late print during the lunch break
+    bars.flush(at(11, 30, 5))
+    assert not published, "Bars ending a session wait for closing prints"
+    bars.on_tick(Tick("VIC", 104.0, 1, "BUY", at(13, 0, 1)))
+    by_resolution = {bar.resolution: bar for bar in published}
+    assert by_resolution['1m'].time == at(11, 29) and by_resolution['1m'].volume == 17
+    assert by_resolution['5m'].close == 103.0 and by_resolution['1h'].time == at(11, 0)
+    assert bars.current("VIC", '1h').time == at(13, 0) and '1d' not in by_resolution
+    bars.flush(at(13, 1, 2))
+    assert published[-1].resolution == '1m' and published[-1].time == at(13, 0)
+    print("✓ Lunch break closes intraday bars, late prints join the session's last bar")
+    
+    with tempfile.TemporaryDirectory() as root:
+        recorder = TickRecorder(root)
+        bars.subscribe(recorder.record)
+        published.clear()
+        bars.reconcile(OHLCBar("VIC", '1', at(13, 0), 104.0, 104.0, 104.0, 104.0, 1))
+        assert not published and bars.bars_matched == 1
+        bars.reconcile(OHLCBar("VIC", '1', at(13, 0), 104.0, 104.5, 104.0, 104.5, 3))
+        assert published[-1].volume == 3 and published[-1].resolution == '1m' and bars.corrections == 1
+        bars.on_tick(Tick("VIC", 105.0, 2, "BUY", at(13, 2)))
+        bars.flush(at(13, 3, 2))
+        recorder.stop()
+        
+        recorded = TickStore(root).recorded_bars("VIC", '1m', at(13, 0), at(14, 0))
+        assert recorded['time'].tolist() == [at(13, 0), at(13, 2)] and recorded['volume'].tolist() == [3, 2]
+    print("✓ Exchange bars correct built bars, corrections replace recorded bars")
+
+def test_vectorized_backtest():
+    """Test the vectorized backtest mode against the per-bar mode"""
+    print("Testing vectorized backtest...")
+    
+    from datetime import datetime, timedelta
+    import numpy as np
+    from services.strategy_service import MODE_VECTORIZED, StrategyService, sma
+    
+    closes = [100, 94, 93, 97, 106, 108, 99, 92, 95, 110, 104]
+    bars = [{'date': datetime(2024, 6, 3) + timedelta(days=i), 'open': c, 'high': c, 'low': c, 'close': c,
+             'volume': 1000} for i, c in enumerate(closes)]
+    per_bar_code = """lambda data, portfolio, parameters: (
+        {'side': 'buy', 'quantity': 100} if data['close'] < 95 and portfolio['position'] == 0 else
+        {'side': 'sell', 'quantity': portfolio['position']} if data['close'] > 105 and portfolio['position'] else None)"""
+    vectorized_code = "lambda data, parameters: np.where(data['close'] < 95, 100, np.where(data['close'] > 105, 0, np.nan))"
+    
+    service = StrategyService(initial_capital=100_000)
+    per_bar = service.execute_strategy(per_bar_code, bars, {})
+    vectorized = service.execute_strategy(vectorized_code, bars, {}, mode=MODE_VECTORIZED)
+    assert vectorized.equity_curve == per_bar.equity_curve
+    assert [(t['date'], t['side'], t['quantity']) for t in vectorized.trades] == [
+        (t['date'], t['side'], t['quantity']) for t in per_bar.trades]
+    assert vectorized.portfolio['cash'] == per_bar.portfolio['cash'] and vectorized.portfolio['position'] == 0
+    print("✓ Same trades and equity curve as the per-bar mode")
+    
+    columns = {name: np.array(closes, dtype=float) for name in ('open', 'high', 'low', 'close')}
+    columns.update(volume=np.full(len(closes), 1000), time=np.array([bar['date'].timestamp() for bar in bars]))
+    result = service.execute_strategy(vectorized_code, columns, {}, mode=MODE_VECTORIZED)
+    assert result.equity_curve == per_bar.equity_curve and result.trades[0]['date'] == bars[1]['date']
+    assert np.allclose(sma(closes, 3)[2:4], [(100 + 94 + 93) / 3, (94 + 93 + 97) / 3])
+    try:
+        service.execute_strategy("lambda data, parameters: np.full(len(data['close']), 5000)", bars, {},
+                                 mode=MODE_VECTORIZED)
+        assert False, "Unaffordable targets must fail"
+    except Exception as e:
+        assert "more cash" in str(e)
+    print("✓ Columnar input, indicator helpers and cash check")
+
+def test_metrics():
+    """Test FIFO round trips and equity curve metrics"""
+    print("Testing metrics...")
+    
+    import math
+    from datetime import datetime, timedelta
+    import numpy as np
+    from services.strategy_service import MODE_VECTORIZED, StrategyService
+    from strategies.metrics import calculate_metrics, equity_metrics, fifo_round_trips, trade_columns
+    from strategies.trade_history import TradeHistory, TradeRecord
+    
+    fills = [
+        {'timestamp': 0, 'side': 'BUY', 'quantity': 100, 'price': 10, 'fee': 1.0},
+        {'timestamp': 60, 'side': 'BUY', 'quantity': 100, 'price': 12, 'fee': 1.0},
+        {'timestamp': 120, 'side': 'SELL', 'quantity': 150, 'price': 13, 'fee': 1.5},
+        {'timestamp': 300, 'side': 'SELL', 'quantity': 50, 'price': 9, 'fee': 0.5}
+    ]
+    columns = trade_columns(fills)
+    trips = fifo_round_trips(columns['side'], columns['quantity'], columns['price'], columns['timestamp'], columns['fee'])
+    assert np.allclose(trips['pnl'], [100 * 2.98 + 50 * 0.98, 50 * -3.02])
+    assert np.allclose(trips['entry_price'], [1600 / 150, 12]) and np.allclose(trips['holding_seconds'], [120, 240])
+    short = fifo_round_trips(np.array([-1, 1]), np.array([10, 10]), np.array([5.0, 4.0]))
+    assert np.allclose(short['pnl'], [10])
+    print("✓ FIFO matching across partial lots, fees and shorts")
+    
+    equity = [100, 110, 99, 104.5, 121, 120]
+    metrics = calculate_metrics(equity, trades=columns, position_values=[0, 50, 0, 0, 60.5, 0])
+    returns = np.diff(equity) / equity[:-1]
+    downside = math.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    assert math.isclose(metrics['sortino_ratio'], returns.mean() / downside * math.sqrt(252))
+    assert math.isclose(metrics['max_drawdown'], 0.1) and metrics['max_drawdown_duration'] == 3
+    assert math.isclose(metrics['calmar_ratio'], metrics['annualized_return'] / 0.1)
+    assert math.isclose(metrics['exposure'], (50 / 110 + 60.5 / 121) / 6)
+    assert math.isclose(metrics['turnover'], 4600 / np.mean(equity))
+    assert math.isclose(metrics['profit_factor'], 347 / 151) and metrics['win_rate'] == 0.5
+    hourly = equity_metrics(equity, timestamps=np.arange(6) * 3600.0)
+    assert hourly['max_drawdown_duration_seconds'] == 3 * 3600 and hourly['periods_per_year'] > 8000
+    assert equity_metrics([100]) == {} and equity_metrics([100, 100])['sharpe_ratio'] == 0.0
+    print("✓ Sortino, drawdown duration, Calmar, exposure and turnover")
+    
+    history = TradeHistory("VIC", capacity=10)
+    for fill in fills:
+        history.append(TradeRecord(datetime.fromtimestamp(fill['timestamp']), "VIC", fill['side'],
+                                   fill['quantity'], Decimal(str(fill['price']))))
+    assert math.isclose(history.round_trip_stats()['realized_pnl'], 100 * 3 + 50 * 1 - 50 * 3)
+    
+    closes = [100, 94, 93, 97, 106, 108, 99, 92, 95, 110, 104]
+    bars = [{'date': datetime(2024, 6, 3) + timedelta(days=i), 'open': c, 'high': c, 'low': c, 'close': c,
+             'volume': 1000} for i, c in enumerate(closes)]
+    service = StrategyService(initial_capital=100_000)
+    per_bar = service.execute_strategy("""lambda data, portfolio, parameters: (
+        {'side': 'buy', 'quantity': 100} if data['close'] < 95 and portfolio['position'] == 0 else
+        {'side': 'sell', 'quantity': portfolio['position']} if data['close'] > 105 and portfolio['position'] else None)""",
+        bars, {}).metrics
+    vectorized = service.execute_strategy(
+        "lambda data, parameters: np.where(data['close'] < 95, 100, np.where(data['close'] > 105, 0, np.nan))",
+        bars, {}, mode=MODE_VECTORIZED).metrics
+    assert per_bar['realized_pnl'] == 100 * (106 - 94) + 100 * (110 - 92) and per_bar['closed_trades'] == 2
+    assert all(math.isclose(per_bar[key], vectorized[key]) for key in per_bar)
+    assert per_bar['total_trades'] == 4 and 0 < per_bar['exposure'] < 1
+    print("✓ Live trade history and StrategyService use the same metrics")
+
+def test_grid_backtest():
+    """Test the real grid strategy against the simulated exchange on a virtual clock"""
+    print("Testing grid backtest...")
+    
+    import asyncio
+    import math
+    import tempfile
+    import time
+    from decimal import Decimal
+    from channels.tick_decoder import Tick
+    from channels.tick_store import TickRecorder, TickStore
+    from exceptions import DNSEAPIError
+    from strategies import recursive_grid
+    from strategies.backtest import GridBacktest, SimulatedExchange, VirtualClock
+    from strategies.grid_base import GridConfig
+    
+    day1 = 1718157600.0  # 09:00 Vietnam time
+    with tempfile.TemporaryDirectory() as root:
+        recorder = TickRecorder(root)
+        for day in range(3):
+            for start, end in ((0, 9000), (14400, 20700)):  # Morning and afternoon sessions
+                for t in range(start, end, 10):
+                    price = round(25000 * (1 + 0.05 * math.sin((day * 21600 + t) / 7200)))
+                    recorder.record(Tick("VIC", float(price), 100, "BUY", day1 + day * 86400 + t))
+        recorder.stop()
+        store = TickStore(root)
+        
+        config = GridConfig(symbol="VIC", account_no="0001", grid_levels=5,
+                            grid_spacing_pct=Decimal('0.01'), initial_qty_pct=Decimal('0.02'))
+        result = GridBacktest(config, store, initial_cash=1e9).run()
+        assert result.end - result.start > 2 * 86400 and result.wall_seconds < 30
+        assert result.exchange_stats['ticks_replayed'] == 3 * 1530
+        assert result.fills and result.strategy_status['total_trades'] == len(result.fills)
+        assert result.strategy_status['position']['quantity'] == result.exchange_stats['position']
+        buys = sum(fill['quantity'] for fill in result.fills if fill['side'] == 'BUY')
+        sells = sum(fill['quantity'] for fill in result.fills if fill['side'] == 'SELL')
+        assert buys - sells == result.exchange_stats['position']
+        assert result.total_return == result.final_equity / 1e9 - 1 and 0 <= result.max_drawdown < 0.05
+        assert recursive_grid.time is time, "Clock patches are removed after the run"
+        print(f"✓ {len(result.fills)} fills over {(result.end - result.start) / 86400:.1f} days "
+              f"in {result.wall_seconds:.2f}s, positions reconcile")
+        
+        clock = VirtualClock(day1)
+        exchange = SimulatedExchange(store, "VIC", clock, initial_cash=1_000_000)
+        clock.advance(60)
+        assert exchange.ticks_replayed == 7 and exchange.last_price == round(25000 * (1 + 0.05 * math.sin(60 / 7200)))
+        order = asyncio.run(exchange.place_order("0001", "VIC", "NB", "LO", 10, 24000))
+        assert order['orderStatus'] == 'new' and exchange.reserved_cash == 240000
+        for rejected in ((100, 24000, "NB"), (10, 26000, "NS")):
+            try:
+                asyncio.run(exchange.place_order("0001", "VIC", rejected[2], "LO", rejected[0], rejected[1]))
+                assert False, "Order must be rejected"
+            except DNSEAPIError:
+                pass
+        asyncio.run(exchange.cancel_order(order['id']))
+        orders = asyncio.run(exchange.get_orders())['orders']
+        assert orders[0]['orderStatus'] == 'canceled' and exchange.reserved_cash == 0
+        print("✓ Cash and share reservations, rejections and cancels")
+
+def test_parameter_sweep():
+    """Test parallel grid parameter sweeps and their ranking"""
+    print("Testing parameter sweep...")
+    
+    import math
+    import tempfile
+    from decimal import Decimal
+    from channels.tick_decoder import Tick
+    from channels.tick_store import TickRecorder
+    from strategies.grid_base import GridConfig
+    from strategies.parameter_sweep import (
+        ParameterSweep, SweepResult, apply_parameters, parameter_grid, rank_results
+    )
+    
+    grid = parameter_grid(grid_spacing_pct=[0.01, 0.02], ddown_factor=[0.5, 1.5])
+    assert len(grid) == 4 and grid[0] == {'grid_spacing_pct': 0.01, 'ddown_factor': 0.5}
+    config = apply_parameters(GridConfig(symbol="VIC", account_no="0001"), grid[1])
+    assert config.ddown_factor == Decimal('1.5') and config.grid_spacing_pct == Decimal('0.01')
+    
+    ranked = rank_results([
+        SweepResult({'a': 1}, summary={'total_return': 0.02, 'max_drawdown': 0.01}),
+        SweepResult({'a': 2}, error="failed"),
+        SweepResult({'a': 3}, summary={'total_return': 0.01, 'max_drawdown': 0.0}),
+        SweepResult({'a': 4}, summary={'total_return': 0.05, 'max_drawdown': 0.05}),
+    ])
+    assert [result.parameters['a'] for result in ranked] == [3, 1, 4]
+    print("✓ Parameter grid and return/drawdown ranking")
+    
+    day1 = 1718157600.0  # 09:00 Vietnam time
+    with tempfile.TemporaryDirectory() as root:
+        recorder = TickRecorder(root)
+        for day in range(2):
+            for start, end in ((0, 9000), (14400, 20700)):
+                for t in range(start, end, 10):
+                    price = round(25000 * (1 + 0.05 * math.sin((day * 21600 + t) / 7200)))
+                    recorder.record(Tick("VIC", float(price), 100, "BUY", day1 + day * 86400 + t))
+        recorder.stop()
+        
+        base = GridConfig(symbol="VIC", account_no="0001", grid_levels=5, initial_qty_pct=Decimal('0.02'))
+        sweep = ParameterSweep(base, root, max_workers=2)
+        streamed = list(sweep.run(grid))
+        assert len(streamed) == 4 and len(sweep.results) == 4
+        failed = [result for result in streamed if result.error]
+        assert [result.parameters['ddown_factor'] for result in failed] == [0.5, 0.5]
+        assert "DCA factor" in failed[0].error
+        best = sweep.ranked()
+        assert len(best) == 2 and best[0].score >= best[1].score
+        assert all(result.summary['ticks_replayed'] == 2 * 1530 for result in best)
+        print(f"✓ {len(streamed)} configurations on 2 workers, best {best[0].to_dict()['parameters']}")
+
 def main():
     """Run all tests"""
     print("🧪 DNSE Grid Trading Bot - Test Suite")
@@ -208,6 +1588,81 @@ def main():
         test_config_manager()
         print()
         
+        test_pooled_transport()
+        print()
+        
+        test_async_dnse_client()
+        print()
+        
+        test_order_rate_limiter()
+        print()
+        
+        test_bulk_cancel_engine()
+        print()
+        
+        test_order_event_stream()
+        print()
+        
+        test_order_state_tracker()
+        print()
+        
+        test_adaptive_poll_scheduler()
+        print()
+        
+        test_grid_book()
+        print()
+        
+        test_trade_history()
+        print()
+        
+        test_incremental_ema()
+        print()
+        
+        test_price_history()
+        print()
+        
+        test_rolling_statistics()
+        print()
+        
+        test_tick_decoder()
+        print()
+        
+        test_message_dispatcher()
+        print()
+        
+        test_conflation()
+        print()
+        
+        test_market_data_hub()
+        print()
+        
+        test_market_stream_service()
+        print()
+        
+        test_connection_manager()
+        print()
+        
+        test_tick_recorder()
+        print()
+        
+        test_tick_store()
+        print()
+        
+        test_bar_builder()
+        print()
+        
+        test_vectorized_backtest()
+        print()
+        
+        test_grid_backtest()
+        print()
+        
+        test_parameter_sweep()
+        print()
+        
+        test_metrics()
+        print()
+        
         print("🎉 All tests passed!")
         print("\n✅ The grid trading implementation appears to be working correctly.")
         print("📝 Next steps:")
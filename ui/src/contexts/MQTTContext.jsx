@@ -1,5 +1,12 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import mqttService from '../services/MQTTService';
+import marketStreamService from '../services/MarketStreamService';
+
+// Ticks and best bid/offer come from the backend stream (/api/market/ws), which
+// shares one broker subscription per symbol between every dashboard and merges
+// its delta-encoded updates into full records (price, quantity, side, ...).
+// Stock info, indices, OHLC and board events are not served by the backend
+// stream yet and still use the browser's own broker connection.
 
 // Create context
 const MQTTContext = createContext(null);
@@ -88,14 +95,8 @@ export const MQTTProvider = ({ children, investorId, token }) => {
         return success;
     };
 
-    // Subscribe to top price updates
+    // Subscribe to top price updates (backend stream)
     const subscribeToTopPrice = (symbol, callback) => {
-        if (!connectionStatus.connected) {
-            return false;
-        }
-
-        const topic = mqttService.buildTopics.topPrice(symbol);
-        
         // Register our internal handler
         const internalHandler = (data) => {
             setMarketData(prev => ({
@@ -110,23 +111,13 @@ export const MQTTProvider = ({ children, investorId, token }) => {
             if (callback) callback(data);
         };
         
-        const success = mqttService.subscribe(topic, internalHandler);
-        
-        if (success) {
-            setActiveSubscriptions(prev => [...prev, { type: 'topPrice', topic, symbol }]);
-        }
-        
-        return success;
+        const stop = marketStreamService.subscribe(symbol, 'topprice', internalHandler);
+        setActiveSubscriptions(prev => [...prev, { type: 'topPrice', symbol, stop }]);
+        return true;
     };
 
-    // Subscribe to tick data
+    // Subscribe to tick data (backend stream)
     const subscribeToTicks = (symbol, callback) => {
-        if (!connectionStatus.connected) {
-            return false;
-        }
-
-        const topic = mqttService.buildTopics.tick(symbol);
-        
         // Register our internal handler
         const internalHandler = (data) => {
             setMarketData(prev => {
@@ -147,13 +138,9 @@ export const MQTTProvider = ({ children, investorId, token }) => {
             if (callback) callback(data);
         };
         
-        const success = mqttService.subscribe(topic, internalHandler);
-        
-        if (success) {
-            setActiveSubscriptions(prev => [...prev, { type: 'tick', topic, symbol }]);
-        }
-        
-        return success;
+        const stop = marketStreamService.subscribe(symbol, 'tick', internalHandler);
+        setActiveSubscriptions(prev => [...prev, { type: 'tick', symbol, stop }]);
+        return true;
     };
 
     // Subscribe to market index data
@@ -289,16 +276,9 @@ export const MQTTProvider = ({ children, investorId, token }) => {
                 break;
                 
             case 'topPrice':
-                topic = mqttService.buildTopics.topPrice(params.symbol);
-                subscriptionIndex = activeSubscriptions.findIndex(
-                    sub => sub.type === 'topPrice' && sub.symbol === params.symbol
-                );
-                break;
-                
             case 'tick':
-                topic = mqttService.buildTopics.tick(params.symbol);
                 subscriptionIndex = activeSubscriptions.findIndex(
-                    sub => sub.type === 'tick' && sub.symbol === params.symbol
+                    sub => sub.type === type && sub.symbol === params.symbol
                 );
                 break;
                 
@@ -340,8 +320,12 @@ export const MQTTProvider = ({ children, investorId, token }) => {
                 return false;
         }
         
-        // Unsubscribe from MQTT
-        mqttService.unsubscribe(topic);
+        // Unsubscribe from the backend stream or MQTT
+        if (subscriptionIndex !== -1 && activeSubscriptions[subscriptionIndex].stop) {
+            activeSubscriptions[subscriptionIndex].stop();
+        } else if (topic) {
+            mqttService.unsubscribe(topic);
+        }
         
         // Remove from active subscriptions
         if (subscriptionIndex !== -1) {
@@ -357,7 +341,11 @@ export const MQTTProvider = ({ children, investorId, token }) => {
     // Unsubscribe from all topics
     const unsubscribeAll = () => {
         activeSubscriptions.forEach(sub => {
-            mqttService.unsubscribe(sub.topic);
+            if (sub.stop) {
+                sub.stop();
+            } else {
+                mqttService.unsubscribe(sub.topic);
+            }
         });
         setActiveSubscriptions([]);
     };
@@ -0,0 +1,102 @@
+// MarketStreamService.js - market data from the backend stream (/api/market/ws)
+//
+// The backend holds the only broker connection and sends conflated,
+// delta-encoded updates; this service merges the deltas back into the full
+// state of each symbol and kind ('tick' or 'topprice') before notifying listeners.
+
+class MarketStreamService {
+    constructor() {
+        this.socket = null;
+        this.symbols = new Set();
+        this.state = {}; // `${symbol}:${kind}` -> latest full record
+        this.listeners = {}; // `${symbol}:${kind}` -> callbacks
+        this.reconnectDelay = 1000;
+        this.maxReconnectDelay = 30000;
+        this.reconnectTimer = null;
+    }
+
+    static key(symbol, kind) {
+        return `${symbol}:${kind}`;
+    }
+
+    // (Re)open the socket for the current symbol set
+    connect() {
+        if (this.socket) {
+            this.socket.onclose = null;
+            this.socket.close();
+            this.socket = null;
+        }
+        if (this.symbols.size === 0) {
+            return;
+        }
+
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const symbols = encodeURIComponent([...this.symbols].join(','));
+        const socket = new WebSocket(`${protocol}://${window.location.host}/api/market/ws?symbols=${symbols}`);
+
+        socket.onopen = () => {
+            this.reconnectDelay = 1000;
+        };
+
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'updates') {
+                message.updates.forEach(update => this.applyUpdate(update));
+            }
+        };
+
+        socket.onclose = () => {
+            // Back off and reconnect; the first message after reconnecting is a full snapshot
+            clearTimeout(this.reconnectTimer);
+            this.reconnectTimer = setTimeout(() => this.connect(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, this.maxReconnectDelay);
+        };
+
+        this.socket = socket;
+    }
+
+    applyUpdate(update) {
+        const key = MarketStreamService.key(update.symbol, update.kind);
+        const record = update.snapshot ? { ...update.data } : { ...this.state[key], ...update.data };
+        record.symbol = update.symbol;
+        this.state[key] = record;
+        (this.listeners[key] || []).forEach(callback => callback(record, update));
+    }
+
+    // Listen to 'tick' or 'topprice' updates of a symbol; returns an unsubscribe function
+    subscribe(symbol, kind, callback) {
+        const key = MarketStreamService.key(symbol, kind);
+        this.listeners[key] = [...(this.listeners[key] || []), callback];
+        if (this.state[key]) {
+            callback(this.state[key], null);
+        }
+        if (!this.symbols.has(symbol)) {
+            this.symbols.add(symbol);
+            this.connect();
+        }
+        return () => this.unsubscribe(symbol, kind, callback);
+    }
+
+    unsubscribe(symbol, kind, callback) {
+        const key = MarketStreamService.key(symbol, kind);
+        this.listeners[key] = (this.listeners[key] || []).filter(cb => cb !== callback);
+        const stillUsed = Object.keys(this.listeners).some(
+            k => k.startsWith(`${symbol}:`) && this.listeners[k].length > 0
+        );
+        if (!stillUsed) {
+            this.symbols.delete(symbol);
+            Object.keys(this.state).filter(k => k.startsWith(`${symbol}:`)).forEach(k => delete this.state[k]);
+            this.connect();
+        }
+    }
+
+    disconnect() {
+        clearTimeout(this.reconnectTimer);
+        this.symbols.clear();
+        this.connect();
+    }
+}
+
+// Create a singleton instance
+const marketStreamService = new MarketStreamService();
+export default marketStreamService;